@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of batching as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of batching
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+
+class Batcher:
+    # packs the sentences of rewrite requests by their estimated tokens instead of a fixed
+    # count: an answer is estimated at `ratio` tokens per input token plus `overhead` per
+    # item (quotes, separators, index) and has to fit into `fill` of max_tokens, the input
+    # into the context left by the prompt and max_tokens. Requests come out of similar size
+    # and short sentences share a request. ChatGPT.complete_parts still splits an answer
+    # which is cut at max_tokens
+    max_tokens = 2048
+    context = 16385
+    fill = 0.9
+    ratio = 1.2
+    overhead = 4
+    limit = 50
+
+    def __init__( self, ratio: float = None, max_tokens: int = None, context: int = None, fill: float = None,
+                  overhead: int = None, limit: int = None ):
+        if ratio:
+            self.ratio = ratio
+        if max_tokens:
+            self.max_tokens = max_tokens
+        if context:
+            self.context = context
+        if fill:
+            self.fill = fill
+        if overhead is not None:
+            self.overhead = overhead
+        if limit:
+            self.limit = limit
+
+    @staticmethod
+    def tokens( text: str ):
+        # ~4 characters per token, as Engine.estimate
+        return len( text ) // 4 + 1
+
+    def budget( self, prompt: list = None ):
+        # ( answer tokens, input tokens ) a request may take
+        system = sum( self.tokens( str( m.get( "content", "" ) ) ) for m in prompt or [ ] )
+        return self.fill * self.max_tokens, self.context - self.max_tokens - system
+
+    def _greedy( self, sizes: list, answer: float, input: float ):
+        windows = [ ]
+        start = 0
+        answered = given = 0
+        for i, ( tokens, cost ) in enumerate( sizes ):
+            if i > start and ( answered + cost > answer or given + tokens > input or i - start >= self.limit ):
+                windows.append( ( start, i ) )
+                start, answered, given = i, 0, 0
+            answered += cost
+            given += tokens + self.overhead
+        if start < len( sizes ):
+            windows.append( ( start, len( sizes ) ) )
+        return windows
+
+    def pack( self, sentences: list, prompt: list = None, answers: int = 1 ):
+        # ( start, stop ) windows over sentences, in order; answers: rewrites asked per sentence
+        if not len( sentences ):
+            return [ ]
+        sizes = [ ( t, ( t * self.ratio + self.overhead ) * answers ) for t in ( self.tokens( s ) for s in sentences ) ]
+        answer, input = self.budget( prompt )
+        windows = self._greedy( sizes, answer, input )
+        if len( windows ) > 1:
+            # as many requests, evened out, rather than full ones and a small rest: the
+            # smallest answer budget which still needs no more requests
+            low, high = max( cost for __, cost in sizes ), answer
+            for __ in range( 20 ):
+                if high - low < 1:
+                    break
+                middle = ( low + high ) / 2
+                if len( self._greedy( sizes, middle, input ) ) <= len( windows ):
+                    high = middle
+                else:
+                    low = middle
+            windows = self._greedy( sizes, high, input )
+        return windows
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of alignment as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of alignment
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+
+# Counterfactual output alignment: the former per sentence boolean filter with one
+# committed insert per row against Task.align and one bulk write per batch.
+#
+#   python -m benchmarks.alignment --sizes 20 100 1000 10000
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+import pandas
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+from tasks import CounterFactual  # noqa: E402
+
+
+def legacy( task: CounterFactual, bias_type, output, df: pandas.DataFrame, id_term: str ):
+    sql = task.INSERT_SQL.format( table = task.table )
+    sentences = df["sentence"].unique()
+    for s in range( len( sentences ) ):
+        records = df[(df["sentence"] == sentences[s])]
+        record = records.to_dict( orient = 'records' )[0]
+        task.db.execute( sql, ( record["id"], bias_type, id_term, record["concept_term"], output[s] ) )
+        task.database.commit( )
+
+
+def batch( size: int, duplicates: float = 0.05 ):
+    # a few repeated sentences, as in generated batches
+    unique = max( 1, int( size * ( 1 - duplicates ) ) )
+    df = pandas.DataFrame( {
+        "id": range( 1, size + 1 ),
+        "bias_type": "gender",
+        "id_term": "he",
+        "concept_term": [ f"concept{i % 50}" for i in range( size ) ],
+        "sentence": [ f"sentence number {i % unique}" for i in range( size ) ],
+    } )
+    output = [ f"counterfactual {i}" for i in range( size ) ]
+    return df, output
+
+
+def measure( fn, repeat: int ):
+    best = None
+    for __ in range( repeat ):
+        start = time.perf_counter( )
+        fn( )
+        elapsed = time.perf_counter( ) - start
+        best = elapsed if best is None else min( best, elapsed )
+    return best
+
+
+def main( ):
+    parser = argparse.ArgumentParser( description = "Counterfactual output alignment: per sentence filtering vs Task.align" )
+    parser.add_argument( "--sizes", type = int, nargs = "+", default = [ 20, 100, 1000, 10000 ] )
+    parser.add_argument( "--repeat", type = int, default = 3 )
+    args = parser.parse_args( )
+    db = sqlite3.connect( ":memory:", check_same_thread = False )
+    before = CounterFactual( db = db, table = "legacy" )
+    after = CounterFactual( db = db, table = "aligned" )
+    print( f"{'batch':>8}{'legacy (s)':>14}{'aligned (s)':>14}{'speedup':>10}" )
+    for size in args.sizes:
+        df, output = batch( size )
+
+        def run_legacy( ):
+            before.db.execute( f"DELETE FROM {before.table}" )
+            legacy( before, "gender", output, df, "she" )
+
+        def run_aligned( ):
+            after.db.execute( f"DELETE FROM {after.table}" )
+            after.process( bias_type = "gender", output = output, df = df, id_term = "she" )
+            after.commit( )
+
+        old = measure( run_legacy, args.repeat )
+        new = measure( run_aligned, args.repeat )
+        rows = [ db.execute( f"SELECT refid, bias_type, id_term, concept_term, sentence FROM {t} ORDER BY id" ).fetchall( ) for t in ( "legacy", "aligned" ) ]
+        if rows[0] != rows[1]:
+            print( f"{size}: result mismatch" )
+        print( f"{size:>8}{old:>14.4f}{new:>14.4f}{old / max( new, 1e-9 ):>9.1f}x", flush = True )
+    db.close( )
+
+
+if __name__ == "__main__":
+    main( )
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of batch as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of batch
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+# ChatGPT.batch end to end against a local stand-in of the Batch API (/v1/files and
+# /v1/batches, answering the lines with the chat completions of benchmarks.structured):
+# the JSONL upload, batches.create and polling, the split at batch_limit, a line in the
+# error file and a line answered with a non-200 status, and the answers written back to
+# the cache, so that a second call submits only the failed lines and a third none.
+#
+#   python -m benchmarks.batch --requests 20 --limit 7
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from email.parser import BytesParser
+from email.policy import HTTP
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+from benchmarks.structured import PROMPT, Stub, serve  # noqa: E402
+from cache import Cache  # noqa: E402
+from chatgpt import BATCH_ENDPOINT, ChatGPT  # noqa: E402
+
+
+class BatchStub( Stub ):
+    # uploaded files and batches are kept in memory; a batch is validating at its creation,
+    # in progress at the first poll and done at the second. The lines of custom ids in
+    # `errors` go to its error file, those in `failures` are answered with a 500
+    files = { }
+    batches = { }
+    errors = set( )
+    failures = set( )
+    uploads = 0
+    created = 0
+    polls = 0
+    # lines per uploaded file, in upload order
+    lines = [ ]
+
+    def do_POST( self ):
+        body = self.rfile.read( int( self.headers["Content-Length"] ) )
+        if self.path.endswith( "/files" ):
+            self.reply( BatchStub.upload( self.headers["Content-Type"], body ) )
+        elif self.path.endswith( "/batches" ):
+            self.reply( BatchStub.create( json.loads( body ) ) )
+        else:
+            self.reply( Stub.complete( json.loads( body ) ) )
+
+    def do_GET( self ):
+        parts = self.path.split( "/" )
+        if self.path.endswith( "/content" ) and parts[-2] in BatchStub.files:
+            payload = BatchStub.files[parts[-2]]["content"]
+            self.send_response( 200 )
+            self.send_header( "Content-Type", "application/octet-stream" )
+            self.send_header( "Content-Length", str( len( payload ) ) )
+            self.end_headers( )
+            self.wfile.write( payload )
+        elif parts[-2] == "batches" and parts[-1] in BatchStub.batches:
+            self.reply( BatchStub.poll( parts[-1] ) )
+        else:
+            self.reply( { "error": { "message": f"Unknown {self.path}" } }, status = 404 )
+
+    @staticmethod
+    def file( content: bytes, purpose: str, filename: str = "" ):
+        with Stub.lock:
+            id = f"file-{len( BatchStub.files )}"
+            BatchStub.files[id] = { "id": id, "object": "file", "bytes": len( content ), "created_at": 0,
+                                    "filename": filename or id, "purpose": purpose, "status": "processed", "content": content }
+        return { k: v for k, v in BatchStub.files[id].items( ) if k != "content" }
+
+    @staticmethod
+    def upload( type: str, body: bytes ):
+        # multipart/form-data with the purpose and the JSONL file
+        form = BytesParser( policy = HTTP ).parsebytes( f"Content-Type: {type}\r\n\r\n".encode( "utf-8" ) + body )
+        fields = { part.get_param( "name", header = "content-disposition" ): part for part in form.iter_parts( ) }
+        content = fields["file"].get_payload( decode = True )
+        lines = [ json.loads( line ) for line in content.decode( "utf-8" ).splitlines( ) if line.strip( ) ]
+        for line in lines:
+            assert line["method"] == "POST" and line["url"] == BATCH_ENDPOINT and line["body"]["model"], line
+        with Stub.lock:
+            BatchStub.uploads += 1
+            BatchStub.lines.append( len( lines ) )
+        return BatchStub.file( content, fields["purpose"].get_content( ).strip( ), fields["file"].get_filename( ) )
+
+    @staticmethod
+    def create( body: dict ):
+        assert body["endpoint"] == BATCH_ENDPOINT and body["input_file_id"] in BatchStub.files, body
+        with Stub.lock:
+            BatchStub.created += 1
+            id = f"batch-{len( BatchStub.batches )}"
+            BatchStub.batches[id] = { "id": id, "object": "batch", "endpoint": body["endpoint"], "input_file_id": body["input_file_id"],
+                                      "completion_window": body["completion_window"], "status": "validating", "created_at": 0,
+                                      "output_file_id": None, "error_file_id": None,
+                                      "request_counts": { "total": 0, "completed": 0, "failed": 0 } }
+        return BatchStub.batches[id]
+
+    @staticmethod
+    def poll( id: str ):
+        with Stub.lock:
+            BatchStub.polls += 1
+            batch = BatchStub.batches[id]
+            status = batch["status"]
+            if status == "validating":
+                batch["status"] = "in_progress"
+        if status == "in_progress":
+            BatchStub.run( batch )
+        return batch
+
+    @staticmethod
+    def run( batch: dict ):
+        outputs = [ ]
+        errors = [ ]
+        content = BatchStub.files[batch["input_file_id"]]["content"].decode( "utf-8" )
+        for n, line in enumerate( json.loads( x ) for x in content.splitlines( ) if x.strip( ) ):
+            id = line["custom_id"]
+            if id in BatchStub.errors:
+                errors.append( { "id": f"req-{n}", "custom_id": id, "response": None,
+                                 "error": { "code": "invalid_request", "message": "stub error file line" } } )
+            elif id in BatchStub.failures:
+                outputs.append( { "id": f"req-{n}", "custom_id": id, "error": None,
+                                  "response": { "status_code": 500, "body": { "error": { "message": "stub server error" } } } } )
+            else:
+                outputs.append( { "id": f"req-{n}", "custom_id": id, "error": None,
+                                  "response": { "status_code": 200, "body": Stub.complete( line["body"] ) } } )
+        completed = sum( 1 for x in outputs if x["response"]["status_code"] == 200 )
+        batch["request_counts"] = { "total": len( outputs ) + len( errors ), "completed": completed,
+                                    "failed": len( outputs ) + len( errors ) - completed }
+        batch["output_file_id"] = BatchStub.file( "".join( json.dumps( x ) + "\n" for x in outputs ).encode( "utf-8" ), "batch_output" )["id"]
+        if errors:
+            batch["error_file_id"] = BatchStub.file( "".join( json.dumps( x ) + "\n" for x in errors ).encode( "utf-8" ), "batch_output" )["id"]
+        batch["status"] = "completed"
+
+
+def main( ):
+    parser = argparse.ArgumentParser( description = "ChatGPT.batch against a local stand-in of the Batch API" )
+    parser.add_argument( "--requests", type = int, default = 20 )
+    parser.add_argument( "--limit", type = int, default = 7, help = "batch_limit, lines per batch" )
+    parser.add_argument( "--size", type = int, default = 10, help = "sentences per request" )
+    args = parser.parse_args( )
+    Stub.failures = 0.0
+    server = serve( BatchStub )
+    folder = tempfile.mkdtemp( )
+    cache = Cache( path = os.path.join( folder, "responses.db" ) )
+    gpt = ChatGPT( cache = cache )
+    gpt.batch_limit = args.limit
+    items = [ [ f"After the match he said fan number {i}-{j} was the loudest in the stadium." for j in range( args.size ) ]
+              for i in range( args.requests ) ]
+    requests = { f"rewrite-{i}": gpt.request( gpt.listing( x ), prompt = PROMPT ) for i, x in enumerate( items ) }
+    BatchStub.errors = { "rewrite-3" }
+    BatchStub.failures = { "rewrite-11" }
+    print( f"{args.requests} requests of {args.size} sentences, batch_limit {args.limit}" )
+    print( f"{'call':>6}{'answers':>9}{'uploads':>9}{'lines':>16}{'batches':>9}{'polls':>7}{'cached':>8}" )
+    for call in range( 3 ):
+        BatchStub.uploads = BatchStub.created = BatchStub.polls = 0
+        BatchStub.lines = [ ]
+        results = gpt.batch( requests, folder = folder, poll = 0.01 )
+        cached = cache.database.execute( f"SELECT COUNT( * ) FROM {cache.table}" ).fetchone( )[0]
+        print( f"{call + 1:>6}{len( results ):>9}{BatchStub.uploads:>9}{str( BatchStub.lines ):>16}{BatchStub.created:>9}"
+               f"{BatchStub.polls:>7}{cached:>8}", flush = True )
+        failed = BatchStub.errors | BatchStub.failures
+        assert set( results ) == set( requests ) - failed, sorted( set( requests ) - set( results ) )
+        assert all( len( results[x] ) == args.size for x in results )
+        assert max( BatchStub.lines or [ 0 ] ) <= args.limit and cached == len( results )
+        # the failed lines go through on the next call
+        BatchStub.errors = set( )
+        BatchStub.failures = set( )
+    assert BatchStub.uploads == 0
+    cache.close( )
+    server.shutdown( )
+
+
+if __name__ == "__main__":
+    main( )
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of batching as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of batching
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+
+# Rewrite requests of fixed windows of sentences against windows packed by Batcher, with
+# answers cut at max_tokens asked again in parts, on the stub of benchmarks.structured
+# (which cuts answers at max_tokens). Short and long sentences, rewritten `ratio` times
+# as long (1 for counterfactuals, 2 or more for the extended syntactic rewrites).
+#
+#   python -m benchmarks.batching --sentences 600 --ratio 2
+
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+from batching import Batcher  # noqa: E402
+from benchmarks.structured import PROMPT, Stub, serve  # noqa: E402
+from chatgpt import ChatGPT  # noqa: E402
+
+WORDS = "he said that the new nurse at the hospital was always late for the morning shift because of traffic".split( )
+
+
+def sentences( n: int, seed: int = 0 ):
+    # a third long (semantic like), the rest short
+    generator = random.Random( seed )
+    output = [ ]
+    for i in range( n ):
+        words = generator.randint( 60, 120 ) if i % 3 == 0 else generator.randint( 8, 20 )
+        output.append( f"{i}: " + " ".join( generator.choice( WORDS ) for __ in range( words ) ) + "." )
+    return output
+
+
+def fixed( gpt: ChatGPT, items: list, size: int ):
+    usable = 0
+    for start in range( 0, len( items ), size ):
+        window = items[start:start + size]
+        output = gpt.parse( gpt.complete( gpt.listing( window ), prompt = PROMPT ) )
+        if output is not None and len( output ) == len( window ):
+            usable += len( window )
+    return usable
+
+
+def packed( gpt: ChatGPT, items: list, batcher: Batcher ):
+    usable = 0
+    for start, stop in batcher.pack( items, prompt = PROMPT ):
+        window = items[start:stop]
+        answers = gpt.answers( gpt.complete_parts( window, prompt = PROMPT ), len( window ) )
+        usable += sum( 1 for x in answers if x is not None )
+    return usable
+
+
+def main( ):
+    parser = argparse.ArgumentParser( description = "Rewrites: fixed windows vs token budget packed windows" )
+    parser.add_argument( "--sentences", type = int, default = 600 )
+    parser.add_argument( "--ratio", type = float, default = 1.0, help = "answer length per input length" )
+    parser.add_argument( "--estimate", type = float, help = "answer length per input length Batcher assumes (default: ratio)" )
+    parser.add_argument( "--sizes", type = int, nargs = "+", default = [ 15, 20, 50 ] )
+    args = parser.parse_args( )
+    Stub.failures = 0.0
+    Stub.ratio = args.ratio
+    server = serve( )
+    items = sentences( args.sentences )
+    strategies = { f"fixed {size}": ( fixed, size ) for size in args.sizes }
+    strategies["batcher"] = ( packed, Batcher( ratio = args.estimate or args.ratio ) )
+    print( f"{len( items )} sentences, answers {args.ratio:g}x their input" )
+    print( f"{'windows':>10}{'usable':>12}{'requests':>10}{'cut':>6}{'tokens':>10}{'tok/sent':>10}" )
+    for name, ( fn, setting ) in strategies.items( ):
+        Stub.requests = Stub.tokens = Stub.truncated = 0
+        gpt = ChatGPT( )
+        gpt.client = gpt.client.with_options( max_retries = 0 )
+        usable = fn( gpt, items, setting )
+        print( f"{name:>10}{usable:>7}/{len( items ):<4}{Stub.requests:>10}{Stub.truncated:>6}{Stub.tokens:>10}"
+               f"{Stub.tokens / max( usable, 1 ):>10.1f}", flush = True )
+    server.shutdown( )
+
+
+if __name__ == "__main__":
+    main( )
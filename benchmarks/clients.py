@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of clients as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of clients
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+
+# A client per ChatGPT instance (the former constructor, as when a ChatGPT is made per
+# window and target) against the shared pooled client, on the stub of benchmarks.structured:
+# client setup time, connections opened and wall time for the same requests.
+#
+#   python -m benchmarks.clients --windows 200
+
+import argparse
+import os
+import sys
+import time
+
+import openai
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+from benchmarks.structured import PROMPT, Stub, serve  # noqa: E402
+from chatgpt import ChatGPT  # noqa: E402
+
+ITEMS = [ f"After the match he said fan number {i} was the loudest in the stadium." for i in range( 20 ) ]
+
+
+def own( ):
+    gpt = ChatGPT( )
+    gpt.client = openai.OpenAI( api_key = os.environ["OPENAI_API_KEY"], max_retries = 2 )
+    return gpt
+
+
+def shared( ):
+    return ChatGPT( )
+
+
+def main( ):
+    parser = argparse.ArgumentParser( description = "ChatGPT: a client per instance vs one shared pooled client" )
+    parser.add_argument( "--windows", type = int, default = 200 )
+    args = parser.parse_args( )
+    Stub.failures = 0.0
+    server = serve( )
+    print( f"{args.windows} windows, a ChatGPT instance each" )
+    print( f"{'client':>10}{'setup (ms)':>12}{'connections':>13}{'total (s)':>11}" )
+    for name, make in ( ( "own", own ), ( "shared", shared ) ):
+        Stub.connections = set( )
+        setup = 0.0
+        start = time.perf_counter( )
+        for __ in range( args.windows ):
+            begin = time.perf_counter( )
+            gpt = make( )
+            setup += time.perf_counter( ) - begin
+            gpt.complete( gpt.listing( ITEMS ), prompt = PROMPT )
+        total = time.perf_counter( ) - start
+        print( f"{name:>10}{setup * 1e3:>12.1f}{len( Stub.connections ):>13}{total:>11.2f}", flush = True )
+    ChatGPT.close_shared( )
+    server.shutdown( )
+
+
+if __name__ == "__main__":
+    main( )
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of multi_target as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of multi_target
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+
+# Counterfactual rewrites of one bias type, one request per other identity term against
+# one request for all of them (workflow.counter_factual_jobs with multi), through
+# workflow.generate on the stub of benchmarks.structured. Requests, prompt tokens, all
+# tokens and usable rewrites.
+#
+#   python -m benchmarks.multi_target --terms 5 --sentences 100
+
+import argparse
+import os
+import sys
+
+import pandas
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+from benchmarks.structured import Stub, serve  # noqa: E402
+from batching import Batcher  # noqa: E402
+from chatgpt import ChatGPT  # noqa: E402
+from engine import Engine  # noqa: E402
+from pipeline import Pipeline  # noqa: E402
+import workflow  # noqa: E402
+
+
+def sentences( terms: list, n: int ):
+    rows = [ ( len( terms ) * i + t, term, f"concept{i % 10}", f"After the match he said the {term} fan number {i} was the loudest in the stadium." )
+             for i in range( n ) for t, term in enumerate( terms ) ]
+    return pandas.DataFrame( rows, columns = [ "id", "id_term", "concept_term", "sentence" ] )
+
+
+def main( ):
+    parser = argparse.ArgumentParser( description = "Counterfactuals: one request per target vs all targets in one request" )
+    parser.add_argument( "--terms", type = int, default = 5 )
+    parser.add_argument( "--sentences", type = int, default = 100, help = "per identity term" )
+    parser.add_argument( "--failures", type = float, default = 0.1, help = "share of incomplete answers" )
+    args = parser.parse_args( )
+    Stub.failures = args.failures
+    server = serve( )
+    terms = [ f"term{t}" for t in range( args.terms ) ]
+    input = sentences( terms, args.sentences )
+    expected = len( input ) * ( len( terms ) - 1 )
+    engine = Engine( concurrency = 8 )
+    workflow.pipeline = Pipeline( engine = engine )
+    print( f"{args.terms} identity terms, {args.sentences} sentences each, {args.failures:.0%} incomplete answers" )
+    print( f"{'targets':>10}{'usable':>14}{'requests':>10}{'prompt':>10}{'tokens':>10}{'tok/rewrite':>13}" )
+    for multi in ( False, True ):
+        Stub.random.seed( 0 )
+        Stub.requests = Stub.tokens = Stub.prompt_tokens = 0
+        gpt = ChatGPT( model = "gpt-4o-mini", engine = engine, structured = "schema" )
+        gpt.client = gpt.client.with_options( max_retries = 0 )
+        usable = [ 0 ]
+
+        def write( context, output ):
+            __df, others = context
+            for other in others:
+                answers = output.get( other ) if isinstance( output, dict ) else output
+                usable[0] += sum( 1 for x in answers or [ ] if x is not None )
+
+        jobs = workflow.counter_factual_jobs( "bench", input, terms, batcher = Batcher( ), multi = multi )
+        workflow.generate( gpt, jobs, write, batch = False )
+        print( f"{'one' if multi else 'per target':>10}{usable[0]:>7}/{expected:<6}{Stub.requests:>10}{Stub.prompt_tokens:>10}"
+               f"{Stub.tokens:>10}{Stub.tokens / max( usable[0], 1 ):>13.1f}", flush = True )
+    engine.close( )
+    server.shutdown( )
+
+
+if __name__ == "__main__":
+    main( )
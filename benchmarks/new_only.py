@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of new_only as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of new_only
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+
+# Incremental (GET_NEW_ONLY) queries on a synthetic database: the former NOT IN subqueries
+# on unindexed tables against the NOT EXISTS anti-joins on the tables created by Task.setup.
+# Counterfactuals hold a rewrite per other identity term, and are new per missing target.
+#
+#   python -m benchmarks.new_only --rows 2000000
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+from tasks import CounterFactual, Lexical, Samples, Task  # noqa: E402
+
+BIAS_TYPES = [ "religion", "nationality", "gender", "race", "sexual orientation", "age", "disability" ]
+ID_TERMS = [ f"term{i}" for i in range( 5 ) ]
+
+LEGACY = {
+    "Task": """SELECT DISTINCT id, bias_type, id_term, concept_term, sentence, 
+                    bias_type || ':' || concept_term || '-' || RANK() OVER (PARTITION BY bias_type, id_term, concept_term ORDER BY id) unid
+                FROM {source}
+                WHERE ( bias_type, id_term, concept_term ) NOT IN ( SELECT bias_type, id_term, concept_term FROM {table} )
+                    AND bias_type = ?
+                """,
+    "Samples": """SELECT DISTINCT id, id_term, concept_term FROM {source} 
+        WHERE bias_type = ? 
+        AND ( id_term, concept_term ) NOT IN ( SELECT id_term, concept_term FROM {table} )
+    """,
+    "Lexical": """SELECT DISTINCT id, bias_type, id_term, concept_term, sentence, 
+                    bias_type || ':' || concept_term || '-' || RANK() OVER (PARTITION BY bias_type, id_term, concept_term ORDER BY id) unid
+                FROM {source} WHERE ( id ) NOT IN ( SELECT refid FROM {table} ) AND bias_type = ?
+                """,
+    # new per ( refid, target identity term ), as CounterFactual.GET_NEW_ONLY
+    "CounterFactual": """SELECT DISTINCT id, bias_type, id_term, concept_term, sentence, 
+                    bias_type || ':' || concept_term || '-' || RANK() OVER (PARTITION BY bias_type, id_term, concept_term ORDER BY id) unid
+                FROM {source} WHERE bias_type = ? AND id IN (
+                    SELECT s.id FROM {source} s, ( SELECT DISTINCT bias_type, id_term FROM {source} ) o
+                    WHERE o.bias_type = s.bias_type AND o.id_term <> s.id_term
+                        AND s.id || ':' || o.id_term NOT IN ( SELECT refid || ':' || id_term FROM {table} ) )
+                """,
+}
+CURRENT = { "Task": Task, "Samples": Samples, "Lexical": Lexical, "CounterFactual": CounterFactual }
+# ( query, source table, target table )
+CASES = [
+    ( "Samples", "termdefs", "baseline" ),
+    ( "Task", "termdefs", "baseline" ),
+    ( "Lexical", "baseline", "lexical" ),
+    ( "CounterFactual", "baseline", "counterfact_base" ),
+]
+
+
+def populate( db, rows: int, done: float, indexed: bool ):
+    random.seed( 42 )
+    tables = { "termdefs": Task, "baseline": Task, "lexical": Task, "counterfact_base": CounterFactual }
+    for table, task in tables.items( ):
+        db.execute( task.CREATE_TABLE.format( table = table ) )
+    concepts = max( 1, rows // ( 10 * len( BIAS_TYPES ) * len( ID_TERMS ) ) )
+    terms = [ ( 0, b, t, f"concept{c}", "-" ) for b in BIAS_TYPES for t in ID_TERMS for c in range( concepts ) ]
+    db.executemany( Task.INSERT_SQL.format( table = "termdefs" ), terms )
+    # every tenth term definition is new, the rest has baseline sentences already
+    used = [ t for i, t in enumerate( terms ) if i % 10 ]
+    baseline = [ ( 1 + i % len( used ), ) + used[i % len( used )][1:4] + ( f"sentence {i}", ) for i in range( rows ) ]
+    db.executemany( Task.INSERT_SQL.format( table = "baseline" ), baseline )
+    # the incremental step: most of the source has been processed already
+    processed = [ ( i + 1, ) + row[1:] for i, row in enumerate( baseline ) if random.random( ) < done ]
+    db.executemany( Task.INSERT_SQL.format( table = "lexical" ), processed )
+    # rewrites to every other identity term, but a tenth of the sentences misses one of them
+    rewrites = [ ( refid, bias_type, other, concept_term, sentence )
+                 for refid, bias_type, id_term, concept_term, sentence in processed
+                 for skip in [ random.choice( ID_TERMS ) if random.random( ) < 0.1 else None ]
+                 for other in ID_TERMS if other not in ( id_term, skip ) ]
+    db.executemany( Task.INSERT_SQL.format( table = "counterfact_base" ), rewrites )
+    if indexed:
+        for table, task in tables.items( ):
+            index = Samples.INDICES if table == "baseline" else task.INDICES
+            for sql in index:
+                db.execute( sql.format( table = table ) )
+    db.commit( )
+    db.execute( "ANALYZE" )
+
+
+def measure( db, sql: str, repeat: int ):
+    best = None
+    found = 0
+    for __ in range( repeat ):
+        start = time.perf_counter( )
+        found = sum( len( db.execute( sql, ( bias_type, ) * sql.count( "?" ) ).fetchall( ) ) for bias_type in BIAS_TYPES )
+        elapsed = time.perf_counter( ) - start
+        best = elapsed if best is None else min( best, elapsed )
+    return best, found
+
+
+def main( ):
+    parser = argparse.ArgumentParser( description = "GET_NEW_ONLY queries: NOT IN subqueries vs indexed NOT EXISTS" )
+    parser.add_argument( "--rows", type = int, default = 2000000, help = "baseline rows" )
+    parser.add_argument( "--done", type = float, default = 0.9, help = "share of rows already processed" )
+    parser.add_argument( "--repeat", type = int, default = 3 )
+    # the former Task query grows super-linearly (about 2 minutes at 500k rows)
+    parser.add_argument( "--cases", nargs = "+", default = [ c[0] for c in CASES ], choices = [ c[0] for c in CASES ] )
+    args = parser.parse_args( )
+    folder = tempfile.mkdtemp( )
+    databases = { }
+    for indexed in ( False, True ):
+        path = os.path.join( folder, f"bench-{'indexed' if indexed else 'plain'}.db" )
+        start = time.perf_counter( )
+        databases[indexed] = sqlite3.connect( path, check_same_thread = False )
+        populate( databases[indexed], rows = args.rows, done = args.done, indexed = indexed )
+        print( f"{path}: built in {time.perf_counter( ) - start:.1f}s", flush = True )
+    print( f"{'query':<16}{'source -> table':<30}{'NOT IN (s)':>12}{'NOT EXISTS (s)':>16}{'speedup':>10}{'rows':>10}" )
+    for name, source, table in [ c for c in CASES if c[0] in args.cases ]:
+        legacy, found = measure( databases[False], LEGACY[name].format( source = source, table = table ), args.repeat )
+        current, check = measure( databases[True], CURRENT[name].GET_NEW_ONLY.format( source = source, table = table ), args.repeat )
+        if check != found:
+            print( f"{name}: result mismatch {found} vs {check}" )
+        print( f"{name:<16}{source + ' -> ' + table:<30}{legacy:>12.3f}{current:>16.3f}{legacy / max( current, 1e-9 ):>9.1f}x{check:>10}", flush = True )
+    for db in databases.values( ):
+        db.close( )
+    shutil.rmtree( folder )
+
+
+if __name__ == "__main__":
+    main( )
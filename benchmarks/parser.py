@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of parser as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of parser
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+
+# Completion parsing: the former regex cascade of ChatGPT.cleaner against parsing.parse,
+# on a corpus of malformed completions (benchmarks/completions.jsonl, items with the
+# expected output) and optionally on every completion kept in a response cache (no
+# expected output there, so only the share of parsed completions is reported).
+#
+#   python -m benchmarks.parser --cache responses.db
+
+import argparse
+import ast
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+
+import numpy
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+import parsing  # noqa: E402
+
+CORPUS = os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), "completions.jsonl" )
+
+ARRAY_STR = re.compile( r'\A[^\[]*[\[]')
+ARRAY_END = re.compile( r'[^]]*\Z')
+MID_SEP = re.compile( r'''['"][,][ \n\r]*['"]''' )
+ARRAY_START = re.compile( r'''\A[ ]*[\[]['"]''')
+ARRAY_FINISH = re.compile( r'''['"][ ]*[\]][ ]*\Z''')
+CLEANER = re.compile( r'[\n\t\r]')
+CLEANER2 = re.compile( r'[\n\t\r]+')
+NUM_PREFIX = re.compile( r"""\A[0-9]+[.)][ ]*""")
+UNWANTED = re.compile( r'[\xa0]' )
+
+
+def legacy( msg ):
+    sentences = UNWANTED.sub( repl = " ", string = ARRAY_END.sub( repl = "", string = ARRAY_STR.sub( repl = "[", string = msg ) ) )
+    try:
+        return list( numpy.asarray( ast.literal_eval( f"""{sentences}""" ) ).flatten( ) )
+    except Exception:
+        pass
+    if len( sentences ):
+        if len( MID_SEP.findall( sentences ) ) > 0:
+            sentences = CLEANER.sub( repl = " ", string = sentences )
+        else:
+            sentences = CLEANER2.sub( repl = ", ", string = sentences )
+        sentences = ARRAY_FINISH.sub( repl = '"]', string = ARRAY_START.sub( repl = '["', string = sentences ) )
+        sentences = MID_SEP.sub( repl = '", "', string = sentences )
+        try:
+            return list( numpy.asarray( ast.literal_eval( f"""{sentences}""" ) ).flatten( ) )
+        except Exception:
+            return None
+    return [ NUM_PREFIX.sub( repl = '', string = x ) for x in CLEANER2.split( msg ) ]
+
+
+def same( output, expected ):
+    if output is None:
+        return False
+    return [ x.item( ) if isinstance( x, numpy.generic ) else x for x in output ] == expected
+
+
+def measure( fn, completions: list, repeat: int ):
+    best = None
+    for __ in range( repeat ):
+        start = time.perf_counter( )
+        for completion in completions:
+            fn( completion )
+        elapsed = time.perf_counter( ) - start
+        best = elapsed if best is None else min( best, elapsed )
+    return best / max( len( completions ), 1 )
+
+
+def corpus( path: str ):
+    with open( path, encoding = "utf-8" ) as file:
+        return [ json.loads( line ) for line in file if line.strip( ) ]
+
+
+def cached( path: str, table: str ):
+    db = sqlite3.connect( path, check_same_thread = False )
+    try:
+        return [ row[0] for row in db.execute( f"SELECT completion FROM {table} WHERE completion IS NOT NULL" ) ]
+    finally:
+        db.close( )
+
+
+def main( ):
+    parser = argparse.ArgumentParser( description = "Completion parsing: regex cascade vs parsing.parse" )
+    parser.add_argument( "--corpus", default = CORPUS )
+    parser.add_argument( "--cache", help = "response cache database to parse as well" )
+    parser.add_argument( "--table", default = "responses" )
+    parser.add_argument( "--repeat", type = int, default = 20 )
+    parser.add_argument( "--verbose", action = "store_true", help = "print the corpus items either parser gets wrong" )
+    args = parser.parse_args( )
+    parsers = { "legacy": legacy, "parse": parsing.parse }
+
+    items = corpus( args.corpus )
+    completions = [ item["completion"] for item in items ]
+    print( f"corpus: {len( items )} completions" )
+    print( f"{'parser':>8}{'recovered':>12}{'us/completion':>16}" )
+    for name, fn in parsers.items( ):
+        good = 0
+        for item in items:
+            try:
+                output = fn( item["completion"] )
+            except Exception:
+                output = None
+            if same( output, item["expected"] ):
+                good += 1
+            elif args.verbose:
+                print( f"  {name} {item['kind']}: {item['completion'][:60]!r} -> {output!r:.120}" )
+        seconds = measure( fn, completions, args.repeat )
+        print( f"{name:>8}{good:>7}/{len( items ):<4}{seconds * 1e6:>16.1f}", flush = True )
+
+    if args.cache:
+        completions = cached( args.cache, args.table )
+        print( f"cache: {len( completions )} completions" )
+        print( f"{'parser':>8}{'parsed':>12}{'us/completion':>16}" )
+        for name, fn in parsers.items( ):
+            parsed = sum( 1 for completion in completions if fn( completion ) )
+            seconds = measure( fn, completions, max( 1, args.repeat // 10 ) )
+            print( f"{name:>8}{parsed:>7}/{len( completions ):<4}{seconds * 1e6:>16.1f}", flush = True )
+
+
+if __name__ == "__main__":
+    main( )
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of streaming as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of streaming
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+
+# Peak memory (tracemalloc) and time of Testing.run on the whole input at once against
+# chunked input, with a Results store: a cold run classifies every sentence, a warm run
+# (testing table emptied) finds them all in the store. The classifier is a constant
+# stand-in, so only the data path is measured.
+#
+#   python -m benchmarks.streaming --rows 100000 --chunksizes 0 10000 2000
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+from tasks import Models, Results, Testing  # noqa: E402
+
+MODELS = [ "model-a", "model-b" ]
+
+
+class Constant( Models ):
+    # every "model" labels every sentence the same
+    def get( self, model ):
+        return lambda sentences, **kwargs: [ { "label": "POSITIVE", "score": 0.9 } for __ in sentences ]
+
+
+def populate( db, rows: int ):
+    db.execute( "CREATE TABLE bench_data ( id INTEGER PRIMARY KEY, bias_type TEXT, id_term TEXT, concept_term TEXT, sentence TEXT )" )
+    db.executemany( "INSERT INTO bench_data VALUES ( ?, ?, ?, ?, ? )",
+                    ( ( i, "gender", "he" if i % 2 else "she", f"concept{i % 50}",
+                        f"Sentence {i}: after a long shift at the hospital the nurse finally went home to rest." ) for i in range( rows ) ) )
+    db.commit( )
+
+
+def measure( fn ):
+    tracemalloc.start( )
+    start = time.perf_counter( )
+    fn( )
+    elapsed = time.perf_counter( ) - start
+    __, peak = tracemalloc.get_traced_memory( )
+    tracemalloc.stop( )
+    return peak / 2**20, elapsed
+
+
+def main( ):
+    parser = argparse.ArgumentParser( description = "Testing.run: whole input vs chunked input" )
+    parser.add_argument( "--rows", type = int, default = 100000 )
+    parser.add_argument( "--chunksizes", type = int, nargs = "+", default = [ 0, 10000, 2000 ], help = "0 reads the whole input" )
+    args = parser.parse_args( )
+    folder = tempfile.mkdtemp( )
+    print( f"{args.rows} rows, {len( MODELS )} models" )
+    print( f"{'chunksize':>10}{'cold MB':>10}{'cold s':>9}{'warm MB':>10}{'warm s':>9}" )
+    for chunksize in args.chunksizes:
+        db = sqlite3.connect( os.path.join( folder, f"bench-{chunksize}.db" ), check_same_thread = False )
+        populate( db, args.rows )
+        testing = Testing( db = db, table = "testing_bench", models = MODELS, registry = Constant( ),
+                           results = Results( db = db, table = "testing_results" ) )
+        testing.chunksize = chunksize or None
+
+        def run( ):
+            testing.run( bias_type = "gender", source = "bench_data", new_only = True, chunksize = chunksize or None )
+            testing.commit( )
+
+        cold = measure( run )
+        written = db.execute( "SELECT COUNT(*) FROM testing_bench" ).fetchone( )[0]
+        db.execute( "DELETE FROM testing_bench" )
+        db.commit( )
+        warm = measure( run )
+        if written != args.rows * len( MODELS ):
+            print( f"{chunksize}: {written} rows written" )
+        print( f"{chunksize or 'all':>10}{cold[0]:>10.1f}{cold[1]:>9.2f}{warm[0]:>10.1f}{warm[1]:>9.2f}", flush = True )
+        db.close( )
+
+
+if __name__ == "__main__":
+    main( )
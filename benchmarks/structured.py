@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of structured as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of structured
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+
+# Rewrites against a local stub of the chat completions endpoint which drops items from
+# (or truncates) a share of its answers: free text answers, where an incomplete batch is
+# dropped and asked again as a whole on the next run, against structured answers, where
+# ChatGPT.fill re-asks only for the missing items. Requests and tokens per usable sentence.
+#
+#   python -m benchmarks.structured --batches 50 --size 20 --failures 0.3
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+from chatgpt import ChatGPT, INDEXED  # noqa: E402
+
+PROMPT = [ ChatGPT.context( "Rewrite each sentence, replacing he by she. The output shall be a Python array of strings." ) ]
+
+
+class Stub( BaseHTTPRequestHandler ):
+    # answers rewrites; a share of the answers lose one to three items or are cut short, and
+    # answers longer than max_tokens are cut there. Rewrites are `ratio` times their input.
+    # Structured rewrites to several targets (ChatGPT.targeted) get one item per target
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    failures = 0.3
+    ratio = 1.0
+    random = random.Random( 0 )
+    lock = threading.Lock( )
+    requests = 0
+    tokens = 0
+    prompt_tokens = 0
+    truncated = 0
+    # client ( host, port ) pairs seen, i.e. connections opened
+    connections = set( )
+
+    def log_message( self, *args ):
+        pass
+
+    def do_POST( self ):
+        body = json.loads( self.rfile.read( int( self.headers["Content-Length"] ) ) )
+        with Stub.lock:
+            Stub.connections.add( self.client_address )
+        self.reply( Stub.complete( body ) )
+
+    def reply( self, response, status: int = 200, headers: dict = None ):
+        payload = json.dumps( response ).encode( "utf-8" )
+        self.send_response( status )
+        for name, value in ( headers or { } ).items( ):
+            self.send_header( name, value )
+        self.send_header( "Content-Type", "application/json" )
+        self.send_header( "Content-Length", str( len( payload ) ) )
+        self.end_headers( )
+        self.wfile.write( payload )
+
+    @staticmethod
+    def complete( body: dict ):
+        # the chat completion answering a request body
+        input = body["messages"][-1]["content"]
+        structured = "response_format" in body
+        targets = [ None ]
+        if structured:
+            items = [ ( x["index"], x["text"] ) for x in json.loads( input ) ]
+            item = body["response_format"].get( "json_schema", { } ).get( "schema", { } ).get( "properties", { } ).get( "items", { } ).get( "items", { } )
+            targets = item.get( "properties", { } ).get( "target", { } ).get( "enum" ) or targets
+        else:
+            items = list( enumerate( json.loads( input ) ) )
+        extend = max( 0, int( Stub.ratio ) - 1 )
+        items = [ ( i, target, " ".join( [ text.replace( "he ", f"{target or 'she'} " ) ] * ( 1 + extend ) ) )
+                  for i, text in items for target in targets ]
+        with Stub.lock:
+            failure = Stub.random.random( ) < Stub.failures
+            drop = set( Stub.random.sample( range( len( items ) ), min( len( items ), Stub.random.randint( 1, 3 ) ) ) ) if failure else set( )
+            cut = failure and Stub.random.random( ) < 0.3
+        items = [ x for n, x in enumerate( items ) if n not in drop ]
+        if structured:
+            content = json.dumps( { "items": [ { "index": i, "text": text } | ( { "target": target } if target else { } )
+                                               for i, target, text in items ] }, separators = ( ",", ":" ) )
+        else:
+            content = json.dumps( [ text for __, __, text in items ] )
+        if cut:
+            content = content[:len( content ) * 2 // 3]
+        if body.get( "max_tokens" ) and len( content ) // 4 > body["max_tokens"]:
+            content = content[:body["max_tokens"] * 4]
+            cut = True
+        prompt = sum( len( m["content"] ) for m in body["messages"] ) // 4
+        completion = len( content ) // 4
+        with Stub.lock:
+            Stub.requests += 1
+            Stub.tokens += prompt + completion
+            Stub.prompt_tokens += prompt
+            Stub.truncated += cut
+        return {
+            "id": "stub", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [ { "index": 0, "finish_reason": "length" if cut else "stop",
+                           "message": { "role": "assistant", "content": content } } ],
+            "usage": { "prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion },
+        }
+
+
+def rewrite( gpt: ChatGPT, batches: list, runs: int ):
+    # every run asks for what is not stored yet, as the workflow does with get_only_new
+    pending = [ list( range( len( batch ) ) ) for batch in batches ]
+    usable = 0
+    for __ in range( runs ):
+        for n, batch in enumerate( batches ):
+            if not pending[n]:
+                continue
+            items = [ batch[i] for i in pending[n] ]
+            output = gpt.parse( gpt.complete( gpt.listing( items ), prompt = PROMPT,
+                                              format = gpt.schema( "rewrite", INDEXED, len( items ) ) ) )
+            if gpt.structured:
+                answers = gpt.indexed( output, list( range( len( items ) ) ), [ None ] * len( items ) )
+                answers = gpt.fill( items, answers, prompt = PROMPT )
+                usable += sum( 1 for x in answers if x is not None )
+                pending[n] = [ i for i, x in zip( pending[n], answers ) if x is None ]
+            elif output is not None and len( output ) == len( items ):
+                usable += len( items )
+                pending[n] = [ ]
+    return usable
+
+
+def serve( handler = Stub ):
+    # the stub on a free local port; ChatGPT clients created afterwards talk to it
+    server = ThreadingHTTPServer( ( "127.0.0.1", 0 ), handler )
+    threading.Thread( target = server.serve_forever, daemon = True ).start( )
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ.setdefault( "OPENAI_API_KEY", "stub" )
+    return server
+
+
+def main( ):
+    parser = argparse.ArgumentParser( description = "Rewrites: free text answers vs structured answers with partial re-asks" )
+    parser.add_argument( "--batches", type = int, default = 50 )
+    parser.add_argument( "--size", type = int, default = 20 )
+    parser.add_argument( "--failures", type = float, default = 0.3, help = "share of incomplete answers" )
+    parser.add_argument( "--runs", type = int, default = 3, help = "workflow runs" )
+    args = parser.parse_args( )
+    Stub.failures = args.failures
+    server = serve( )
+    batches = [ [ f"After a long shift at hospital {b}, he said that case {i} was the hardest thing he ever had to explain to the new nurses." for i in range( args.size ) ] for b in range( args.batches ) ]
+    total = args.batches * args.size
+    print( f"{args.batches} batches of {args.size}, {args.failures:.0%} incomplete answers, {args.runs} runs" )
+    print( f"{'output':>10}{'usable':>12}{'requests':>10}{'tokens':>10}{'req/100':>9}{'tok/sent':>10}" )
+    for structured in ( None, "schema" ):
+        Stub.random.seed( 0 )
+        Stub.requests = Stub.tokens = 0
+        gpt = ChatGPT( model = "gpt-4o-mini", structured = structured )
+        gpt.client = gpt.client.with_options( max_retries = 0 )
+        usable = rewrite( gpt, batches, args.runs )
+        print( f"{structured or 'text':>10}{usable:>7}/{total:<4}{Stub.requests:>10}{Stub.tokens:>10}"
+               f"{100 * Stub.requests / max( usable, 1 ):>9.1f}{Stub.tokens / max( usable, 1 ):>10.1f}", flush = True )
+    server.shutdown( )
+
+
+if __name__ == "__main__":
+    main( )
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of throttling as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of throttling
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+# Engine.call and its Limiter against the stub of benchmarks.structured answering 429
+# (with Retry-After) and 503 (without): a 429 is waited out for the header's delay and
+# pauses every worker, other retries back off with jitter, an engine given the account's
+# rpm and tpm stays within what the stub (enforcing them like the API) allows while one
+# without them is throttled, and the token bucket is settled with the reported usage.
+#
+#   python -m benchmarks.throttling --rpm 600 --tpm 12000
+
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+from benchmarks.structured import PROMPT, Stub, serve  # noqa: E402
+from chatgpt import ChatGPT  # noqa: E402
+from engine import Engine, Limiter  # noqa: E402
+
+PARAMS = { "max_tokens": 100 }
+
+
+class LimitedStub( Stub ):
+    # the account's rpm and tpm as token buckets over the served requests and their usage,
+    # a request over them is answered 429 with the time until there is room; `throttled`
+    # requests (by arrival number) get a 429 of `delay` seconds and `unavailable` requests
+    # (by input) a 503 without Retry-After until their `unavailable`-th attempt
+    limiter = None
+    throttled = set( )
+    delay = 0.5
+    unavailable = { }
+    # ( time, input, status, total tokens ) per arrival
+    arrivals = [ ]
+
+    def do_POST( self ):
+        body = json.loads( self.rfile.read( int( self.headers["Content-Length"] ) ) )
+        input = body["messages"][-1]["content"]
+        now = time.monotonic( )
+        with Stub.lock:
+            number = len( LimitedStub.arrivals )
+            attempts = sum( 1 for x in LimitedStub.arrivals if x[1] == input )
+            wait = LimitedStub.delay if number in LimitedStub.throttled else LimitedStub.room( now )
+            status = 429 if wait > 0 else 503 if attempts < LimitedStub.unavailable.get( input, 0 ) else 200
+            LimitedStub.arrivals.append( [ now, input, status, 0 ] )
+        if status == 429:
+            self.reply( { "error": { "message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded" } }, status = 429,
+                        headers = { "retry-after": str( math.ceil( wait ) ), "retry-after-ms": str( int( wait * 1000 ) ) } )
+            return
+        if status == 503:
+            self.reply( { "error": { "message": "Service unavailable" } }, status = 503 )
+            return
+        response = Stub.complete( body )
+        used = response["usage"]["total_tokens"]
+        with Stub.lock:
+            LimitedStub.arrivals[number][3] = used
+            if LimitedStub.limiter is not None:
+                LimitedStub.limiter.requests -= 1
+                LimitedStub.limiter.tokens -= used
+        self.reply( response )
+
+    @staticmethod
+    def room( now: float ):
+        # seconds until both buckets have room for a request (its usage is charged once known)
+        limiter = LimitedStub.limiter
+        if limiter is None:
+            return 0.0
+        limiter._refill( now )
+        wait = 0.0
+        if limiter.rpm and limiter.requests < 1:
+            wait = max( wait, ( 1 - limiter.requests ) * 60.0 / limiter.rpm )
+        if limiter.tpm and limiter.tokens < 0:
+            wait = max( wait, -limiter.tokens * 60.0 / limiter.tpm )
+        return wait
+
+    @staticmethod
+    def reset( limiter: Limiter = None, throttled: set = None, unavailable: dict = None ):
+        LimitedStub.limiter = limiter
+        LimitedStub.throttled = throttled or set( )
+        LimitedStub.unavailable = unavailable or { }
+        LimitedStub.arrivals = [ ]
+
+
+class Recorder( Limiter ):
+    # the times requests got past the limiter and pauses began and ended
+    def __init__( self, rpm: int = None, tpm: int = None ):
+        super( ).__init__( rpm = rpm, tpm = tpm )
+        self.acquired = [ ]
+        self.pauses = [ ]
+
+    def acquire( self, tokens: int = 0 ):
+        super( ).acquire( tokens )
+        self.acquired.append( time.monotonic( ) )
+
+    def pause( self, seconds: float ):
+        now = time.monotonic( )
+        super( ).pause( seconds )
+        self.pauses.append( ( now, self.resume ) )
+
+
+def inputs( gpt: ChatGPT, n: int, tag: str ):
+    return [ gpt.listing( [ f"After the {tag} match he said fan number {i} was the loudest in the stadium." ] ) for i in range( n ) ]
+
+
+def run( engine: Engine, items: list ):
+    gpt = ChatGPT( model = "gpt-4o-mini", engine = engine )
+    start = time.monotonic( )
+    answers = engine.map( lambda x: gpt.complete( x, params = PARAMS, prompt = PROMPT ), items )
+    return sum( 1 for x in answers if x is not None ), time.monotonic( ) - start
+
+
+def retry_after( concurrency: int, n: int, delay: float ):
+    # the 10th request gets a 429: it is sent again after the header's delay, and no worker
+    # gets past the limiter until then (requests let through before the worker had the 429
+    # back and paused the limiter may still arrive)
+    engine = Engine( concurrency = concurrency )
+    engine.backoff = 0.05
+    engine.limiter = Recorder( )
+    LimitedStub.delay = delay
+    LimitedStub.reset( throttled = { 10 } )
+    gpt = ChatGPT( model = "gpt-4o-mini" )
+    answered, __ = run( engine, inputs( gpt, n, "retry" ) )
+    engine.close( )
+    arrivals = LimitedStub.arrivals
+    when, input, __, __ = arrivals[10]
+    again = next( t for t, x, __, __ in arrivals[11:] if x == input )
+    paused, resumed = engine.limiter.pauses[0]
+    acquired = [ t for t in engine.limiter.acquired if paused < t < resumed ]
+    late = [ t for t, __, __, __ in arrivals[11:] if when < t < when + delay ]
+    # got past the limiter before the pause but arrived after the 429 (the 11th arrival)
+    before = sum( 1 for t in engine.limiter.acquired if t < paused ) - 11
+    resent = min( t for t in engine.limiter.acquired if t >= resumed ) - paused
+    print( f"429 with retry-after-ms {delay * 1000:.0f}: paused {resumed - paused:.3f}s, {len( acquired )} let through meanwhile, "
+           f"next after {resent:.3f}s; retried after {again - when:.3f}s, {len( late )} let through before the pause ({paused - when:.3f}s after the 429) arrived late, {answered}/{n} answered" )
+    assert again - when >= delay and resumed - paused >= delay and not acquired and len( late ) == before and answered == n
+
+
+def backoff( concurrency: int, n: int, failures: int ):
+    # 503s without Retry-After: attempt a waits up to backoff * 2 ** a, drawn at random (the
+    # waits seen by the stub include a round trip)
+    engine = Engine( concurrency = concurrency )
+    engine.backoff = 0.5
+    gpt = ChatGPT( model = "gpt-4o-mini" )
+    items = inputs( gpt, n, "backoff" )
+    LimitedStub.reset( unavailable = { x: failures for x in items } )
+    answered, __ = run( engine, items )
+    engine.close( )
+    delays = { }
+    for x in items:
+        times = [ t for t, input, __, __ in LimitedStub.arrivals if input == x ]
+        for attempt, ( before, after ) in enumerate( zip( times, times[1:] ) ):
+            delays.setdefault( attempt, [ ] ).append( after - before )
+    for attempt, values in sorted( delays.items( ) ):
+        bound = min( engine.max_backoff, engine.backoff * 2 ** attempt )
+        print( f"503, retry {attempt + 1}: waited {min( values ):.3f}-{max( values ):.3f}s (bound {bound:.1f}s, "
+               f"spread {statistics.pstdev( values ):.3f}s)" )
+        assert max( values ) <= bound + 0.1 and statistics.pstdev( values ) > bound / 10
+    assert answered == n
+
+
+def budget( concurrency: int, n: int, rpm: int, tpm: int ):
+    # the stub enforces rpm and tpm on the usage it reports; an engine told about them stays
+    # within capacity + rate * t on both and is never throttled, one without is (and may run
+    # out of retries)
+    print( f"{'engine':>10}{'answered':>10}{'429':>6}{'seconds':>9}{'max req':>9}{'max tok':>9}" )
+    for limits in ( { "rpm": rpm, "tpm": tpm }, { } ):
+        # the stub's buckets start full before the engine's, the allowance is counted from the latter
+        LimitedStub.reset( limiter = Limiter( rpm = rpm, tpm = tpm ) )
+        start = time.monotonic( )
+        engine = Engine( concurrency = concurrency, **limits )
+        gpt = ChatGPT( model = "gpt-4o-mini" )
+        answered, seconds = run( engine, inputs( gpt, n, f"budget {bool( limits )}" ) )
+        engine.close( )
+        served = [ ( t, used ) for t, __, status, used in LimitedStub.arrivals if status == 200 ]
+        throttled = sum( 1 for x in LimitedStub.arrivals if x[2] == 429 )
+        # the most of the rpm and tpm allowance up to any point in time that was used
+        requests = max( ( k + 1 ) / ( rpm + rpm * ( t - start ) / 60.0 ) for k, ( t, __ ) in enumerate( served ) )
+        used = 0
+        tokens = 0.0
+        for t, x in served:
+            used += x
+            tokens = max( tokens, used / ( tpm + tpm * ( t - start ) / 60.0 ) )
+        print( f"{'limited' if limits else 'unlimited':>10}{answered:>7}/{n:<3}{throttled:>6}{seconds:>9.2f}{requests:>9.2f}{tokens:>9.2f}" )
+        if limits:
+            assert answered == n and throttled == 0 and requests <= 1.0 and tokens <= 1.0
+        else:
+            assert throttled > 0
+
+
+def usage( n: int, tpm: int ):
+    # the tpm bucket is charged the estimate up front and settled with the reported usage; the
+    # attempts failing with a 503 (two for every fourth request) are refunded
+    engine = Engine( concurrency = 1, tpm = tpm )
+    engine.backoff = 0.05
+    gpt = ChatGPT( model = "gpt-4o-mini" )
+    items = inputs( gpt, n, "usage" )
+    LimitedStub.reset( unavailable = { x: 2 for x in items[::4] } )
+    estimated = sum( Engine.estimate( gpt.request( x, params = PARAMS, prompt = PROMPT ) ) for x in items )
+    start = time.monotonic( )
+    answered, __ = run( engine, items )
+    refill = ( time.monotonic( ) - start ) * tpm / 60.0
+    engine.close( )
+    used = sum( x[3] for x in LimitedStub.arrivals )
+    failed = sum( 1 for x in LimitedStub.arrivals if x[2] == 503 )
+    left = engine.limiter.tokens
+    print( f"tpm {tpm}: {n} requests ({failed} failed attempts) estimated {estimated} tokens, used {used}; bucket left {left:.0f} "
+           f"(tpm - used {tpm - used}, tpm - estimated {tpm - estimated})" )
+    assert answered == n and failed == 2 * len( items[::4] ) and tpm - used <= left <= min( tpm, tpm - used + refill ) + 1
+
+
+def main( ):
+    parser = argparse.ArgumentParser( description = "Engine retries and rate limits against a throttling stub" )
+    parser.add_argument( "--concurrency", type = int, default = 8 )
+    parser.add_argument( "--rpm", type = int, default = 600 )
+    parser.add_argument( "--tpm", type = int, default = 12000 )
+    parser.add_argument( "--requests", type = int, default = 220, help = "requests of the budget runs" )
+    args = parser.parse_args( )
+    Stub.failures = 0.0
+    server = serve( LimitedStub )
+    retry_after( args.concurrency, 64, 0.5 )
+    backoff( args.concurrency, 16, 3 )
+    usage( 20, args.tpm )
+    budget( args.concurrency, args.requests, args.rpm, args.tpm )
+    ChatGPT.close_shared( )
+    server.shutdown( )
+
+
+if __name__ == "__main__":
+    main( )
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of cache as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of cache
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+
+logging.basicConfig( format = "[%(levelname)s - %(name)s] | %(funcName)s %(lineno)s | %(message)s", level = logging.INFO )
+
+MODES = ( "read", "refresh", "offline" )
+
+
+class Cache:
+    # content addressed store of chat completions keyed on model, messages and params.
+    # mode "read" answers from the cache and asks on a miss, "refresh" always asks and
+    # overwrites, "offline" only replays what is stored and never calls the API
+    table = "responses"
+    mode = "read"
+
+    CREATE_TABLE = """CREATE TABLE IF NOT EXISTS {table} (
+        key TEXT PRIMARY KEY,
+        model TEXT,
+        request TEXT NOT NULL,
+        completion TEXT,
+        created TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )"""
+    GET_DATA = """SELECT completion FROM {table} WHERE key = ?"""
+    INSERT_SQL = """INSERT OR REPLACE INTO {table} ( key, model, request, completion ) VALUES ( ?, ?, ?, ? )"""
+
+    def __init__( self, path: str, table: str = None, mode: str = None ):
+        self.log = logging.getLogger( self.__class__.__name__ )
+        if table:
+            self.table = table
+        if mode:
+            if mode not in MODES:
+                raise ValueError( f"Unknown cache mode '{mode}', use one of {MODES}" )
+            self.mode = mode
+        self.lock = threading.Lock( )
+        self.database = sqlite3.connect( path, check_same_thread = False )
+        self.database.execute( self.CREATE_TABLE.format( table = self.table ) )
+        self.database.commit( )
+
+    @staticmethod
+    def request( options: dict ):
+        return json.dumps( options, sort_keys = True, ensure_ascii = False, default = str )
+
+    @staticmethod
+    def key( options: dict ):
+        return hashlib.sha256( Cache.request( options ).encode( "utf-8" ) ).hexdigest( )
+
+    def get( self, key: str ):
+        # the stored completion or None; it is parsed again by the caller, so a change of the
+        # parser applies to cached answers too
+        with self.lock:
+            row = self.database.execute( self.GET_DATA.format( table = self.table ), ( key, ) ).fetchone( )
+        return None if row is None else row[0]
+
+    def put( self, key: str, options: dict, completion: str ):
+        params = ( key, options.get( "model" ), self.request( options ), completion )
+        with self.lock:
+            self.database.execute( self.INSERT_SQL.format( table = self.table ), params )
+            self.database.commit( )
+
+    def close( self ):
+        with self.lock:
+            self.database.close( )
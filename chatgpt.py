@@ -34,42 +34,110 @@ __version__ = "0.01"
 __status__ = "Production"
 __date__ = "06/03/2024"
 
-import ast
+from cache import Cache
+from engine import Engine
+import httpx
+import importlib.util
+import json
 import logging
-import numpy
 import openai
 import os
-import re
+import parsing
+import tempfile
+import threading
+import time
+import uuid
 
 logging.basicConfig( format = "[%(levelname)s - %(name)s] | %(funcName)s %(lineno)s | %(message)s", level = logging.INFO )
 
-ARRAY_STR = re.compile( r'\A[^\[]*[\[]')
-ARRAY_END = re.compile( r'[^]]*\Z')
-PRE_STRING_TERM = re.compile( r"([ [])[']")
-POST_STRING_TERM = re.compile( r"[']([ ,\]])" )
-MID_SEP = re.compile( r'''['"][,][ \n\r]*['"]''' )
-ARRAY_START = re.compile( r'''\A[ ]*[\[]['"]''')
-ARRAY_FINISH = re.compile( r'''['"][ ]*[\]][ ]*\Z''')
-CLEANER = re.compile( r'[\n\t\r]')
-CLEANER2 = re.compile( r'[\n\t\r]+')
-NUM_PREFIX = re.compile( r"""\A[0-9]+[.)][ ]*""")
-UNWANTED = re.compile( r'[\xa0]' )
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_FINAL = ( "completed", "failed", "expired", "cancelled" )
+# HTTP/2 needs the h2 package (httpx[http2]), otherwise connections are HTTP/1.1 keep-alive
+HTTP2 = importlib.util.find_spec( "h2" ) is not None
+# None: free text read by parsing.parse, "json": JSON mode, "schema": JSON schema constrained output
+STRUCTURED = ( None, "json", "schema" )
+# models with JSON schema constrained output (structured outputs), by name prefix, and the
+# snapshots of them without it
+SCHEMA_MODELS = ( "gpt-4o", "gpt-4.1", "gpt-5", "o1", "o3", "o4-mini" )
+NO_SCHEMA_MODELS = ( "gpt-4o-2024-05-13", "o1-mini", "o1-preview" )
+# structured answers are an object with one array of items
+ITEMS = "items"
+STRING = { "type": "string" }
+INDEXED = {
+    "type": "object",
+    "properties": { "index": { "type": "integer" }, "text": { "type": "string" } },
+    "required": [ "index", "text" ],
+    "additionalProperties": False,
+}
+TRIPLET = {
+    "type": "object",
+    "properties": { "topic": { "type": "string" }, "id-term": { "type": "string" }, "concept-term": { "type": "string" } },
+    "required": [ "topic", "id-term", "concept-term" ],
+    "additionalProperties": False,
+}
 
 class ChatGPT:
     model = "gpt-3.5-turbo"
     client = None
+    engine = None
+    cache = None
     result = None
+    batch_limit = 50000
     prompt = []
+    structured = None
+    format = None
+    # partial re-asks of the items missing from an indexed answer (see fill)
+    retries = 2
+    # one process wide API client and connection pool, shared by all instances (see shared)
+    connections = 64
+    _shared = None
+    _shared_lock = threading.Lock( )
 
-    def __init__( self, prompt: list = None, model: str = "gpt-3.5-turbo" ):
+    def __init__( self, prompt: list = None, model: str = "gpt-3.5-turbo", engine: Engine = None, cache: Cache = None,
+                  structured: str = None, format: dict = None ):
         self.model = model
+        ChatGPT.check( model, structured )
+        self.structured = structured
+        if format:
+            self.format = format
         key = "" or os.environ["OPENAI_API_KEY"]
-        self.client = openai.OpenAI( api_key = key )
+        self.engine = engine
+        self.cache = cache
+        # with an engine, retries are done there with the rate limiter in the loop; the copy
+        # with these options still uses the shared connection pool
+        self.client = ChatGPT.shared( key ).with_options( max_retries = 0 if engine else 2 )
         self.log = logging.getLogger( self.__class__.__name__ )
         if prompt:
             self.prompt = prompt
         self.log.debug( self.prompt )
 
+    @staticmethod
+    def check( model: str, structured: str = None ):
+        # a model rejecting json_schema would fail every request of the run
+        if structured not in STRUCTURED:
+            raise ValueError( f"Unknown structured output '{structured}', use one of {STRUCTURED}" )
+        if structured == "schema" and ( not model.startswith( SCHEMA_MODELS ) or model.startswith( NO_SCHEMA_MODELS ) ):
+            raise ValueError( f"Model '{model}' does not support JSON schema output, use e.g. gpt-4o-mini or --structured json" )
+
+    @classmethod
+    def shared( cls, key: str = None ):
+        # the process wide client: pooled keep-alive connections (HTTP/2 if available), so
+        # the TLS handshake and the client setup are paid once, not per instance or request
+        with cls._shared_lock:
+            if cls._shared is None:
+                limits = httpx.Limits( max_connections = cls.connections, max_keepalive_connections = cls.connections,
+                                       keepalive_expiry = 120 )
+                cls._shared = openai.OpenAI( api_key = key or os.environ["OPENAI_API_KEY"],
+                                             http_client = openai.DefaultHttpxClient( http2 = HTTP2, limits = limits ) )
+            return cls._shared
+
+    @classmethod
+    def close_shared( cls ):
+        with cls._shared_lock:
+            if cls._shared is not None:
+                cls._shared.close( )
+                cls._shared = None
+
     @staticmethod
     def message( role, message ):
         return { "role": role, "content": message }
@@ -86,73 +154,271 @@ class ChatGPT:
     def context( msg ):
         return ChatGPT.message( role = "system", message = msg )
 
-    def cleaner( self, msg ):
-        sentences = UNWANTED.sub( repl = " ", string = ARRAY_END.sub( repl = "", string = ARRAY_STR.sub( repl = "[", string = msg ) ) )
-        try:
-            x = ast.literal_eval( f"""{sentences}""" )
-            x = list( numpy.asarray( x ).flatten( ) )
-            self.result = x
-            return x
-        except Exception as error:
-            pass
+    @staticmethod
+    def schema( name: str, item: dict, n: int = None ):
+        # response format of an object with an array of n (or any number of) items
+        array = { "type": "array", "items": item }
+        if n:
+            array |= { "minItems": n, "maxItems": n }
+        return { "type": "json_schema", "json_schema": { "name": name, "strict": True, "schema": {
+            "type": "object", "properties": { ITEMS: array }, "required": [ ITEMS ], "additionalProperties": False } } }
+
+    def listing( self, items: list, indices: list = None ):
+        # the input of a rewrite request: with structured output every item carries its index,
+        # so an answer can be matched item by item
+        indices = range( len( items ) ) if indices is None else indices
+        if self.structured:
+            return json.dumps( [ { "index": i, "text": items[i] } for i in indices ], ensure_ascii = False, separators = ( ",", ":" ) )
+        return f'''["{'", "'.join( items[i] for i in indices )}"]'''
+
+    @staticmethod
+    def targeted( targets: list ):
+        # item of a rewrite to several targets at once: index, target and text
+        return { "type": "object",
+                 "properties": { "index": { "type": "integer" }, "target": { "type": "string", "enum": list( targets ) },
+                                 "text": { "type": "string" } },
+                 "required": [ "index", "target", "text" ], "additionalProperties": False }
+
+    def rewrite( self, indices: list, targets: list = None ):
+        # response format of a rewrite of the items at indices (to each of targets)
+        if targets:
+            return self.schema( "rewrite", self.targeted( targets ), len( indices ) * len( targets ) )
+        return self.schema( "rewrite", INDEXED, len( indices ) )
 
-        # sentences = ARRAY_END.sub( repl = "", string = ARRAY_STR.sub( repl = "[", string = msg ) )
-        if len( sentences ):
-            if len( MID_SEP.findall( sentences ) ) > 0:
-                sentences = CLEANER.sub( repl = " ", string = sentences )
+    @staticmethod
+    def indexed( output, indices: list, answers: list, target: str = None ):
+        # fills answers from an indexed output; plain strings count only if all asked items are
+        # there. With a target, only its items count: { target: [ ... ] } or index/target/text
+        if not output:
+            return answers
+        if target is not None:
+            if len( output ) == 1 and isinstance( output[0], dict ) and "index" not in output[0]:
+                output = output[0].get( target )
+                output = parsing.flatten( output ) if isinstance( output, list ) else None
+                if not output:
+                    return answers
             else:
-                sentences = CLEANER2.sub( repl = ", ", string = sentences )
-            # self.log.debug( sentences )
-            # sentences = POST_STRING_TERM.sub( '"\\1', PRE_STRING_TERM.sub( '\\1"', sentences ) )
-            sentences = ARRAY_FINISH.sub( repl = '"]', string = ARRAY_START.sub( repl = '["', string = sentences ) )
-            sentences = MID_SEP.sub( repl = '", "', string = sentences )
-            # self.log.debug( sentences )
-            try:
-                x = ast.literal_eval( f"""{sentences}""" )
-                x = list( numpy.asarray( x ).flatten( ) )
-                self.result = x
-                return self.result
-            except Exception as error:
-                self.log.error( error )
-                self.log.error( msg )
-                return None
+                output = [ x for x in output if isinstance( x, dict ) and x.get( "target" ) == target ]
+        asked = set( indices )
+        if all( isinstance( x, str ) for x in output ):
+            if len( output ) == len( indices ):
+                for i, x in zip( indices, output ):
+                    answers[i] = x or None
+            return answers
+        for x in output:
+            if isinstance( x, dict ) and x.get( "index" ) in asked and isinstance( x.get( "text" ), str ) and x["text"].strip( ):
+                answers[x["index"]] = x["text"]
+        return answers
+
+    def answers( self, parts: list, n: int, targets: list = None ):
+        # answers of a rewrite of n items in item order from its ( indices, completion ) parts
+        # (see complete_parts), { target: answers } with targets; items of an unusable part are None
+        answers = { target: [ None ] * n for target in targets or [ None ] }
+        for indices, completion in parts:
+            output = self.parse( completion )
+            for target, values in answers.items( ):
+                self.indexed( output, indices, values, target = target )
+            if not self.structured and not targets and ( output is None or len( output ) != len( indices ) ):
+                self.log.error( f"Size mismatch: {len( output or [ ] )} answers to {len( indices )} items" )
+        return answers if targets else answers[None]
+
+    def fill( self, items: list, answers: list, params: dict = None, model = None, prompt: list = None ):
+        # re-asks only for the items missing from answers (up to `retries` times); the ones
+        # still missing stay None
+        for __ in range( self.retries ):
+            missing = [ i for i, x in enumerate( answers ) if x is None ]
+            if not missing or self.client is None:
+                break
+            self.log.info( f"Re-asking {len( missing )} of {len( items )} items" )
+            partial = self.ask( self.listing( items, missing ), params = params, model = model, prompt = prompt,
+                                format = self.rewrite( missing ) )
+            self.indexed( partial, missing, answers )
+        return answers
+
+    def cleaner( self, msg ):
+        output = parsing.parse( msg )
+        if output and len( output ) == 1 and isinstance( output[0], dict ) and ITEMS in output[0]:
+            # a structured answer
+            output = parsing.flatten( output[0][ITEMS] if isinstance( output[0][ITEMS], list ) else [ output[0][ITEMS] ] ) or None
+        if output is None:
+            self.log.error( f"NO OUTPUT: {msg}" )
+        elif '[' not in msg and '{' not in msg:
+            self.log.warning( f"NO ARRAY: {msg}\n\t{output}" )
+        self.result = output
+        return output
+
+    def request( self, input, params: dict = None, model = None, prompt: list = None, format: dict = None, system: str = None ):
+        messages = ( prompt or self.prompt ).copy()
+        if system is not None:
+            # the same examples under another system message
+            messages = [ ChatGPT.context( system ) ] + [ m for m in messages if m["role"] != "system" ]
+        default = { "model": model or self.model, "messages": messages, "max_tokens": 2048 }
+        format = format or self.format
+        if self.structured == "schema" and format:
+            default["response_format"] = format
+        elif self.structured == "json" and format:
+            # JSON mode does not take a schema, it is told in the prompt instead
+            schema = format["json_schema"]["schema"]
+            messages.append( ChatGPT.context( f"Answer with a JSON object matching this JSON schema: {json.dumps( schema )}" ) )
+            default["response_format"] = { "type": "json_object" }
+        messages.append( ChatGPT.input( input ) )
+        return default | params if params else default
+
+    def _fetch( self, options: dict ):
+        # ( cache key, completion, whether it came from the API, whether it was cut at max_tokens )
+        key = None
+        if self.cache is not None:
+            key = self.cache.key( options )
+            completion = self.cache.get( key ) if self.cache.mode != "refresh" else None
+            if completion is not None:
+                if getattr( self.engine, "metrics", None ) is not None:
+                    self.engine.metrics.add( "cache.hits" )
+                return key, completion, False, False
+            if self.cache.mode == "offline":
+                self.log.warning( f"Not in cache: {options['messages'][-1]['content']}" )
+                return key, None, False, False
+        if self.engine is not None:
+            response = self.engine.call( self.client.chat.completions.create, options )
         else:
-            output = [ NUM_PREFIX.sub( repl = '', string = x  ) for x in CLEANER2.split( msg ) ]
-            self.result = output
-            self.log.warning( f"NO OUTPUT: {msg}\n\t{output}" )
-            return output
-        # return None
+            response = self.client.chat.completions.create( **options )
+        completion = response.choices[0].message.content if response.choices else None
+        truncated = bool( response.choices ) and response.choices[0].finish_reason == "length"
+        return key, completion, True, truncated
 
-    def ask( self, input, params: dict = None, model = None ):
+    def ask( self, input, params: dict = None, model = None, prompt: list = None, format: dict = None, system: str = None ):
         if self.client is None:
             return None
-        messages = self.prompt.copy()
-        messages.append( ChatGPT.input( input ) )
-        default = { "model": model or self.model, "messages": messages, "max_tokens": 2048 }
-        options = default | params if params else default
+        options = self.request( input, params = params, model = model, prompt = prompt, format = format, system = system )
         self.log.debug( options )
         try:
-            response = self.client.chat.completions.create( **options )
-            return self.process( response )
+            key, completion, fresh, __truncated = self._fetch( options )
         except Exception as error:
             self.log.error( error )
             self.log.info( options )
             return None
+        if fresh and key is not None and completion is not None:
+            self.cache.put( key, options, completion )
+        return self.parse( completion )
         # return None
 
+    def complete( self, input, params: dict = None, model = None, prompt: list = None, format: dict = None, system: str = None ):
+        # the raw completion only, for callers which parse elsewhere (see Pipeline)
+        if self.client is None:
+            return None
+        options = self.request( input, params = params, model = model, prompt = prompt, format = format, system = system )
+        try:
+            key, completion, fresh, __truncated = self._fetch( options )
+        except Exception as error:
+            self.log.error( error )
+            self.log.info( options )
+            return None
+        if fresh and key is not None and completion is not None:
+            self.cache.put( key, options, completion )
+        return completion
+
+    def complete_parts( self, items: list, params: dict = None, model = None, prompt: list = None, indices: list = None,
+                        targets: list = None ):
+        # raw completions of a rewrite (to each of targets) as ( indices, completion ) parts: an
+        # answer cut at max_tokens is not kept, its items are asked again in two halves
+        indices = list( range( len( items ) ) ) if indices is None else indices
+        if self.client is None or not indices:
+            return [ ]
+        options = self.request( self.listing( items, indices ), params = params, model = model, prompt = prompt,
+                                format = self.rewrite( indices, targets ) )
+        try:
+            key, completion, fresh, truncated = self._fetch( options )
+        except Exception as error:
+            self.log.error( error )
+            self.log.info( options )
+            return [ ( indices, None ) ]
+        if truncated and len( indices ) > 1:
+            half = len( indices ) // 2
+            self.log.info( f"Answer cut at max_tokens, asking {len( indices )} items in two parts" )
+            return self.complete_parts( items, params = params, model = model, prompt = prompt, indices = indices[:half], targets = targets ) + \
+                self.complete_parts( items, params = params, model = model, prompt = prompt, indices = indices[half:], targets = targets )
+        if fresh and key is not None and completion is not None and not truncated:
+            self.cache.put( key, options, completion )
+        return [ ( indices, completion ) ]
+
+    def ask_many( self, inputs: list, params: dict = None, model = None ):
+        # answers in the order of the inputs; concurrent when there is an engine
+        if self.engine is None:
+            return [ self.ask( input, params = params, model = model ) for input in inputs ]
+        return self.engine.map( lambda input: self.ask( input, params = params, model = model ), inputs )
+
+    def batch( self, requests: dict, folder: str = None, poll: float = 60.0 ):
+        # requests: custom id -> options (see request()); answers are returned by custom id.
+        # Cached answers are not sent again, the rest goes through the Batch API
+        results = { }
+        keys = { }
+        lines = [ ]
+        for custom_id, options in requests.items( ):
+            if self.cache is not None:
+                keys[custom_id] = self.cache.key( options )
+                completion = self.cache.get( keys[custom_id] ) if self.cache.mode != "refresh" else None
+                if completion is not None:
+                    results[custom_id] = self.parse( completion )
+                    continue
+                if self.cache.mode == "offline":
+                    continue
+            lines.append( { "custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": options } )
+        self.log.info( f"{len( lines )} requests to submit, {len( results )} from cache" )
+        for lower in range( 0, len( lines ), self.batch_limit ):
+            for custom_id, content in self._batch( lines[lower:lower + self.batch_limit], folder = folder, poll = poll ).items( ):
+                results[custom_id] = self.parse( content )
+                if custom_id in keys and content is not None:
+                    self.cache.put( keys[custom_id], requests[custom_id], content )
+        return results
+
+    def _batch( self, lines: list, folder: str = None, poll: float = 60.0 ):
+        path = os.path.join( folder or tempfile.gettempdir( ), f"batch-{uuid.uuid4( ).hex}.jsonl" )
+        with open( path, "w", encoding = "utf-8" ) as f:
+            for line in lines:
+                f.write( json.dumps( line, ensure_ascii = False ) + "\n" )
+        with open( path, "rb" ) as f:
+            uploaded = self.client.files.create( file = f, purpose = "batch" )
+        job = self.client.batches.create( input_file_id = uploaded.id, endpoint = BATCH_ENDPOINT, completion_window = "24h" )
+        self.log.info( f"Batch {job.id} submitted from {path}" )
+        while job.status not in BATCH_FINAL:
+            time.sleep( poll )
+            job = self.client.batches.retrieve( job.id )
+            self.log.debug( f"Batch {job.id}: {job.status} {job.request_counts}" )
+        self.log.info( f"Batch {job.id}: {job.status} {job.request_counts}" )
+        if job.error_file_id:
+            self.log.error( self.client.files.content( job.error_file_id ).text )
+        contents = { }
+        if not job.output_file_id:
+            return contents
+        for line in self.client.files.content( job.output_file_id ).text.splitlines( ):
+            if not line.strip( ):
+                continue
+            item = json.loads( line )
+            response = item.get( "response" ) or { }
+            choices = ( response.get( "body" ) or { } ).get( "choices" ) or [ ]
+            if response.get( "status_code" ) != 200 or not choices:
+                self.log.error( f"{item.get( 'custom_id' )}: {item.get( 'error' ) or response}" )
+                continue
+            contents[item["custom_id"]] = choices[0]["message"]["content"]
+        return contents
+
     def process( self, response ):
         for i in response.choices:
-            try:
-                msg = self.pre_process( i.message.content )
-                out = self.post_process( msg )
-                # x = ast.literal_eval( test )
-                return out
-            except Exception as error:
-                self.log.error( error )
-                self.log.info( i.message.content )
-                return None
+            return self.parse( i.message.content )
         pass
 
+    def parse( self, content ):
+        if content is None:
+            return None
+        try:
+            msg = self.pre_process( content )
+            out = self.post_process( msg )
+            # x = ast.literal_eval( test )
+            return out
+        except Exception as error:
+            self.log.error( error )
+            self.log.info( content )
+            return None
+
     def pre_process( self, msg ):
         return self.cleaner( msg )
 
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of dag as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of dag
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import contextlib
+import logging
+import time
+
+from tasks import Metrics, Stages
+
+logging.basicConfig( format = "[%(levelname)s - %(name)s] | %(funcName)s %(lineno)s | %(message)s", level = logging.INFO )
+
+
+class Stage:
+    # one step of the workflow: run( bias_type ) for every bias type, or run( ) once if not
+    # per_bias. A stage is stale if it has never finished, its signature changed, one of the
+    # stages after which it runs finished later, or pending( bias_type ) counts input rows it
+    # has not processed yet (an incremental stage may finish with failed requests or dropped
+    # rows left over). Stages of the same group never run at the same time (e.g. model
+    # inference); `always` stages run whenever they are selected
+    def __init__( self, name: str, run, after: list = None, per_bias: bool = True, table: str = None, group: str = None,
+                  signature: str = "", always: bool = False, pending = None ):
+        self.name = name
+        self.run = run
+        self.after = after or [ ]
+        self.per_bias = per_bias
+        self.table = table
+        self.group = group
+        self.signature = signature
+        self.always = always
+        self.pending = pending
+
+
+class Runner:
+    # runs the selected stages with the stale ones among the stages they depend on, in
+    # dependency order; independent stages and bias types run in parallel threads
+    workers = 4
+
+    def __init__( self, stages: list, bias_types: list, record: Stages, aliases: dict = None, workers: int = None,
+                  metrics: Metrics = None ):
+        self.log = logging.getLogger( self.__class__.__name__ )
+        self.stages = { stage.name: stage for stage in stages }
+        self.bias_types = list( bias_types )
+        self.record = record
+        self.aliases = aliases or { }
+        self.metrics = metrics
+        if workers:
+            self.workers = workers
+        for stage in stages:
+            unknown = [ name for name in stage.after if name not in self.stages ]
+            if unknown:
+                raise ValueError( f"Stage '{stage.name}' runs after unknown stages {unknown}" )
+
+    def expand( self, targets: list ):
+        names = [ ]
+        for target in targets:
+            for name in self.aliases.get( target, [ target ] ):
+                if name not in self.stages:
+                    raise ValueError( f"Unknown stage '{name}', use one of {list( self.stages ) + list( self.aliases )}" )
+                names.append( name )
+        return names
+
+    def _deps( self, node, bias_types: list ):
+        name, bias_type = node
+        deps = [ ]
+        for after in self.stages[name].after:
+            if not self.stages[after].per_bias:
+                deps.append( ( after, "" ) )
+            elif bias_type:
+                deps.append( ( after, bias_type ) )
+            else:
+                deps.extend( ( after, b ) for b in bias_types )
+        return deps
+
+    def plan( self, targets: list, bias_types: list = None, only: bool = False ):
+        # node -> nodes it waits for, node = ( stage, bias type or '' )
+        bias_types = bias_types or self.bias_types
+        nodes = { }
+        todo = [ ( name, b ) for name in self.expand( targets ) for b in ( bias_types if self.stages[name].per_bias else [ "" ] ) ]
+        selected = set( todo )
+        while todo:
+            node = todo.pop( )
+            if node in nodes:
+                continue
+            deps = self._deps( node, bias_types )
+            nodes[node] = [ d for d in deps if not only or d in selected ]
+            if not only:
+                todo.extend( deps )
+        return nodes
+
+    def stale( self, node ):
+        name, bias_type = node
+        stage = self.stages[name]
+        if stage.always:
+            return "always"
+        last = self.record.last( name, bias_type )
+        if last is None:
+            return "never finished"
+        signature, finished = last
+        if signature != stage.signature:
+            return "settings changed"
+        for dep in self._deps( node, self.bias_types ):
+            before = self.record.last( *dep )
+            if before is not None and before[1] > finished:
+                return f"{dep[0]} {dep[1]} is newer".strip( )
+        if stage.pending is not None:
+            pending = stage.pending( bias_type )
+            if pending:
+                return f"{pending} rows pending"
+        return None
+
+    def adopt( self, node ):
+        # outputs made before the stages were recorded count as a finished run
+        name, bias_type = node
+        stage = self.stages[name]
+        if stage.table and self.record.last( name, bias_type ) is None and self.record.has_data( stage.table, bias_type ):
+            self.record.done( name, bias_type, signature = stage.signature )
+            self.log.info( f"{name} {bias_type}: existing output in {stage.table} recorded as done" )
+
+    def execute( self, node, force: bool = False, touch: bool = False ):
+        name, bias_type = node
+        stage = self.stages[name]
+        if not force and not touch:
+            self.adopt( node )
+            reason = self.stale( node )
+            if reason is None:
+                self.log.info( f"{name} {bias_type}: up to date" )
+                return False
+            self.log.info( f"{name} {bias_type}: {reason}" )
+        start = time.perf_counter( )
+        if not touch:
+            with self.metrics.scope( name, bias_type ) if self.metrics is not None else contextlib.nullcontext( ):
+                stage.run( bias_type ) if stage.per_bias else stage.run( )
+                elapsed = time.perf_counter( ) - start
+                if self.metrics is not None:
+                    self.metrics.add( "stage.seconds", elapsed )
+        elapsed = time.perf_counter( ) - start
+        self.record.done( name, bias_type, signature = stage.signature, seconds = elapsed )
+        self.log.info( f"{name} {bias_type}: {'marked as done' if touch else f'finished in {elapsed:.1f}s'}" )
+        return True
+
+    def status( self, targets: list, bias_types: list = None, only: bool = False ):
+        nodes = self.plan( targets, bias_types = bias_types, only = only )
+        return { node: self.stale( node ) for node in nodes }
+
+    def run( self, targets: list, bias_types: list = None, only: bool = False, force: bool = False, touch: bool = False ):
+        # returns the failed and the skipped nodes
+        nodes = self.plan( targets, bias_types = bias_types, only = only )
+        children = { node: [ ] for node in nodes }
+        waiting = { }
+        for node, deps in nodes.items( ):
+            waiting[node] = len( deps )
+            for dep in deps:
+                children[dep].append( node )
+        ready = [ node for node, count in waiting.items( ) if count == 0 ]
+        running = { }
+        busy = set( )
+        failed = [ ]
+        skipped = set( )
+        self.log.info( f"{len( nodes )} stages to check with {self.workers} workers" )
+        with ThreadPoolExecutor( max_workers = self.workers ) as pool:
+            while ready or running:
+                for node in list( ready ):
+                    if len( running ) >= self.workers:
+                        break
+                    group = self.stages[node[0]].group
+                    if group and group in busy:
+                        continue
+                    ready.remove( node )
+                    if group:
+                        busy.add( group )
+                    running[pool.submit( self.execute, node, force, touch )] = node
+                finished, __ = wait( running, return_when = FIRST_COMPLETED )
+                for future in finished:
+                    node = running.pop( future )
+                    busy.discard( self.stages[node[0]].group )
+                    error = future.exception( )
+                    if error is not None:
+                        self.log.error( f"{node[0]} {node[1]}: {error!r}", exc_info = error )
+                        failed.append( node )
+                        todo = list( children[node] )
+                        while todo:
+                            child = todo.pop( )
+                            if child not in skipped:
+                                skipped.add( child )
+                                todo.extend( children[child] )
+                        continue
+                    for child in children[node]:
+                        waiting[child] -= 1
+                        if waiting[child] == 0 and child not in skipped:
+                            ready.append( child )
+        for node in skipped:
+            self.log.warning( f"{node[0]} {node[1]}: skipped after a failed dependency" )
+        return failed, sorted( skipped )
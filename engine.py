@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of engine as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of engine
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import logging
+import openai
+import random
+import threading
+import time
+
+logging.basicConfig( format = "[%(levelname)s - %(name)s] | %(funcName)s %(lineno)s | %(message)s", level = logging.INFO )
+
+RETRY_STATUS = { 408, 409, 429, 500, 502, 503, 504 }
+
+
+class Limiter:
+    # requests-per-minute and tokens-per-minute budget as two token buckets refilled
+    # continuously; acquire() blocks until both have room, pause() stops everyone
+    def __init__( self, rpm: int = None, tpm: int = None ):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = float( rpm or 0 )
+        self.tokens = float( tpm or 0 )
+        self.updated = time.monotonic( )
+        self.resume = 0.0
+        self.lock = threading.Condition( )
+
+    def _refill( self, now ):
+        elapsed = now - self.updated
+        self.updated = now
+        if self.rpm:
+            self.requests = min( self.rpm, self.requests + elapsed * self.rpm / 60.0 )
+        if self.tpm:
+            self.tokens = min( self.tpm, self.tokens + elapsed * self.tpm / 60.0 )
+
+    def acquire( self, tokens: int = 0 ):
+        if self.tpm:
+            tokens = min( tokens, self.tpm )
+        with self.lock:
+            while True:
+                now = time.monotonic( )
+                self._refill( now )
+                wait = self.resume - now
+                if self.rpm and self.requests < 1:
+                    wait = max( wait, ( 1 - self.requests ) * 60.0 / self.rpm )
+                if self.tpm and self.tokens < tokens:
+                    wait = max( wait, ( tokens - self.tokens ) * 60.0 / self.tpm )
+                if wait <= 0:
+                    break
+                self.lock.wait( timeout = wait )
+            if self.rpm:
+                self.requests -= 1
+            if self.tpm:
+                self.tokens -= tokens
+
+    def settle( self, estimated: int, used: int ):
+        # correct the token bucket once the real usage of a request is known
+        if not self.tpm or used is None:
+            return
+        with self.lock:
+            self.tokens = min( self.tpm, self.tokens + estimated - used )
+            self.lock.notify_all( )
+
+    def pause( self, seconds: float ):
+        with self.lock:
+            self.resume = max( self.resume, time.monotonic( ) + seconds )
+
+
+class Engine:
+    # keeps up to `concurrency` requests in flight under a rate limit; rate limited and
+    # transient failures are retried after Retry-After or a jittered exponential backoff
+    concurrency = 8
+    retries = 6
+    backoff = 1.0
+    max_backoff = 60.0
+
+    def __init__( self, concurrency: int = None, rpm: int = None, tpm: int = None, retries: int = None, metrics = None ):
+        self.log = logging.getLogger( self.__class__.__name__ )
+        # optional tasks.Metrics: requests, latency, retries, throttling and token usage
+        self.metrics = metrics
+        if concurrency:
+            self.concurrency = concurrency
+        if retries is not None:
+            self.retries = retries
+        self.limiter = Limiter( rpm = rpm, tpm = tpm )
+        self.executor = ThreadPoolExecutor( max_workers = self.concurrency )
+
+    @staticmethod
+    def estimate( options: dict ):
+        # rough token count: ~4 characters per token for the prompt, plus the completion limit
+        prompt = sum( len( str( m.get( "content", "" ) ) ) for m in options.get( "messages", [ ] ) ) // 4
+        return prompt + options.get( "max_tokens", 0 )
+
+    @staticmethod
+    def retry_after( error ):
+        headers = getattr( getattr( error, "response", None ), "headers", None ) or { }
+        try:
+            if "retry-after-ms" in headers:
+                return float( headers["retry-after-ms"] ) / 1000.0
+            if "retry-after" in headers:
+                return float( headers["retry-after"] )
+        except ( TypeError, ValueError ):
+            pass
+        return None
+
+    @staticmethod
+    def retryable( error ):
+        if isinstance( error, ( openai.APIConnectionError, openai.APITimeoutError ) ):
+            return True
+        return getattr( error, "status_code", None ) in RETRY_STATUS
+
+    def call( self, fn, options: dict ):
+        estimated = self.estimate( options )
+        metrics = self.metrics
+        for attempt in range( self.retries + 1 ):
+            start = time.perf_counter( )
+            self.limiter.acquire( estimated )
+            sent = time.perf_counter( )
+            if metrics is not None:
+                metrics.add( "limiter.seconds", sent - start )
+                metrics.add( "request.count" )
+            try:
+                response = fn( **options )
+            except Exception as error:
+                # a failed or throttled request used no tokens, the next attempt acquires them again
+                self.limiter.settle( estimated, 0 )
+                if metrics is not None:
+                    metrics.observe( "request.latency", time.perf_counter( ) - sent )
+                if attempt >= self.retries or not self.retryable( error ):
+                    if metrics is not None:
+                        metrics.add( "request.errors" )
+                    raise
+                if metrics is not None:
+                    metrics.add( "request.retries" )
+                delay = self.retry_after( error )
+                if delay is None:
+                    delay = random.uniform( 0, min( self.max_backoff, self.backoff * 2 ** attempt ) )
+                else:
+                    delay += random.uniform( 0, self.backoff )
+                if getattr( error, "status_code", None ) == 429:
+                    self.limiter.pause( delay )
+                self.log.warning( f"Retry {attempt + 1}/{self.retries} in {delay:.1f}s: {error}" )
+                time.sleep( delay )
+                continue
+            usage = getattr( response, "usage", None )
+            self.limiter.settle( estimated, getattr( usage, "total_tokens", None ) )
+            if metrics is not None:
+                metrics.observe( "request.latency", time.perf_counter( ) - sent )
+                if usage is not None:
+                    metrics.add( "tokens.prompt", getattr( usage, "prompt_tokens", 0 ) or 0, label = options.get( "model", "" ) )
+                    metrics.add( "tokens.completion", getattr( usage, "completion_tokens", 0 ) or 0, label = options.get( "model", "" ) )
+            return response
+
+    def submit( self, fn, *args ):
+        # the context goes along, so the work is measured for the caller's stage
+        return self.executor.submit( contextvars.copy_context( ).run, fn, *args )
+
+    def map( self, fn, items: list ):
+        futures = [ self.submit( fn, item ) for item in items ]
+        return [ future.result( ) for future in futures ]
+
+    def close( self ):
+        self.executor.shutdown( wait = True )
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of parsing as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of parsing
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+import re
+
+# Tolerant parser of the Python/JSON-ish arrays (and the termdefs dict shape) in chat
+# completions. One left to right pass over the text: string bodies are skipped with
+# str.find, so no per character Python work is done inside them. It accepts
+#   - text before the first bracket and after the last one
+#   - single, double and typographic quotes, apostrophes inside quoted strings (a quote
+#     only closes a string if a separator follows it), escaped quotes
+#   - missing commas between items on separate lines, trailing and doubled commas
+#   - unquoted items, numbers and constants (true/false/null/None)
+#   - several arrays in a row (their items are concatenated)
+#   - truncated output: the complete items are kept, an unfinished one is dropped
+# Without any bracket the text is read as one item per line (numbering, bullets and
+# surrounding quotes removed).
+
+SKIP = re.compile( r'[\s,]*' )
+SPACE = re.compile( r'\s*' )
+BARE = re.compile( r'[^,\]}\n]*' )
+BARE_KEY = re.compile( r'[^:,\]}\n]*' )
+NUMBER = re.compile( r'-?\d+(\.\d+)?([eE][-+]?\d+)?\Z' )
+WHITESPACE = re.compile( r'[\s\xa0]+' )
+ESCAPE = re.compile( r'\\(u[0-9a-fA-F]{4}|.)', re.DOTALL )
+LINE_PREFIX = re.compile( r'''\A\s*(?:[0-9]+[.):]|[-*•])?\s*''' )
+QUOTES = { '"': '"', "'": "'", '“': '”', '‘': '’', '”': '”' }
+SEPARATORS = ',]}:'
+CONSTANTS = { "true": True, "false": False, "null": None, "none": None }
+ESCAPES = { "n": " ", "t": " ", "r": " ", "\\": "\\", '"': '"', "'": "'", "/": "/" }
+_INCOMPLETE = object( )
+
+
+def _unescape( match ):
+    code = match.group( 1 )
+    if len( code ) == 5:
+        return chr( int( code[1:], 16 ) )
+    return ESCAPES.get( code, code )
+
+
+class _Parser:
+    __slots__ = ( "text", "n", "pos" )
+
+    def __init__( self, text: str ):
+        self.text = text
+        self.n = len( text )
+        self.pos = 0
+
+    def value( self ):
+        text = self.text
+        self.pos = SPACE.match( text, self.pos ).end( )
+        if self.pos >= self.n:
+            return _INCOMPLETE
+        c = text[self.pos]
+        if c == '[':
+            return self.array( )
+        if c == '{':
+            return self.object( )
+        if c in QUOTES:
+            return self.string( QUOTES[c] )
+        return self.bare( BARE )
+
+    def array( self ):
+        text = self.text
+        self.pos += 1
+        items = [ ]
+        while True:
+            self.pos = SKIP.match( text, self.pos ).end( )
+            if self.pos >= self.n:
+                return items
+            c = text[self.pos]
+            if c == ']' or c == '}':
+                self.pos += 1
+                return items
+            item = self.value( )
+            if item is _INCOMPLETE:
+                return items
+            items.append( item )
+
+    def object( self ):
+        text = self.text
+        self.pos += 1
+        items = { }
+        while True:
+            self.pos = SKIP.match( text, self.pos ).end( )
+            if self.pos >= self.n:
+                return items
+            c = text[self.pos]
+            if c == '}' or c == ']':
+                self.pos += 1
+                return items
+            key = self.string( QUOTES[c] ) if c in QUOTES else self.bare( BARE_KEY )
+            if key is _INCOMPLETE:
+                return items
+            self.pos = SPACE.match( text, self.pos ).end( )
+            if self.pos < self.n and text[self.pos] == ':':
+                self.pos += 1
+            item = self.value( )
+            if item is _INCOMPLETE:
+                return items
+            items[key] = item
+
+    def string( self, close: str ):
+        text = self.text
+        start = self.pos + 1
+        search = start
+        while True:
+            end = text.find( close, search )
+            if end < 0:
+                self.pos = self.n
+                return _INCOMPLETE
+            search = end + 1
+            # an escaped quote does not close the string
+            backslashes = 0
+            while text[end - 1 - backslashes] == '\\' and end - 1 - backslashes >= start:
+                backslashes += 1
+            if backslashes % 2:
+                continue
+            after = SPACE.match( text, end + 1 ).end( )
+            if after >= self.n or text[after] in SEPARATORS:
+                break
+            # a missing comma between items on separate lines
+            if text[after] in QUOTES and '\n' in text[end + 1:after]:
+                break
+        self.pos = end + 1
+        value = text[start:end]
+        if '\\' in value:
+            value = ESCAPE.sub( _unescape, value )
+        if '\n' in value or '\t' in value or '\r' in value or '\xa0' in value:
+            value = WHITESPACE.sub( ' ', value )
+        return value
+
+    def bare( self, pattern ):
+        match = pattern.match( self.text, self.pos )
+        self.pos = match.end( )
+        if self.pos >= self.n and pattern is BARE_KEY:
+            return _INCOMPLETE
+        value = match.group( ).strip( )
+        if self.pos >= self.n and value:
+            # an unquoted item at the very end may be cut short
+            return _INCOMPLETE
+        lowered = value.lower( )
+        if lowered in CONSTANTS:
+            return CONSTANTS[lowered]
+        if NUMBER.match( value ):
+            return float( value ) if ( '.' in value or 'e' in lowered ) else int( value )
+        return value
+
+
+def flatten( items, into: list = None ):
+    into = [ ] if into is None else into
+    for item in items:
+        if isinstance( item, list ):
+            flatten( item, into )
+        elif item is not None and item != "":
+            into.append( item )
+    return into
+
+
+def lines( text: str ):
+    output = [ ]
+    for line in text.splitlines( ):
+        line = LINE_PREFIX.sub( '', line ).strip( )
+        if len( line ) > 1 and line[0] in QUOTES and line[-1] == QUOTES[line[0]]:
+            line = line[1:-1].strip( )
+        if line:
+            output.append( WHITESPACE.sub( ' ', line ) )
+    return output or None
+
+
+def parse( text: str ):
+    # the first array or object of the text and any arrays directly after it, as a flat list
+    # (objects are kept as items); None if there is nothing to parse
+    if not text:
+        return None
+    starts = [ i for i in ( text.find( '[' ), text.find( '{' ) ) if i >= 0 ]
+    if not starts:
+        return lines( text )
+    start = min( starts )
+    parser = _Parser( text )
+    parser.pos = start
+    items = [ ]
+    while True:
+        value = parser.value( )
+        if value is _INCOMPLETE:
+            break
+        items.append( value )
+        parser.pos = SKIP.match( text, parser.pos ).end( )
+        if parser.pos >= parser.n or text[parser.pos] not in '[{':
+            break
+    items = flatten( items )
+    return items or None
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of pipeline as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of pipeline
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+from engine import Engine
+import functools
+import logging
+import queue
+import threading
+
+logging.basicConfig( format = "[%(levelname)s - %(name)s] | %(funcName)s %(lineno)s | %(message)s", level = logging.INFO )
+
+_END = object( )
+
+
+class Pipeline:
+    # producer/consumer generation: a producer thread submits jobs to the engine while they
+    # are generated, completions are parsed on a small thread pool and the calling thread
+    # writes the outputs as they arrive, so it is the only one touching the database. At
+    # most `capacity` jobs are between submission and write, which bounds the memory
+    capacity = 64
+    parsers = 2
+    wait = 1.0
+
+    def __init__( self, engine: Engine, capacity: int = None, parsers: int = None ):
+        self.log = logging.getLogger( self.__class__.__name__ )
+        self.engine = engine
+        if capacity:
+            self.capacity = capacity
+        if parsers:
+            self.parsers = parsers
+
+    def run( self, jobs, fetch, parse, write ):
+        # fetch( job ) -> raw answer on the engine, parse( job, raw ) -> output on the
+        # parser pool, write( job, output ) on the calling thread; returns the jobs written
+        done = queue.Queue( )
+        slots = threading.BoundedSemaphore( self.capacity )
+        stop = threading.Event( )
+        submitted = [ 0 ]
+
+        def parsed( job, raw ):
+            try:
+                output = parse( job, raw )
+            except Exception as error:
+                self.log.error( error )
+                output = None
+            done.put( ( job, output ) )
+
+        def fetched( job, context, future ):
+            try:
+                raw = future.result( )
+            except Exception as error:
+                self.log.error( error )
+                done.put( ( job, None ) )
+                return
+            if not stop.is_set( ):
+                # parsing (and what it asks again, see ChatGPT.fill) counts for the caller's scope
+                pool.submit( context.run, parsed, job, raw )
+
+        def produce( ):
+            error = None
+            try:
+                for job in jobs:
+                    while not slots.acquire( timeout = self.wait ):
+                        if stop.is_set( ):
+                            return
+                    if stop.is_set( ):
+                        return
+                    submitted[0] += 1
+                    self.engine.submit( fetch, job ).add_done_callback( functools.partial( fetched, job, contextvars.copy_context( ) ) )
+            except Exception as exception:
+                error = exception
+            finally:
+                done.put( ( _END, error ) )
+
+        written = 0
+        finished = False
+        with ThreadPoolExecutor( max_workers = self.parsers ) as pool:
+            # the producer submits in the caller's context (e.g. its metrics scope)
+            producer = threading.Thread( target = contextvars.copy_context( ).run, args = ( produce, ), name = "pipeline-producer",
+                                         daemon = True )
+            producer.start( )
+            try:
+                while not finished or written < submitted[0]:
+                    job, output = done.get( )
+                    if job is _END:
+                        finished = True
+                        if output is not None:
+                            raise output
+                        continue
+                    write( job, output )
+                    written += 1
+                    slots.release( )
+            finally:
+                stop.set( )
+                producer.join( )
+        self.log.debug( f"{written} jobs written" )
+        return written
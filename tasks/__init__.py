@@ -43,3 +43,13 @@ from .lexical import Lexical
 from .syntactic import Syntactic
 from .semantic import Semantic
 from .testing import Testing
+from .unified import Unified
+from .unified_semantic import Unified_Semantic
+from .models import Models
+from .results import Results
+from .workers import Workers
+from .driver import Driver
+from .stats import Stats
+from .descriptors import Descriptors
+from .stages import Stages
+from .metrics import Metrics
@@ -41,13 +41,32 @@ from .task import Task
 
 class CounterFactual( Task ):
 
-    GET_NEW_ONLY = """SELECT DISTINCT id, bias_type, id_term, concept_term, sentence, 
+    INDICES = [
+        """CREATE INDEX IF NOT EXISTS {table}_target ON {table} ( refid, id_term )""",
+        """CREATE INDEX IF NOT EXISTS {table}_terms ON {table} ( bias_type, id_term, concept_term )""",
+    ]
+    # a sentence is new while it misses the rewrite to any other identity term of its bias type
+    GET_NEW_ONLY = """WITH targets AS ( SELECT DISTINCT bias_type, id_term FROM {source} WHERE bias_type = ? )
+                SELECT DISTINCT id, bias_type, id_term, concept_term, sentence, 
                     bias_type || ':' || concept_term || '-' || RANK() OVER (PARTITION BY bias_type, id_term, concept_term ORDER BY id) unid
-                FROM {source} WHERE id NOT IN ( SELECT refid FROM {table} ) AND bias_type = ?
+                FROM {source} s WHERE s.bias_type = ? AND EXISTS (
+                    SELECT 1 FROM targets o WHERE o.bias_type = s.bias_type AND o.id_term <> s.id_term
+                        AND NOT EXISTS ( SELECT 1 FROM {table} t WHERE t.refid = s.id AND t.id_term = o.id_term ) )
                 """
+    # the ( refid, target identity term ) pairs already rewritten
+    GET_DONE = """SELECT DISTINCT refid, id_term FROM {table} WHERE bias_type = ?"""
+
+    def new_params( self, params ):
+        # GET_NEW_ONLY binds the bias type twice, for the targets and for the source rows
+        return None if params is None else ( *params, *params )
+
+    def done( self, bias_type ) -> set:
+        df = self._get( sql = self.GET_DONE, params = ( bias_type, ) )
+        if df is None or df.empty:
+            return set( )
+        return set( zip( df["refid"].tolist( ), df["id_term"].tolist( ) ) )
 
     def process( self, bias_type, output, df: pandas.DataFrame = None, id: int = None, id_term: str = None ):
-        records = None
         if df is None or df.empty:
             self.log.error( f"{id_term} {bias_type}: {output}" )
             return
@@ -56,17 +75,6 @@ class CounterFactual( Task ):
             self.log.error( f"Size mismatch: {output}" )
             self.log.error( f"{df.to_string( sparsify = False )}" )
             return
-        sentences = df["sentence"].unique()
-        for s in range( len( sentences ) ):
-            sentence = sentences[s]
-            records = df[(df["sentence"] == sentence)]
-            if records is None or records.empty or output is None:
-                self.log.error( f"{bias_type} - {records['id']}/{s}: {output}" )
-                continue
-            record = records.to_dict( orient = 'records' )[0]
-            try:
-                self.store( params = ( record["id"], bias_type, id_term, record["concept_term"], output[s] ), commit = True )
-            except Exception as error:
-                self.log.error( f"{bias_type} - {records['id']}/{s}: {output[s]}" )
-                self.log.error( error )
-        self.commit()
\ No newline at end of file
+        aligned = self.align( df, output )
+        self.store_many( rows = zip( aligned["id"].tolist( ), [ bias_type ] * len( aligned ), [ id_term ] * len( aligned ),
+                                     aligned["concept_term"].tolist( ), aligned["output"].tolist( ) ) )
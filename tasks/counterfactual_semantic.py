@@ -50,9 +50,17 @@ class CounterFactual_Semantic( CounterFactual ):
         sentence TEXT NOT NULL, 
         flagged INTEGER DEFAULT 0
     )"""
-    GET_NEW_ONLY = """SELECT DISTINCT id, bias_type, id_term, sentence, 
+    INDICES = [
+        """CREATE INDEX IF NOT EXISTS {table}_target ON {table} ( refid, id_term )""",
+        """CREATE INDEX IF NOT EXISTS {table}_terms ON {table} ( bias_type, id_term )""",
+    ]
+    # a sentence is new while it misses the rewrite to any other identity term of its bias type
+    GET_NEW_ONLY = """WITH targets AS ( SELECT DISTINCT bias_type, id_term FROM {source} WHERE bias_type = ? )
+                SELECT DISTINCT id, bias_type, id_term, sentence, 
                     bias_type || '-' || RANK() OVER (PARTITION BY bias_type, id_term ORDER BY id) unid
-                FROM {source} WHERE id NOT IN ( SELECT refid FROM {table} ) AND bias_type = ?
+                FROM {source} s WHERE s.bias_type = ? AND EXISTS (
+                    SELECT 1 FROM targets o WHERE o.bias_type = s.bias_type AND o.id_term <> s.id_term
+                        AND NOT EXISTS ( SELECT 1 FROM {table} t WHERE t.refid = s.id AND t.id_term = o.id_term ) )
                 """
     GET_DATA = """SELECT DISTINCT id, bias_type, id_term, sentence, 
                     bias_type || '-' || RANK() OVER (PARTITION BY bias_type, id_term ORDER BY id) unid
@@ -60,7 +68,6 @@ class CounterFactual_Semantic( CounterFactual ):
     INSERT_SQL = """INSERT INTO {table} ( refid, bias_type, id_term, sentence ) VALUES ( ?, ?, ?, ? )"""
 
     def process( self, bias_type, output, df: pandas.DataFrame = None, id: int = None, id_term: str = None ):
-        records = None
         if df is None or df.empty:
             self.log.error( f"{id_term} {bias_type}: {output}" )
             return
@@ -69,17 +76,6 @@ class CounterFactual_Semantic( CounterFactual ):
             self.log.error( f"Size mismatch: {output}" )
             self.log.error( f"{df.to_string( sparsify = False )}" )
             return
-        sentences = df["sentence"].unique()
-        for s in range( len( sentences ) ):
-            sentence = sentences[s]
-            records = df[(df["sentence"] == sentence)]
-            if records is None or records.empty or output is None:
-                self.log.error( f"{bias_type} - {records['id']}/{s}: {output}" )
-                continue
-            record = records.to_dict( orient = 'records' )[0]
-            try:
-                self.store( params = ( record["id"], bias_type, id_term, output[s] ), commit = True )
-            except Exception as error:
-                self.log.error( f"{bias_type} - {records['id']}/{s}: {output[s]}" )
-                self.log.error( error )
-        self.commit()
\ No newline at end of file
+        aligned = self.align( df, output )
+        self.store_many( rows = zip( aligned["id"].tolist( ), [ bias_type ] * len( aligned ), [ id_term ] * len( aligned ),
+                                     aligned["output"].tolist( ) ) )
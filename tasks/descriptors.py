@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of descriptors as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of descriptors
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+
+from collections import Counter
+import functools
+import hashlib
+import logging
+import multiprocessing
+import nltk
+import numpy
+import pandas
+import re
+from readability import Readability
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+logging.basicConfig( format = "[%(levelname)s - %(name)s] | %(funcName)s %(lineno)s | %(message)s", level = logging.INFO )
+
+SPLITTER = re.compile( r'\W' )
+STEMMER = nltk.stem.SnowballStemmer( 'english' )
+_worker = { }
+
+
+@functools.lru_cache( maxsize = None )
+def stem( word: str ):
+    return STEMMER.stem( word )
+
+
+def _analyzer( ):
+    if "analyzer" not in _worker:
+        _worker["analyzer"] = SentimentIntensityAnalyzer( )
+    return _worker["analyzer"]
+
+
+def polarity( sentences: list ):
+    analyzer = _analyzer( )
+    return [ analyzer.polarity_scores( s )["compound"] for s in sentences ]
+
+
+class Descriptors:
+    # corpus descriptors of the testing sentences; per sentence features (length, words,
+    # stems and VADER compound score) are computed once and kept by sentence hash, so the
+    # per table and the full corpus descriptions share them. VADER runs in a process pool
+    # once there are more than `minimum` new sentences, spawned like Workers
+    processes = None
+    chunk = 512
+    minimum = 2000
+    method = "spawn"
+
+    def __init__( self, processes: int = None, chunk: int = None, minimum: int = None, method: str = None ):
+        self.log = logging.getLogger( self.__class__.__name__ )
+        if processes:
+            self.processes = processes
+        if chunk:
+            self.chunk = chunk
+        if minimum is not None:
+            self.minimum = minimum
+        if method:
+            self.method = method
+        self.known = { }
+
+    @staticmethod
+    def key( sentence: str ):
+        return hashlib.sha1( sentence.encode( "utf-8" ) ).hexdigest( )
+
+    def polarity( self, sentences: list ):
+        if len( sentences ) < self.minimum:
+            return polarity( sentences )
+        chunks = [ sentences[lower:lower + self.chunk] for lower in range( 0, len( sentences ), self.chunk ) ]
+        with multiprocessing.get_context( self.method ).Pool( processes = self.processes ) as pool:
+            return [ score for scores in pool.map( polarity, chunks ) for score in scores ]
+
+    def features( self, sentences: list ):
+        keys = [ self.key( s ) for s in sentences ]
+        missing = { }
+        for key, sentence in zip( keys, sentences ):
+            if key not in self.known:
+                missing[key] = sentence
+        if missing:
+            self.log.debug( f"{len( missing )} new sentences of {len( sentences )}" )
+            scores = self.polarity( list( missing.values( ) ) )
+            for ( key, sentence ), score in zip( missing.items( ), scores ):
+                words = SPLITTER.split( sentence )
+                self.known[key] = ( len( sentence ), len( words ), tuple( stem( w ) for w in words ), score )
+        return [ self.known[key] for key in keys ]
+
+    def describe( self, sentences ):
+        sentences = list( sentences )
+        features = self.features( sentences )
+        lengths = [ f[0] for f in features ]
+        counts = [ f[1] for f in features ]
+        stems = [ s for f in features for s in f[2] ]
+        stem_lengths = [ len( s ) for s in stems ]
+        compound = numpy.asarray( [ f[3] for f in features ] )
+        r = Readability( f' '.join( sentences ) )
+        gunning_fog = r.gunning_fog()
+        ARI = r.ari()
+        Flesch = r.flesch_kincaid()
+
+        stats = [
+            ( "total", len( sentences ) ),
+            ( "mean sentence length", numpy.mean( lengths ) ),
+            ( "sentence length variance", numpy.var( lengths ) ),
+            ( "mean word count", numpy.mean( counts ) ),
+            ( "word count variance", numpy.var( counts ) ),
+            ( "mean word length", numpy.mean( stem_lengths ) ),
+            ( "word length variance", numpy.var( stem_lengths ) ),
+            ( "# unique tokens", len( Counter( stems ) ) ),
+            ( "GF readability grade", gunning_fog.grade_level ),
+            ( "GF readability score", gunning_fog.score ),
+            ( "FK readability grade", Flesch.grade_level ),
+            ( "FK readability score", Flesch.score ),
+            ( "ARI readability grade", ARI.grade_levels ),
+            ( "ARI readability score", ARI.score ),
+            ( "VADER score +", int( ( compound >= 0.05 ).sum( ) ) ),
+            ( "VADER score -", int( ( compound <= -0.05 ).sum( ) ) ),
+            ( "VADER score 0", int( ( ( compound > -0.05 ) & ( compound < 0.05 ) ).sum( ) ) ),
+        ]
+        return pandas.DataFrame.from_records( stats, columns = [ "paramter", "value" ] )
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of driver as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of driver
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+
+import logging
+import pandas
+
+from .testing import Testing
+
+logging.basicConfig( format = "[%(levelname)s - %(name)s] | %(funcName)s %(lineno)s | %(message)s", level = logging.INFO )
+
+TARGET = "__target"
+
+
+class Driver:
+    # model-major testing: the pending rows of every source view and bias type are collected
+    # first, then each model classifies the whole set once and the rows are written back to
+    # the testing table of their source
+    targets = None
+    models = None
+
+    def __init__( self, targets: dict, models: list = None, classifier: Testing = None ):
+        self.log = logging.getLogger( self.__class__.__name__ )
+        self.targets = list( targets.items( ) )
+        self.classifier = classifier or self.targets[0][1]
+        self.models = models or self.classifier.models
+
+    def collect( self, bias_types: list = None, new_only: bool = False ):
+        frames = [ ]
+        columns = [ "id", "bias_type", "id_term", "sentence" ] + ( [ "model" ] if new_only else [ ] )
+        for t, ( source, testing ) in enumerate( self.targets ):
+            if bias_types:
+                parts = [ testing.get_input( source = source, params = ( bias_type, ), new_only = new_only ) for bias_type in bias_types ]
+            else:
+                parts = [ testing.get_input( source = source, new_only = new_only ) ]
+            for df in parts:
+                if df is None or df.empty:
+                    continue
+                frames.append( df[columns].assign( **{ TARGET: t } ) )
+        if not frames:
+            return None
+        return pandas.concat( frames, ignore_index = True )
+
+    def run( self, bias_types: list = None, new_only: bool = False ):
+        df = self.collect( bias_types = bias_types, new_only = new_only )
+        if df is None or df.empty:
+            self.log.info( "Nothing to test." )
+            return
+        if self.models is None:
+            self.log.error( f"There are no defined models here: {self.models}" )
+            return
+        self.log.info( f"{len( df )} rows from {len( self.targets )} sources" )
+        for model in self.models:
+            rows = df[df["model"] == model] if "model" in df.columns else df
+            if rows.empty:
+                continue
+            rows = rows.reset_index( drop = True )
+            self.log.debug( f"-------------\n{model}\n-------------" )
+            result = self.classifier.classify( model, rows["sentence"].to_list( ) )
+            if len( result ) != len( rows ):
+                self.log.error( f"Size mismatch: {len( result )} vs {len( rows )}" )
+                continue
+            for t, part in rows.groupby( TARGET, sort = False ):
+                testing = self.targets[t][1]
+                testing.write( model, part, [ result[i] for i in part.index ] )
+                testing.commit( )
+        self.classifier.report( )
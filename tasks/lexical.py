@@ -43,7 +43,7 @@ class Lexical( Task ):
 
     GET_NEW_ONLY = """SELECT DISTINCT id, bias_type, id_term, concept_term, sentence, 
                     bias_type || ':' || concept_term || '-' || RANK() OVER (PARTITION BY bias_type, id_term, concept_term ORDER BY id) unid
-                FROM {source} WHERE ( id ) NOT IN ( SELECT refid FROM {table} ) AND bias_type = ?
+                FROM {source} s WHERE NOT EXISTS ( SELECT 1 FROM {table} t WHERE t.refid = s.id ) AND bias_type = ?
                 """
 
     def process( self, bias_type, output, df: pandas.DataFrame = None, id: int = None, id_term: str = None ):
@@ -57,7 +57,7 @@ class Lexical( Task ):
         try:
             for sentence in output:
                 # db.execute( INSERT_SQL.format( sentence = sentence, bias_type = bias_type, id_term = id_term, concept_term = concept_term ) )
-                self.store( params = ( record["id"], bias_type, record["id_term"], record["concept_term"], sentence ), commit = True )
+                self.store( params = ( record["id"], bias_type, record["id_term"], record["concept_term"], sentence ) )
         except Exception as error:
             self.log.error( f"{bias_type} - {id}: {output}" )
             self.log.error( error )
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of metrics as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of metrics
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+import contextlib
+import contextvars
+import numpy
+import threading
+import time
+import uuid
+
+from .task import Task
+
+# ( stage, bias type ) the current thread (or copied context) works for
+_scope = contextvars.ContextVar( "metrics_scope", default = ( "", "" ) )
+
+
+class Metrics( Task ):
+    # run instrumentation: counters (add) and samples (observe) are collected per stage,
+    # bias type, metric name and label (e.g. model or table) in memory, and written to the
+    # metrics table when a scope ends; samples are stored as count, mean, percentiles and max
+    CREATE_TABLE = """CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        run TEXT NOT NULL,
+        stage TEXT NOT NULL,
+        bias_type TEXT NOT NULL,
+        name TEXT NOT NULL,
+        label TEXT NOT NULL DEFAULT '',
+        value FLOAT,
+        created TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )"""
+    INDICES = [
+        """CREATE INDEX IF NOT EXISTS {table}_run ON {table} ( run, stage, bias_type )""",
+    ]
+    GET_DATA = """SELECT stage, bias_type, name, label, value FROM {table} WHERE run = ?"""
+    INSERT_SQL = """INSERT INTO {table} ( run, stage, bias_type, name, label, value ) VALUES ( ?, ?, ?, ?, ?, ? )"""
+    PERCENTILES = ( 50, 95, 99 )
+
+    def __init__( self, db = None, table: str = "", run: str = None ):
+        self.run = run or time.strftime( "%Y%m%d-%H%M%S-" ) + uuid.uuid4( ).hex[:6]
+        self.counters = { }
+        self.samples = { }
+        self.guard = threading.Lock( )
+        super( ).__init__( db = db, table = table )
+
+    @staticmethod
+    def current( ):
+        return _scope.get( )
+
+    @contextlib.contextmanager
+    def scope( self, stage: str, bias_type: str = "" ):
+        token = _scope.set( ( stage, bias_type or "" ) )
+        try:
+            yield self
+        finally:
+            _scope.reset( token )
+            self.save( stage, bias_type or "" )
+
+    def add( self, name: str, value: float = 1, label: str = "" ):
+        key = _scope.get( ) + ( name, label or "" )
+        with self.guard:
+            self.counters[key] = self.counters.get( key, 0 ) + value
+
+    def observe( self, name: str, value: float, label: str = "" ):
+        key = _scope.get( ) + ( name, label or "" )
+        with self.guard:
+            self.samples.setdefault( key, [ ] ).append( value )
+
+    @contextlib.contextmanager
+    def timer( self, name: str, label: str = "" ):
+        start = time.perf_counter( )
+        try:
+            yield
+        finally:
+            self.observe( name, time.perf_counter( ) - start, label = label )
+
+    def _take( self, store: dict, stage, bias_type ):
+        keys = [ key for key in store if stage is None or key[:2] == ( stage, bias_type ) ]
+        return [ ( key, store.pop( key ) ) for key in keys ]
+
+    def save( self, stage: str = None, bias_type: str = None ):
+        # writes (and forgets) what was collected for a scope, or everything
+        with self.guard:
+            counters = self._take( self.counters, stage, bias_type )
+            samples = self._take( self.samples, stage, bias_type )
+        rows = [ ( self.run, ) + key + ( float( value ), ) for key, value in counters ]
+        for ( stage_, bias_, name, label ), values in samples:
+            values = numpy.asarray( values, dtype = float )
+            rows.append( ( self.run, stage_, bias_, f"{name}.count", label, float( len( values ) ) ) )
+            rows.append( ( self.run, stage_, bias_, f"{name}.mean", label, float( values.mean( ) ) ) )
+            for p, value in zip( self.PERCENTILES, numpy.percentile( values, self.PERCENTILES ) ):
+                rows.append( ( self.run, stage_, bias_, f"{name}.p{p}", label, float( value ) ) )
+            rows.append( ( self.run, stage_, bias_, f"{name}.max", label, float( values.max( ) ) ) )
+        if rows:
+            self.store_many( rows = rows )
+            self.commit( )
+
+    def summary( self, run: str = None ):
+        # one row per stage and bias type, and the inference throughput per model
+        self.save( )
+        df = self.get( params = ( run or self.run, ) )
+        if df is None or df.empty:
+            self.log.info( "No metrics recorded." )
+            return None, None
+        stages = df.pivot_table( index = [ "stage", "bias_type" ], columns = "name", values = "value", aggfunc = "sum", fill_value = 0 )
+        columns = {
+            "stage.seconds": "seconds",
+            "request.count": "requests",
+            "request.retries": "retries",
+            "request.errors": "errors",
+            "request.latency.p50": "latency p50",
+            "request.latency.p95": "latency p95",
+            "limiter.seconds": "throttled s",
+            "cache.hits": "cache hits",
+            "tokens.prompt": "prompt tokens",
+            "tokens.completion": "completion tokens",
+            "rows.written": "rows written",
+            "sqlite.seconds": "write s",
+            "inference.sentences": "sentences",
+            "inference.seconds": "inference s",
+        }
+        stages = stages.reindex( columns = list( columns ), fill_value = 0 ).rename( columns = columns )
+        inference = df[df["name"].isin( [ "inference.sentences", "inference.seconds" ] )]
+        models = inference.pivot_table( index = "label", columns = "name", values = "value", aggfunc = "sum", fill_value = 0 )
+        if not models.empty:
+            models["sentences/sec"] = models["inference.sentences"] / models["inference.seconds"].clip( lower = 1e-9 )
+        self.log.info( f"Run {run or self.run}\n" + stages.to_string( sparsify = False ) )
+        if not models.empty:
+            self.log.info( "\n" + models.to_string( sparsify = False ) )
+        return stages, models
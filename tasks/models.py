@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of models as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of models
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+from collections import OrderedDict
+import logging
+import threading
+from transformers import pipeline
+
+logging.basicConfig( format = "[%(levelname)s - %(name)s] | %(funcName)s %(lineno)s | %(message)s", level = logging.INFO )
+
+
+class Models:
+    # LRU registry of loaded pipelines: least recently used models are released once
+    # there are more than `capacity` of them or their parameters exceed `budget` bytes
+    task = "text-classification"
+    capacity = 8
+    budget = None
+
+    def __init__( self, capacity: int = None, budget: int = None, task: str = None ):
+        self.log = logging.getLogger( self.__class__.__name__ )
+        if capacity:
+            self.capacity = capacity
+        if budget:
+            self.budget = budget
+        if task:
+            self.task = task
+        self.loaded = OrderedDict( )
+        self.sizes = { }
+        self.lock = threading.RLock( )
+
+    def __contains__( self, model ):
+        return model in self.loaded
+
+    def __len__( self ):
+        return len( self.loaded )
+
+    @staticmethod
+    def size( classifier ):
+        try:
+            return sum( p.numel( ) * p.element_size( ) for p in classifier.model.parameters( ) )
+        except Exception:
+            return 0
+
+    @staticmethod
+    def padded( classifier ):
+        # GPT-2 style tokenizers have no pad token and a pipeline cannot batch without one;
+        # the end of sequence token pads, as the attention mask leaves it out anyway
+        tokenizer = getattr( classifier, "tokenizer", None )
+        if tokenizer is not None and tokenizer.pad_token_id is None and tokenizer.eos_token_id is not None:
+            tokenizer.pad_token = tokenizer.eos_token
+            classifier.model.config.pad_token_id = tokenizer.eos_token_id
+        return classifier
+
+    def memory( self ):
+        return sum( self.sizes.values( ) )
+
+    def get( self, model ):
+        with self.lock:
+            if model in self.loaded:
+                self.loaded.move_to_end( model )
+                return self.loaded[model]
+            self.log.debug( f"Loading {model}" )
+            classifier = self.padded( pipeline( task = self.task, model = model ) )
+            self.loaded[model] = classifier
+            self.sizes[model] = self.size( classifier )
+            self._evict( keep = model )
+            return classifier
+
+    def release( self, model ):
+        with self.lock:
+            self.loaded.pop( model, None )
+            self.sizes.pop( model, None )
+
+    def _evict( self, keep = None ):
+        while len( self.loaded ) > 1:
+            over_capacity = len( self.loaded ) > self.capacity
+            over_budget = self.budget is not None and self.memory( ) > self.budget
+            if not over_capacity and not over_budget:
+                break
+            oldest = next( iter( self.loaded ) )
+            if oldest == keep:
+                break
+            self.log.debug( f"Releasing {oldest} ({self.sizes.get( oldest, 0 ) / 2**20:.0f} MB)" )
+            self.release( oldest )
+
+    def clear( self ):
+        with self.lock:
+            self.loaded.clear( )
+            self.sizes.clear( )
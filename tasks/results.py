@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of results as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of results
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+
+import hashlib
+
+from .task import Task
+
+
+class Results( Task ):
+    # (sentence, model) -> (label, score) store keyed by a hash of the sentence text, so a
+    # sentence is classified once per model whichever testing table and run it comes from.
+    # Only the hashes asked for are read, nothing is kept in memory between lookups
+    CREATE_TABLE = """CREATE TABLE IF NOT EXISTS {table} (
+        hash TEXT NOT NULL,
+        model TEXT NOT NULL,
+        label TEXT NOT NULL,
+        score FLOAT,
+        PRIMARY KEY ( hash, model )
+    )"""
+    INDICES = [ ]
+    GET_DATA = """SELECT hash, label, score FROM {table} WHERE model = ?"""
+    LOOKUP = """SELECT hash, label, score FROM {table} WHERE model = ? AND hash IN ( {marks} )"""
+    # hashes per lookup query, within SQLite's limit of bound parameters
+    lookup_size = 500
+    INSERT_SQL = """INSERT OR REPLACE INTO {table} ( hash, model, label, score ) VALUES ( ?, ?, ?, ? )"""
+
+    @staticmethod
+    def key( sentence: str ):
+        return hashlib.sha1( sentence.encode( "utf-8" ) ).hexdigest( )
+
+    def lookup( self, model, keys: list ):
+        # { hash: result } of the keys classified by model before
+        keys = list( dict.fromkeys( keys ) )
+        known = { }
+        for lower in range( 0, len( keys ), self.lookup_size ):
+            part = keys[lower:lower + self.lookup_size]
+            sql = self.LOOKUP.format( table = "{table}", marks = ", ".join( [ "?" ] * len( part ) ) )
+            df = self._get( sql = sql, params = ( model, *part ) )
+            if df is None:
+                continue
+            for hash, label, score in df.itertuples( index = False ):
+                known[hash] = { "label": label, "score": score }
+        return known
+
+    def save( self, model, key, result ):
+        self.store( params = ( key, model, result["label"], result["score"] ) )
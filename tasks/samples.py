@@ -42,10 +42,13 @@ from .task import Task
 class Samples( Task ):
     # CHECK_EXISTS = """SELECT * FROM {table}  WHERE bias_type = ? AND id_term = ? AND concept_term = ?"""
     GET_DATA = """SELECT DISTINCT id, id_term, concept_term FROM {source} WHERE bias_type = ?"""
-    GET_NEW_ONLY = """SELECT DISTINCT id, id_term, concept_term FROM {source} 
+    GET_NEW_ONLY = """SELECT DISTINCT id, id_term, concept_term FROM {source} s
         WHERE bias_type = ? 
-        AND ( id_term, concept_term ) NOT IN ( SELECT id_term, concept_term FROM {table} )
+        AND NOT EXISTS ( SELECT 1 FROM {table} t WHERE t.id_term = s.id_term AND t.concept_term = s.concept_term )
     """
+    INDICES = Task.INDICES + [
+        """CREATE INDEX IF NOT EXISTS {table}_concepts ON {table} ( id_term, concept_term )""",
+    ]
 
     def process( self, bias_type, output, df: pandas.DataFrame = None, id: int = None, id_term: str = None ):
         records = None
@@ -58,7 +61,7 @@ class Samples( Task ):
         try:
             for sentence in output:
                 # db.execute( INSERT_SQL.format( sentence = sentence, bias_type = bias_type, id_term = id_term, concept_term = concept_term ) )
-                self.store( params = ( record["id"], bias_type, record["id_term"], record["concept_term"], sentence ), commit = True )
+                self.store( params = ( record["id"], bias_type, record["id_term"], record["concept_term"], sentence ) )
         except Exception as error:
             self.log.error( f"{bias_type} - {id}: {output}" )
             self.log.error( error )
@@ -51,8 +51,11 @@ class Semantic( Task ):
     GET_DATA = """SELECT DISTINCT id, bias_type, id_term, concept_term, sentence, RANK() OVER (PARTITION BY bias_type, id_term, concept_term, flagged ORDER BY id) unid 
                 FROM {source} WHERE bias_type = ? AND flagged = 0"""
     GET_NEW_ONLY = """SELECT DISTINCT id, bias_type, id_term, concept_term, sentence, RANK() OVER (PARTITION BY bias_type, id_term, concept_term, flagged ORDER BY id) unid 
-                FROM {source} WHERE bias_type = ? AND flagged = 0
-                    AND ( bias_type, id_term ) NOT IN ( SELECT bias_type, id_term FROM {table} )"""
+                FROM {source} s WHERE bias_type = ? AND flagged = 0
+                    AND NOT EXISTS ( SELECT 1 FROM {table} t WHERE t.bias_type = s.bias_type AND t.id_term = s.id_term )"""
+    INDICES = [
+        """CREATE INDEX IF NOT EXISTS {table}_terms ON {table} ( bias_type, id_term )""",
+    ]
 
     INSERT_SQL = """INSERT INTO {table} ( bias_type, id_term, sentence ) VALUES ( ?, ?, ? )"""
 
@@ -60,7 +63,7 @@ class Semantic( Task ):
         try:
             for sentence in output:
                 # db.execute( INSERT_SQL.format( sentence = sentence, bias_type = bias_type, id_term = id_term, concept_term = concept_term ) )
-                self.store( params = ( bias_type, id_term, sentence ), commit = True )
+                self.store( params = ( bias_type, id_term, sentence ) )
         except Exception as error:
             self.log.error( f"{bias_type} - {id}: {output}" )
             self.log.error( error )
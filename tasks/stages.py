@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of stages as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of stages
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+import time
+
+from .task import Task
+
+
+class Stages( Task ):
+    # bookkeeping of the workflow stages: when a stage last finished for a bias type ('' for
+    # stages over all bias types) and the signature of its settings at that time
+    CREATE_TABLE = """CREATE TABLE IF NOT EXISTS {table} (
+        stage TEXT NOT NULL,
+        bias_type TEXT NOT NULL DEFAULT '',
+        signature TEXT,
+        finished FLOAT,
+        seconds FLOAT,
+        PRIMARY KEY ( stage, bias_type )
+    )"""
+    INDICES = [ ]
+    GET_DATA = """SELECT stage, bias_type, signature, finished FROM {table}"""
+    HAS_DATA = """SELECT 1 FROM {table} WHERE bias_type = ? LIMIT 1"""
+    HAS_ANY_DATA = """SELECT 1 FROM {table} LIMIT 1"""
+    INSERT_SQL = """INSERT OR REPLACE INTO {table} ( stage, bias_type, signature, finished, seconds ) VALUES ( ?, ?, ?, ?, ? )"""
+
+    def __init__( self, db = None, table: str = "" ):
+        self.known = None
+        super( ).__init__( db = db, table = table )
+
+    def lookup( self ):
+        with self.lock:
+            if self.known is None:
+                df = self.get( )
+                self.known = { }
+                if df is not None:
+                    for stage, bias_type, signature, finished in df.itertuples( index = False ):
+                        self.known[( stage, bias_type )] = ( signature, finished )
+            return self.known
+
+    def last( self, stage: str, bias_type: str = "" ):
+        # ( signature, finished ) of the last run or None
+        return self.lookup( ).get( ( stage, bias_type or "" ) )
+
+    def done( self, stage: str, bias_type: str = "", signature: str = "", seconds: float = 0.0 ):
+        finished = time.time( )
+        with self.lock:
+            self.lookup( )[( stage, bias_type or "" )] = ( signature, finished )
+            self.store( params = ( stage, bias_type or "", signature, finished, seconds ) )
+            self.commit( )
+        return finished
+
+    def has_data( self, table: str, bias_type: str = "" ):
+        # whether a stage output table has rows (for the bias type) already
+        try:
+            df = self._get( sql = self.HAS_DATA if bias_type else self.HAS_ANY_DATA, table = table, params = ( bias_type, ) if bias_type else None )
+        except Exception:
+            return False
+        return df is not None and not df.empty
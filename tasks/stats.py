@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of stats as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of stats
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+
+import logging
+import numpy
+import pandas
+
+from .task import Task
+
+logging.basicConfig( format = "[%(levelname)s - %(name)s] | %(funcName)s %(lineno)s | %(message)s", level = logging.INFO )
+
+TOTAL = "total"
+
+
+class Stats:
+    # counterfactual flag rates computed from one load of every testing table: rows are
+    # reduced per (model, bias_type, refid) to the number of distinct labels and the score
+    # range, and every rate (per table, in total, for any threshold) is derived from that
+    TABLES = {
+        "testing_baseline": "baseline",
+        "testing_lexical": "lexical",
+        "testing_syntactic": "syntactic",
+        "testing_semantic": "semantic",
+    }
+    GET_DATA = """SELECT model, bias_type, refid, id_term, label, score FROM {table}
+        WHERE refid IN ( SELECT id FROM {source} WHERE flagged = 0 )"""
+    KEYS = [ "model", "bias_type" ]
+    # default threshold grid of the flag rate curve
+    GRID = numpy.round( numpy.linspace( 0.0, 1.0, 201 ), 3 )
+
+    def __init__( self, db, tables: dict = None ):
+        self.log = logging.getLogger( self.__class__.__name__ )
+        self.database = db
+        self.tables = tables or self.TABLES
+        self.reduced = None
+        self.sorted = None
+
+    def load( self ):
+        frames = [ ]
+        for table, source in self.tables.items( ):
+            with Task.lock:
+                df = pandas.read_sql( sql = self.GET_DATA.format( table = table, source = source ), con = self.database )
+            if df.empty:
+                continue
+            refids = df.groupby( self.KEYS + [ "refid" ], sort = False ).agg(
+                labels = ( "label", "nunique" ), terms = ( "id_term", "nunique" ),
+                mns = ( "score", "min" ), mxs = ( "score", "max" ) ).reset_index( )
+            with numpy.errstate( divide = "ignore", invalid = "ignore" ):
+                # relative spread as in abs(max/min) - 1; a zero minimum gives no score flag
+                refids["ratio"] = numpy.where( refids["mns"] != 0, numpy.abs( refids["mxs"] / refids["mns"] ) - 1, numpy.nan )
+            refids["spread"] = refids["mxs"] - refids["mns"]
+            refids.insert( 0, "table", table )
+            frames.append( refids )
+        self.reduced = pandas.concat( frames, ignore_index = True ) if frames else None
+        self.sorted = None
+        return self.reduced
+
+    def refids( self ):
+        if self.reduced is None:
+            self.load( )
+        return self.reduced
+
+    def _present( self, df: pandas.DataFrame ):
+        # totals only over (model, bias_type) pairs present in every table
+        return df.groupby( self.KEYS )["table"].transform( "nunique" ) == len( self.tables )
+
+    def _rates( self, refids: pandas.DataFrame, marked: pandas.Series ):
+        df = refids[[ "table" ] + self.KEYS].assign( marked = marked.astype( int ), total = 1 )
+        grouped = df.groupby( [ "table" ] + self.KEYS, sort = True )[[ "total", "marked" ]].sum( ).reset_index( )
+        total = grouped[self._present( grouped )].groupby( self.KEYS )[[ "total", "marked" ]].sum( ).reset_index( ).assign( table = TOTAL )
+        rates = pandas.concat( [ grouped, total ], ignore_index = True )
+        rates["rate"] = 100.0 * rates["marked"] / rates["total"]
+        return rates
+
+    def rates( self, thresholds: list = None ):
+        # "label": share of refids where the model changed its label between the identity
+        # terms; "score": label change or relative score spread above the threshold
+        refids = self.refids( )
+        if refids is None:
+            return None
+        labels = refids["labels"] > 1
+        frames = [ self._rates( refids, labels ).assign( measure = "label", threshold = numpy.nan ) ]
+        if thresholds:
+            frames.append( self.curve( thresholds = thresholds ).assign( measure = "score" ) )
+        return pandas.concat( frames, ignore_index = True )
+
+    def spreads( self ):
+        # per group sorted critical values: a refid is flagged for every threshold below its
+        # relative score spread, always on a label change and never on a zero minimum score
+        if self.sorted is None:
+            refids = self.refids( )
+            if refids is None:
+                return None
+            critical = numpy.where( refids["labels"] > 1, numpy.inf, refids["ratio"].fillna( -numpy.inf ) )
+            df = refids[[ "table" ] + self.KEYS].assign( critical = critical )
+            df = pandas.concat( [ df, df[self._present( df )].assign( table = TOTAL ) ], ignore_index = True )
+            self.sorted = { key: numpy.sort( group["critical"].to_numpy( ) ) for key, group in df.groupby( [ "table" ] + self.KEYS ) }
+        return self.sorted
+
+    def curve( self, thresholds = None ):
+        # flag rate for every threshold of the grid; each point is a binary search
+        spreads = self.spreads( )
+        if spreads is None:
+            return None
+        thresholds = numpy.sort( numpy.asarray( self.GRID if thresholds is None else thresholds, dtype = float ) )
+        frames = [ ]
+        for ( table, model, bias_type ), critical in spreads.items( ):
+            marked = len( critical ) - numpy.searchsorted( critical, thresholds, side = "right" )
+            frames.append( pandas.DataFrame( { "table": table, "model": model, "bias_type": bias_type, "threshold": thresholds,
+                                               "total": len( critical ), "marked": marked } ) )
+        curve = pandas.concat( frames, ignore_index = True )
+        curve["rate"] = 100.0 * curve["marked"] / curve["total"]
+        return curve
+
+    def export( self, path: str, thresholds = None, wide: bool = False ):
+        # csv of the curve, one row per (table, model, bias_type, threshold) or one column per threshold
+        curve = self.curve( thresholds = thresholds )
+        if curve is None:
+            self.log.warning( "There are no testing outcomes." )
+            return None
+        if wide:
+            curve = curve.pivot_table( index = [ "table", "model", "bias_type" ], columns = "threshold", values = "rate" ).reset_index( )
+        curve.to_csv( path, index = False )
+        return curve
+
+    def pair_rates( self, threshold: float ):
+        # label change or absolute score difference above the threshold, counted over the
+        # refids which were tested with at least two identity terms
+        refids = self.refids( )
+        if refids is None:
+            return None
+        refids = refids[refids["terms"] > 1]
+        return self._rates( refids, ( refids["labels"] > 1 ) | ( refids["spread"] > threshold ) ).assign( measure = "pair", threshold = threshold )
+
+    @staticmethod
+    def pivot( rates: pandas.DataFrame ):
+        pivot = rates.pivot( index = 'model', columns = 'bias_type', values = 'rate' )
+        pivot.fillna( value = -1, inplace = True )
+        return pivot
+
+    def report( self, thresholds: list = None, tables: list = None ):
+        rates = self.rates( thresholds = thresholds )
+        pivots = { }
+        if rates is None:
+            self.log.warning( "There are no testing outcomes." )
+            return pivots
+        for ( table, measure, threshold ), df in rates.groupby( [ "table", "measure", "threshold" ], dropna = False, sort = False ):
+            if tables and table not in tables:
+                continue
+            pivot = self.pivot( df )
+            pivots[( table, threshold if measure == "score" else None )] = pivot
+            title = "Total stats" if measure == "label" else f"Score stats with threshold: {threshold}"
+            self.log.info( "\n" + "-" * 80 + f"\n{title} ({table})\n" + "-" * 80 + "\n" + pivot.to_string( sparsify = False ) )
+        return pivots
@@ -44,9 +44,9 @@ class Syntactic( Task ):
 
     GET_DATA = """SELECT DISTINCT id, bias_type, id_term, concept_term, sentence  FROM {source}
                 WHERE bias_type = ? AND flagged = 0"""
-    GET_NEW_ONLY = """SELECT DISTINCT id, bias_type, id_term, concept_term, sentence FROM {source}
+    GET_NEW_ONLY = """SELECT DISTINCT id, bias_type, id_term, concept_term, sentence FROM {source} s
                 WHERE bias_type = ? AND flagged = 0
-                    AND ( id ) NOT IN ( SELECT refid FROM {table} ) """
+                    AND NOT EXISTS ( SELECT 1 FROM {table} t WHERE t.refid = s.id ) """
 
     def process( self, bias_type, output, df: pandas.DataFrame = None, id: int = None, id_term: str = None ):
         pass
@@ -58,16 +58,6 @@ class Syntactic( Task ):
             self.log.error( f"Size mismatch: {output}" )
             self.log.error( f"{df.to_string( sparsify = False )}" )
             return
-        sentences = df["sentence"].unique( )
-        for s in range( len( sentences ) ):
-            sentence = sentences[s]
-            records = df[(df["sentence"] == sentence)]
-            if records is None or records.empty or output is None:
-                self.log.error( f"{bias_type} - {records['id']}/{s}: {output}" )
-                continue
-            record = records.to_dict( orient = 'records' )[0]
-            try:
-                self.store( params = ( record["id"], bias_type, record["id_term"], record["concept_term"], output[s] ), commit = True )
-            except Exception as error:
-                self.log.error( f"{bias_type} - {id}: {output}" )
-                self.log.error( error )
+        aligned = self.align( df, output )
+        self.store_many( rows = zip( aligned["id"].tolist( ), [ bias_type ] * len( aligned ), aligned["id_term"].tolist( ),
+                                     aligned["concept_term"].tolist( ), aligned["output"].tolist( ) ) )
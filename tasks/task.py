@@ -37,6 +37,8 @@ __date__ = "12/03/2024"
 import logging
 import pandas
 # import sqlite3
+import threading
+import time
 
 logging.basicConfig( format = "[%(levelname)s - %(name)s] | %(funcName)s %(lineno)s | %(message)s", level = logging.INFO )
 
@@ -46,6 +48,18 @@ class Task:
     db = None
     log = None
     table = ""
+    # stored rows are buffered and written with executemany in one transaction when the
+    # buffer reaches buffer_size rows, on flush()/commit(), or by a timer flush_interval
+    # seconds after the first buffered row (so the connection must allow other threads,
+    # check_same_thread = False)
+    buffer_size = 1000
+    flush_interval = 10.0
+    # tasks share one connection and may be used from parallel stages, so every database
+    # access and buffer change is done under one lock; streams (see _iter) fetch each chunk
+    # under it too
+    lock = threading.RLock( )
+    # optional Metrics instance shared by all tasks (rows written, write time)
+    metrics = None
 
     CREATE_TABLE = """CREATE TABLE IF NOT EXISTS {table} (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -57,6 +71,10 @@ class Task:
         flagged INTEGER DEFAULT 0
     )"""
     DROP_TABLE = """DROP TABLE IF EXISTS {table}"""
+    INDICES = [
+        """CREATE INDEX IF NOT EXISTS {table}_refid ON {table} ( refid )""",
+        """CREATE INDEX IF NOT EXISTS {table}_terms ON {table} ( bias_type, id_term, concept_term )""",
+    ]
     CHECK_EXISTS = """SELECT * FROM {table}  WHERE refid = ?"""
     GET_DATA = """SELECT DISTINCT id, bias_type, id_term, concept_term, sentence, 
                     bias_type || ':' || concept_term || '-' || RANK() OVER (PARTITION BY bias_type, id_term, concept_term ORDER BY id) unid 
@@ -64,14 +82,19 @@ class Task:
                 WHERE bias_type = ?"""
     GET_NEW_ONLY = """SELECT DISTINCT id, bias_type, id_term, concept_term, sentence, 
                     bias_type || ':' || concept_term || '-' || RANK() OVER (PARTITION BY bias_type, id_term, concept_term ORDER BY id) unid
-                FROM {source}
-                WHERE ( bias_type, id_term, concept_term ) NOT IN ( SELECT bias_type, id_term, concept_term FROM {table} )
+                FROM {source} s
+                WHERE NOT EXISTS ( SELECT 1 FROM {table} t
+                        WHERE t.bias_type = s.bias_type AND t.id_term = s.id_term AND t.concept_term = s.concept_term )
                     AND bias_type = ?
                 """
     INSERT_SQL = """INSERT INTO {table} ( refid, bias_type, id_term, concept_term, sentence ) VALUES ( ?, ?, ?, ?, ? )"""
+    COUNT = """SELECT COUNT( * ) n FROM ( {query} )"""
 
     def __init__( self, db = None, table: str = "" ):
         self.log = logging.getLogger( self.__class__.__name__ )
+        self.pending = { }
+        self.buffered = 0
+        self.timer = None
         if db:
             self.database = db
             self.db = self.database.cursor()
@@ -90,12 +113,22 @@ class Task:
         if not self.table:
             return
         self.create( self.table )
+        self.index( self.table )
 
     def create( self, table_name = "" ):
         worktable = self._check( table_name )
         if not worktable:
             return
-        self.db.execute( self.CREATE_TABLE.format( table = worktable ) )
+        with self.lock:
+            self.db.execute( self.CREATE_TABLE.format( table = worktable ) )
+
+    def index( self, table_name = "" ):
+        worktable = self._check( table_name )
+        if not worktable:
+            return
+        with self.lock:
+            for sql in self.INDICES:
+                self.db.execute( sql.format( table = worktable ) )
 
     def drop( self, table_name = "" ):
         worktable = self._check( table_name )
@@ -103,34 +136,118 @@ class Task:
             return
         self.log.debug( self.DROP_TABLE )
         self.log.debug( worktable )
-        self.db.execute( self.DROP_TABLE.format( table = worktable ) )
+        with self.lock:
+            self.db.execute( self.DROP_TABLE.format( table = worktable ) )
 
-    def _get( self, sql, source = "", table = "", params = None ):
+    def _get( self, sql, source = "", table = "", params = None, flush: bool = True ):
         worktable = self._check( table )
         if not worktable:
             return None
-        return pandas.read_sql( sql = sql.format( source = source, table = worktable ), con = self.database, params = params )
+        with self.lock:
+            if flush:
+                self.flush( )
+            return pandas.read_sql( sql = sql.format( source = source, table = worktable ), con = self.database, params = params )
+
+    def _iter( self, sql, source = "", table = "", params = None, chunksize: int = 10000 ):
+        # the query result in DataFrames of at most chunksize rows, fetched from one cursor
+        worktable = self._check( table )
+        if not worktable:
+            return iter( ( ) )
+        with self.lock:
+            self.flush( )
+            chunks = pandas.read_sql( sql = sql.format( source = source, table = worktable ), con = self.database, params = params,
+                                      chunksize = chunksize )
+        return self._locked( chunks )
+
+    def _locked( self, chunks ):
+        # the cursor is read between other stages' writes on the same connection
+        while True:
+            with self.lock:
+                chunk = next( chunks, None )
+            if chunk is None:
+                return
+            yield chunk
 
     def get( self, source = "", table = "", params = None ):
         return self._get( sql = self.GET_DATA, source = source, table = table, params = params )
 
+    def new_params( self, params ):
+        # the parameters of GET_NEW_ONLY from those given to get_only_new
+        return params
+
     def get_only_new( self, source = "", table = "", params = None ):
-        return self._get( sql = self.GET_NEW_ONLY, source = source, table = table, params = params )
+        return self._get( sql = self.GET_NEW_ONLY, source = source, table = table, params = self.new_params( params ) )
+
+    def count_new( self, source = "", table = "", params = None ):
+        # the number of rows get_only_new would return, without fetching them
+        df = self._get( sql = self.COUNT.format( query = self.GET_NEW_ONLY ), source = source, table = table,
+                        params = self.new_params( params ) )
+        return 0 if df is None or df.empty else int( df["n"].iloc[0] )
 
     def exists( self, source = "", table = "", params = None ):
         return self._get( sql = self.CHECK_EXISTS, source = source, table = table, params = params )
 
     def store( self, params = None, name = "", commit = False ):
+        # commit is kept for the callers; rows are committed whenever the buffer is flushed
+        self.store_many( rows = [ params ], name = name )
+
+    def store_many( self, rows, name = "" ):
+        # the rows are buffered together, so a batch is written in one executemany
         worktable = self._check( name )
         if not worktable:
             return
-        self.db.execute( self.INSERT_SQL.format( table = worktable ), params )
-        if commit:
-            self.database.commit()
+        rows = list( rows )
+        with self.lock:
+            self.pending.setdefault( self.INSERT_SQL.format( table = worktable ), [ ] ).extend( rows )
+            self.buffered += len( rows )
+            if self.buffered >= self.buffer_size:
+                self.flush( )
+            elif self.timer is None and self.buffered:
+                self.timer = threading.Timer( self.flush_interval, self.flush )
+                self.timer.daemon = True
+                self.timer.start( )
+
+    @staticmethod
+    def align( df: pandas.DataFrame, output: list ):
+        # the i-th output belongs to the i-th distinct sentence of df, i.e. to the first row
+        # with that sentence
+        aligned = df.drop_duplicates( subset = "sentence" )
+        aligned = aligned.assign( output = list( output[:len( aligned )] ) )
+        # sentences without an answer (see ChatGPT.fill) are left for the next run
+        return aligned[aligned["output"].notna( )]
+
+    def flush( self ):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel( )
+                self.timer = None
+            if not self.pending or self.database is None:
+                return
+            pending, self.pending, self.buffered = self.pending, { }, 0
+            start = time.perf_counter( )
+            try:
+                with self.database:
+                    for sql, rows in pending.items( ):
+                        self.db.executemany( sql, rows )
+            except Exception as error:
+                # the batch was rolled back, so fall back to single rows to keep the good ones
+                self.log.error( error )
+                for sql, rows in pending.items( ):
+                    for row in rows:
+                        try:
+                            self.db.execute( sql, row )
+                        except Exception as error:
+                            self.log.error( f"{row}: {error}" )
+                self.database.commit( )
+            if self.metrics is not None and self.metrics is not self:
+                self.metrics.add( "rows.written", sum( len( rows ) for rows in pending.values( ) ), label = self.table )
+                self.metrics.add( "sqlite.seconds", time.perf_counter( ) - start, label = self.table )
 
     def commit( self ):
         if self.database is not None:
-            self.database.commit()
+            with self.lock:
+                self.flush( )
+                self.database.commit()
 
     def process( self, bias_type, output, df: pandas.DataFrame = None, id: int = None, id_term: str = None ):
         pass
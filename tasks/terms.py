@@ -52,6 +52,19 @@ class Terms( Task ):
                     bias_type || ':' || concept_term || '-' || RANK() OVER (PARTITION BY bias_type, id_term, concept_term ORDER BY id) unid 
                 FROM {table}"""
     INSERT_SQL = """INSERT INTO {table} ( bias_type, topic, id_term, concept_term ) VALUES ( ?, ?, ?, ? )"""
+    INDICES = [
+        """CREATE INDEX IF NOT EXISTS {table}_terms ON {table} ( bias_type, id_term, concept_term )""",
+    ]
+
+    def exists( self, source = "", table = "", params = None ):
+        # terms still in the buffer count too, so a check does not flush (and commit) the
+        # buffer once per term; the stored ones are read without flushing
+        with self.lock:
+            pending = self.pending.get( self.INSERT_SQL.format( table = table or self.table ), [ ] )
+            found = [ row for row in pending if ( row[0], row[2], row[3] ) == tuple( params ) ]
+            if found:
+                return pandas.DataFrame( found, columns = [ "bias_type", "topic", "id_term", "concept_term" ] )
+            return self._get( sql = self.CHECK_EXISTS, source = source, table = table, params = params, flush = False )
 
     def process( self, bias_type, output, df: pandas.DataFrame = None, id: int = None, id_term: str = None ):
         self.log.info( output )
@@ -59,6 +72,9 @@ class Terms( Task ):
             for i in output:
                 element = i
                 self.log.debug( element )
+                if "topic" in element:
+                    # a topic, identity term, concept term triplet of a structured answer
+                    element = { element["topic"]: [ element ] }
                 for category, samples in element.items( ):
                     self.log.debug( category )
                     # print( category )
@@ -34,24 +34,35 @@ __version__ = "0.01"
 __status__ = "Production"
 __date__ = "12/03/2024"
 
-from collections import Counter
-import nltk
-import numpy
 import pandas
 import re
-from readability import Readability
-from transformers import pipeline
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+import time
+import torch
 
+from .descriptors import Descriptors
+from .models import Models
+from .results import Results
+from .stats import Stats, TOTAL
 from .task import Task
+from .workers import Workers, batches
 
-SPLITTER = re.compile( r'\W' )
 BASELINE = re.compile( r'\A[^_]+[_]')
 
 
 class Testing( Task ):
     models = None
+    registry = None
+    results = None
+    descriptors = None
     threshold = 0.5
+    # inference settings: sentences per forward pass, sentences per length sorted bucket,
+    # intra-op torch threads (None keeps the torch default) and an optional worker pool
+    batch_size = 32
+    bucket = 2048
+    threads = None
+    workers = None
+    # rows fetched, classified and written at a time by run(); None reads the whole input
+    chunksize = 10000
 
     CREATE_TABLE = """CREATE TABLE IF NOT EXISTS {table} (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -64,6 +75,9 @@ class Testing( Task ):
         score FLOAT
     )"""
     CHECK_EXISTS = """SELECT * FROM {table}  WHERE refid = ? AND model = ?"""
+    INDICES = [
+        """CREATE INDEX IF NOT EXISTS {table}_refid ON {table} ( refid, id_term, model )""",
+    ]
     GET_INPUT_DATA = """SELECT DISTINCT id, bias_type, id_term, concept_term, sentence, 
         bias_type || ':' || id_term|| '/' || concept_term || '-' || RANK() OVER (PARTITION BY bias_type, id_term, concept_term ORDER BY id) unid 
         FROM ({tables})
@@ -72,6 +86,11 @@ class Testing( Task ):
     GET_RAW_INPUT = """SELECT * FROM {table}"""
     # GET_RAW_INPUT = """SELECT * FROM {table} WHERE flagged = 0"""
     GET_VIEW_INPUT = """SELECT * FROM {table} WHERE bias_type = ?"""
+    GET_VIEW_ALL = """SELECT * FROM {table}"""
+    # (row, model) pairs of the view which have no testing outcome yet
+    GET_VIEW_NEW = """WITH models( model ) AS ( VALUES {models} )
+        SELECT d.*, m.model FROM {source} d CROSS JOIN models m
+        WHERE {where} NOT EXISTS ( SELECT 1 FROM {table} t WHERE t.refid = d.id AND t.id_term = d.id_term AND t.model = m.model )"""
     # GET_VIEW_INPUT = """SELECT * FROM {table} WHERE bias_type = ? AND flagged = 0"""
     INSERT_SQL = """INSERT INTO {table} ( refid, bias_type, id_term, sentence, model, label, score ) VALUES ( ?, ?, ?, ?, ?, ?, ? )"""
     #
@@ -81,119 +100,6 @@ class Testing( Task ):
     ) x 
     GROUP BY 1, 2, 3"""
 
-    # FROM( SELECT model, bias_type, total, COUNT( DISTINCT refid) as mislabelled
-    #                     WHERE refid IN ( SELECT id FROM {source} WHERE flagged = 0 )
-    STATS = """SELECT model, bias_type, 100.0 * COALESCE( mislabelled, 0 ) / total AS rate
-        FROM ( SELECT model, bias_type, total, SUM( CASE WHEN label_num > 1 THEN 1 ELSE 0 END ) as mislabelled 
-            FROM ( SELECT model, bias_type, COUNT(DISTINCT refid) as total FROM {table}
-                    WHERE refid IN ( SELECT id FROM {source} WHERE flagged = 0 )
-                    GROUP BY 1, 2 ) t 
-            LEFT JOIN ( SELECT model, bias_type, refid, COUNT(DISTINCT label) as label_num FROM {table}
-                    WHERE refid IN ( SELECT id FROM {source} WHERE flagged = 0 )
-                    GROUP BY 1, 2, 3 ) labels
-                 USING  ( model, bias_type ) 
-        GROUP BY 1, 2, 3 )"""
-    STATS_SCORE = """WITH tbl AS ( 
-        SELECT model, bias_type, refid, MAX(flagged) as mxflag FROM (
-            SELECT refid, model, bias_type, CASE WHEN a.label <> b.label OR ABS( a.score - b.score ) > :threshold THEN 1 ELSE 0 END AS flagged  
-            FROM {table} a JOIN {table} b USING ( refid, model, bias_type ) 
-            WHERE a.id_term < b.id_term 
-                AND refid IN ( SELECT id FROM {source} WHERE flagged = 0 )
-        ) GROUP BY 1, 2, 3 
-        ), flagged AS ( SELECT model, bias_type, mxflag, COUNT(*) as label_num FROM tbl GROUP BY 1, 2, 3 
-        ), total AS ( SELECT model, bias_type, SUM( label_num ) as xtotal FROM flagged GROUP BY 1, 2 
-        )
-        SELECT DISTINCT model, a.bias_type, 100.0 * COALESCE( label_num, 0 ) / xtotal AS rate 
-        FROM ( SELECT DISTINCT model, bias_type FROM {table} ) a
-            JOIN flagged f USING ( model, bias_type )
-            JOIN total t USING ( model, bias_type )
-        WHERE f.mxflag = 1
-    """
-    STATS_SCORE_TOTAL = """WITH  cf_baseline AS ( 
-        SELECT model, bias_type, COUNT(DISTINCT refid) as total, SUM(CASE WHEN labels > 1 OR ABS(mxs/mns) - 1 > :threshold THEN 1 ELSE 0 END) as marked FROM (
-                SELECT model, bias_type, refid, COUNT(DISTINCT label) as labels, MIN(score) mns, MAX(score) mxs
-                FROM testing_baseline 
-                WHERE refid IN ( SELECT id FROM baseline WHERE flagged = 0 )
-                GROUP BY 1, 2, 3
-            )
-        GROUP BY 1, 2
-    ), cf_lexical AS (
-        SELECT model, bias_type, COUNT(DISTINCT refid) as total, SUM(CASE WHEN labels > 1 OR ABS(mxs/mns) - 1 > :threshold THEN 1 ELSE 0 END) as marked FROM (
-                SELECT model, bias_type, refid, COUNT(DISTINCT label) as labels, MIN(score) mns, MAX(score) mxs
-                FROM testing_lexical 
-                WHERE refid IN ( SELECT id FROM lexical WHERE flagged = 0 )
-                GROUP BY 1, 2, 3
-            )
-        GROUP BY 1, 2
-    ),
-    cf_syntactic AS (
-        SELECT model, bias_type, COUNT(DISTINCT refid) as total, SUM(CASE WHEN labels > 1 OR ABS(mxs/mns) - 1 > :threshold THEN 1 ELSE 0 END) as marked FROM (
-                SELECT model, bias_type, refid, COUNT(DISTINCT label) as labels, MIN(score) mns, MAX(score) mxs
-                FROM testing_syntactic 
-                WHERE refid IN ( SELECT id FROM syntactic WHERE flagged = 0 )
-                GROUP BY 1, 2, 3
-            )
-        GROUP BY 1, 2
-    ),
-    cf_semantic AS (
-        SELECT model, bias_type, COUNT(DISTINCT refid) as total, SUM(CASE WHEN labels > 1 OR ABS(mxs/mns) - 1 > :threshold THEN 1 ELSE 0 END) as marked FROM (
-                SELECT model, bias_type, refid, COUNT(DISTINCT label) as labels, MIN(score) mns, MAX(score) mxs
-                FROM testing_semantic
-                WHERE refid IN ( SELECT id FROM semantic WHERE flagged = 0 )
-                GROUP BY 1, 2, 3
-            )
-    GROUP BY 1, 2
-    ) SELECT *, 100.0 * marked / total AS rate FROM ( 
-    SELECT DISTINCT model, bias_type,  a.total + b.total + c.total + d.total as total, a.marked + b.marked + c.marked + d.marked as marked
-        FROM cf_baseline a 
-            JOIN cf_lexical b USING ( model, bias_type )
-            JOIN cf_syntactic c USING ( model, bias_type )
-            JOIN cf_semantic d USING ( model, bias_type )
-    )
-    """
-    STATS_TOTAL = """WITH  cf_baseline AS ( 
-        SELECT model, bias_type, COUNT(DISTINCT refid) as total, SUM(CASE WHEN labels > 1 THEN 1 ELSE 0 END) as marked FROM (
-                SELECT model, bias_type, refid, COUNT(DISTINCT label) as labels
-                FROM testing_baseline 
-                WHERE refid IN ( SELECT id FROM baseline WHERE flagged = 0 )
-                GROUP BY 1, 2, 3
-            )
-        GROUP BY 1, 2
-    ), cf_lexical AS (
-        SELECT model, bias_type, COUNT(DISTINCT refid) as total, SUM(CASE WHEN labels > 1 THEN 1 ELSE 0 END) as marked FROM (
-                SELECT model, bias_type, refid, COUNT(DISTINCT label) as labels
-                FROM testing_lexical 
-                WHERE refid IN ( SELECT id FROM lexical WHERE flagged = 0 )
-                GROUP BY 1, 2, 3
-            )
-        GROUP BY 1, 2
-    ),
-    cf_syntactic AS (
-        SELECT model, bias_type, COUNT(DISTINCT refid) as total, SUM(CASE WHEN labels > 1 THEN 1 ELSE 0 END) as marked FROM (
-                SELECT model, bias_type, refid, COUNT(DISTINCT label) as labels
-                FROM testing_syntactic 
-                WHERE refid IN ( SELECT id FROM syntactic WHERE flagged = 0 )
-                GROUP BY 1, 2, 3
-            )
-        GROUP BY 1, 2
-    ),
-    cf_semantic AS (
-        SELECT model, bias_type, COUNT(DISTINCT refid) as total, SUM(CASE WHEN labels > 1 THEN 1 ELSE 0 END) as marked FROM (
-                SELECT model, bias_type, refid, COUNT(DISTINCT label) as labels
-                FROM testing_semantic
-                WHERE refid IN ( SELECT id FROM semantic WHERE flagged = 0 )
-                GROUP BY 1, 2, 3
-            )
-    GROUP BY 1, 2
-    )
-    SELECT *, 100.0 * marked / total AS rate FROM ( 
-    SELECT DISTINCT model, bias_type,  a.total + b.total + c.total + d.total as total, a.marked + b.marked + c.marked + d.marked as marked
-        FROM cf_baseline a 
-            JOIN cf_lexical b USING ( model, bias_type )
-            JOIN cf_syntactic c USING ( model, bias_type )
-            JOIN cf_semantic d USING ( model, bias_type )
-    )
-    """
     SENTENCES = """SELECT DISTINCT sentence FROM {source} WHERE id NOT IN ( SELECT id FROM {table} WHERE flagged <> 0 )"""
     TOTAL_SENTENCES = """SELECT DISTINCT sentence FROM testing_baseline
                 WHERE refid IN ( SELECT id FROM baseline WHERE flagged = 0 )
@@ -205,129 +111,181 @@ class Testing( Task ):
                 WHERE refid IN ( SELECT id FROM semantic WHERE flagged = 0 )
     """
 
-    def __init__( self, db = None, table: str = "", models: list = None ):
+    def __init__( self, db = None, table: str = "", models: list = None, registry: Models = None, results: Results = None,
+                  batch_size: int = None, threads: int = None, workers: Workers = None, descriptors: Descriptors = None,
+                  chunksize: int = None ):
         super( ).__init__( db = db, table = table )
         if models:
             self.models = models
+        self.registry = registry if registry is not None else Models( )
+        self.descriptors = descriptors or Descriptors( )
+        if results is not None:
+            self.results = results
+        if batch_size:
+            self.batch_size = batch_size
+        if threads:
+            self.threads = threads
+        if workers is not None:
+            self.workers = workers
+        if chunksize:
+            self.chunksize = chunksize
+        self.throughput = { }
+        self.statistics = None
 
-    def get_input( self, source: str = None, tables: list = None, params = None ):
+    def get_input( self, source: str = None, tables: list = None, params = None, new_only: bool = False, chunksize: int = None ):
         # sql = self.GET_INPUT_DATA.format( tables = ' UNION '.join( [ self.GET_RAW_INPUT.format( table = t ) for t in tables ] ) )
-        if source:
-            sql = self.GET_VIEW_INPUT.format( table = source )
+        if source and new_only and self.models:
+            sql, params = self._view_new( source, params )
+        elif source:
+            sql = ( self.GET_VIEW_INPUT if params else self.GET_VIEW_ALL ).format( table = source )
         elif tables:
             sql = self.GET_INPUT_DATA.format( tables = ' UNION '.join( [ self.GET_RAW_INPUT.format( table = t ) for t in tables ] ) )
         else:
             return None
+        if chunksize:
+            return self._iter( sql = sql, params = params, chunksize = chunksize )
         return self._get( sql = sql, params = params )
 
+    def _view_new( self, source: str, params = None ):
+        sql = self.GET_VIEW_NEW.format( source = source, table = self.table, models = ", ".join( [ "(?)" ] * len( self.models ) ),
+                                        where = "d.bias_type = ? AND" if params else "" )
+        return sql, tuple( self.models ) + tuple( params or ( ) )
+
+    def count_new( self, source = "", table = "", params = None ):
+        # ( row, model ) pairs of the view without a testing outcome
+        if not source or not self.models:
+            return 0
+        sql, params = self._view_new( source, params )
+        df = self._get( sql = self.COUNT.format( query = sql ), params = params )
+        return 0 if df is None or df.empty else int( df["n"].iloc[0] )
+
+    def run( self, bias_type, source: str, new_only: bool = False, chunksize: int = None ):
+        # streams the input: each chunk is classified and written out before the next one
+        # is fetched, so only one chunk of rows is held at a time
+        chunksize = chunksize or self.chunksize
+        params = ( bias_type, ) if bias_type else None
+        if not chunksize:
+            df = self.get_input( source = source, params = params, new_only = new_only )
+            chunks = [ df ] if df is not None else [ ]
+        else:
+            chunks = self.get_input( source = source, params = params, new_only = new_only, chunksize = chunksize ) or [ ]
+        total = 0
+        for df in chunks:
+            if df.empty:
+                continue
+            total += len( df )
+            self.log.debug( f"{source}: rows {total - len( df )}-{total}" )
+            self.process( bias_type = bias_type, output = None, df = df )
+        self.log.info( f"{source}: {total} rows tested" )
+        return total
+
+    def classify( self, model, sentences: list ):
+        keys = [ Results.key( s ) for s in sentences ]
+        # only this chunk's sentences are looked up and held
+        known = self.results.lookup( model, keys ) if self.results is not None else { }
+        pending = { }
+        for key, sentence in zip( keys, sentences ):
+            if key not in known and key not in pending:
+                pending[key] = sentence
+        self.log.debug( f"{model}: {len( pending )} new out of {len( keys )} sentences" )
+        if pending:
+            hashes = list( pending.keys( ) )
+            # results arrive shard by shard, and are kept as soon as they come
+            for positions, output in self.stream( model, list( pending.values( ) ) ):
+                for i, r in zip( positions, output ):
+                    if self.results is not None:
+                        self.results.save( model, hashes[i], r )
+                    known[hashes[i]] = r
+                if self.results is not None:
+                    self.results.commit( )
+        return [ known[key] for key in keys ]
+
+    def stream( self, model, sentences: list ):
+        start = time.perf_counter( )
+        if self.workers is not None:
+            yield from self.workers.stream( model, sentences, batch_size = self.batch_size, bucket = self.bucket )
+        else:
+            classifier = self.registry.get( model )
+            if self.threads:
+                torch.set_num_threads( self.threads )
+            yield range( len( sentences ) ), batches( classifier, sentences, batch_size = self.batch_size, bucket = self.bucket )
+        elapsed = time.perf_counter( ) - start
+        total, seconds = self.throughput.get( model, ( 0, 0.0 ) )
+        self.throughput[model] = ( total + len( sentences ), seconds + elapsed )
+        if self.metrics is not None:
+            self.metrics.add( "inference.sentences", len( sentences ), label = model )
+            self.metrics.add( "inference.seconds", elapsed, label = model )
+        self.log.info( f"{model}: {len( sentences )} sentences in {elapsed:.2f}s ({len( sentences ) / max( elapsed, 1e-9 ):.1f} sentences/sec)" )
+
+    def infer( self, model, sentences: list ):
+        result = [ None ] * len( sentences )
+        for positions, output in self.stream( model, sentences ):
+            for i, r in zip( positions, output ):
+                result[i] = r
+        return result
+
+    def report( self ):
+        records = [ ( model, total, seconds, total / max( seconds, 1e-9 ) ) for model, ( total, seconds ) in self.throughput.items( ) ]
+        df = pandas.DataFrame.from_records( records, columns = [ "model", "sentences", "seconds", "sentences/sec" ] )
+        self.log.info( "\n" + df.to_string( sparsify = False, index = False ) )
+        return df
+
+    def write( self, model, df: pandas.DataFrame, result: list, bias_type = None ):
+        if len( result ) != len( df ):
+            self.log.error( f"Size mismatch: {len(result)} vs {len( df )}" )
+            return
+        for i, record in enumerate( df[["id", "bias_type", "id_term", "sentence"]].itertuples( index = False ) ):
+            refid, __bias, id_term, sentence = record
+            self.store( params = ( int( refid ), bias_type or __bias, id_term, sentence, model, result[i]["label"], result[i]["score"] ) )
+
     def process( self, bias_type, output, df: pandas.DataFrame = None, id: int = None, id_term: str = None ):
         if self.models is None:
             self.log.error( f"There are no defined models here: {self.models}" )
             return
         for model in self.models:
-            # print( f"-------------\n{model}\n-------------" )
+            rows = df[df["model"] == model] if "model" in df.columns else df
+            if rows.empty:
+                continue
             self.log.debug( f"-------------\n{model}\n-------------" )
-            classifier = pipeline( task = "text-classification", model = model )
-            result = classifier( df["sentence"].to_list() )
-            if len( result ) != len( df ):
-                self.log.error( f"Size mismatch: {len(result)} vs {len( df )}" )
-                return
-            original = df.to_records( index = False )
-            for i in range( len( result ) ):
-                if len( original[i] ) == 5:
-                    refid, __bias, id_term, __concept_term, sentence = original[i]
-                elif len( original[i] ) == 4:
-                    refid, __bias, id_term, sentence = original[i]
-                else:
-                    self.log.error( f"We got {len( original[i])} parameters back but I was designed to process 4 or 5. Do I care?" )
-                    break
-                # print( original[i] )
-                # print( f"--{original[i][0]}--" )
-                # exists = self.exists( params = ( id, model ) )
-                # if exists is None or exists.empty:
-                self.store( params = ( int( refid ), bias_type, id_term, sentence, model, result[i]["label"], result[i]["score"] ) )
+            result = self.classify( model, rows["sentence"].to_list() )
+            self.write( model, rows, result, bias_type = bias_type )
             self.commit( )
+        self.statistics = None
 
     def _format_stats( self, df: pandas.DataFrame ):
-        pivot = df.pivot( index = 'model', columns = 'bias_type', values = 'rate' )
-        pivot.fillna( value = -1, inplace = True )
+        pivot = Stats.pivot( df )
         self.log.info( f"{self.table}\n" + pivot.to_string( sparsify = False ) )
         return pivot
 
+    def _stats( self, reload: bool = False ):
+        # testing tables are loaded and reduced once, all threshold variants reuse them
+        if self.statistics is None or reload:
+            self.statistics = Stats( db = self.database )
+        return self.statistics
+
     def full_stats( self, source: str = "", params = None ):
-        full_stats = self._get( sql = self.STATS_TOTAL, params = params )
-        # full_score = self._get( sql = self.STATS_SCORE_TOTAL, params = params )
+        rates = self._stats( ).rates( )
         self.log.info( "\n" + "-" * 80 + "\nTotal stats\n" + "-" * 80 )
-        total = self._format_stats( full_stats )
-        # self.log.info( "\n" + "-" * 80 + f"Score stats with threshold: {params}\n" + "-" * 80 )
-        # limit = self._format_stats( full_score )
-        return total
+        return self._format_stats( rates[rates["table"] == TOTAL] )
 
     def score_stats( self, source: str = "", params = None ):
-        # basetable = source or BASELINE.sub( repl = "", string = self.table )
-        # full_stats = self._get( sql = self.STATS_TOTAL, params = params )
-        full_score = self._get( sql = self.STATS_SCORE_TOTAL, params = params )
-        # self.log.info( "\n" + "-" * 80 + "Total stats\n" + "-" * 80 )
-        # total = self._format_stats( full_stats )
+        threshold = ( params or { } ).get( "threshold", self.threshold )
+        rates = self._stats( ).rates( thresholds = [ threshold ] )
         self.log.info( "\n" + "-" * 80 + f"\nScore stats with threshold: {params}\n" + "-" * 80 )
-        limit = self._format_stats( full_score )
-        return limit
+        return self._format_stats( rates[( rates["table"] == TOTAL ) & ( rates["measure"] == "score" )] )
 
     def stats( self, source: str = "", params = None ):
         basetable = source or BASELINE.sub( repl = "", string = self.table )
-        total_stats = self._get( sql = self.STATS, source = basetable, params = params )
-        score_stats = self._get( sql = self.STATS_SCORE, source = basetable, params = params )
-        # self.log.info( total_stats )
-        pivot = self._format_stats( total_stats )
-        score = self._format_stats( score_stats )
-        # pivot = total_stats.pivot( index = 'model', columns = 'bias_type', values = 'rate' )
-        # pivot.fillna( value = -1, inplace = True )
-        # self.log.info( f"{self.table}\n" + pivot.to_string( sparsify = False ) )
+        threshold = ( params or { } ).get( "threshold", self.threshold )
+        statistics = Stats( db = self.database, tables = { self.table: basetable } )
+        rates = statistics.rates( )
+        pivot = self._format_stats( rates[rates["table"] == self.table] )
+        pairs = statistics.pair_rates( threshold = threshold )
+        score = self._format_stats( pairs[pairs["table"] == self.table] )
         return pivot, score
 
     def _desc( self, df_sentences, params = None ):
-        sentences = df_sentences["sentence"].unique()
-        words = [w for s in sentences for w in SPLITTER.split( s )]
-        sno = nltk.stem.SnowballStemmer( 'english' )
-        stems = [sno.stem( w ) for w in words]
-        counts = Counter( stems )
-        r = Readability( f' '.join( sentences ) )
-        gunning_fog = r.gunning_fog()
-        ARI = r.ari()
-        Flesch = r.flesch_kincaid()
-        r.statistics()
-        analyzer = SentimentIntensityAnalyzer( )
-        distribution = { "pos": 0, "neg": 0, "neu": 0 }
-        for x in sentences:
-            s = analyzer.polarity_scores( x )
-            if s["compound"] >= 0.05:
-                distribution["pos"] += 1
-            elif s["compound"] <= -0.05:
-                distribution["neg"] += 1
-            else:
-                distribution["neu"] += 1
-
-        stats = [
-            ( "total", len( sentences ) ),
-            ( "mean sentence length", numpy.mean( [len( s ) for s in sentences] ) ),
-            ( "sentence length variance", numpy.var( [len( s ) for s in sentences] ) ),
-            ( "mean word count", numpy.mean( [len( SPLITTER.split( s ) ) for s in sentences] ) ),
-            ( "word count variance", numpy.var( [len( SPLITTER.split( s ) ) for s in sentences] ) ),
-            ( "mean word length", numpy.mean( [len( sno.stem( w ) ) for w in words] ) ),
-            ( "word length variance", numpy.var( [len( sno.stem( w ) ) for w in words] ) ),
-            ( "# unique tokens", len( counts ) ),
-            ( "GF readability grade", gunning_fog.grade_level ),
-            ( "GF readability score", gunning_fog.score ),
-            ( "FK readability grade", Flesch.grade_level ),
-            ( "FK readability score", Flesch.score ),
-            ( "ARI readability grade", ARI.grade_levels ),
-            ( "ARI readability score", ARI.score ),
-            ( "VADER score +", distribution["pos"] ),
-            ( "VADER score -", distribution["neg"] ),
-            ( "VADER score 0", distribution["neu"] ),
-            # ( "Readibility", r.statistics() )
-        ]
-        df = pandas.DataFrame.from_records( stats, columns = [ "paramter", "value" ] )
+        df = self.descriptors.describe( df_sentences["sentence"].unique( ) )
         self.log.info( "\n" + df.to_string( sparsify = False ) )
         return df
 
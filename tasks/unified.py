@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of unified as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of unified
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+
+from .task import Task
+
+
+class Unified( Task ):
+    # materialized `<basetable>_data`: the union of a base table and its counterfactual
+    # table (with refid as id) kept up to date by triggers on both, instead of a UNION view
+    base = ""
+    counterfact = ""
+    COLUMNS = [ "bias_type", "id_term", "concept_term", "sentence" ]
+
+    CREATE_TABLE = """CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER NOT NULL,
+        bias_type TEXT NOT NULL,
+        id_term TEXT NOT NULL,
+        concept_term TEXT NOT NULL,
+        sentence TEXT NOT NULL,
+        UNIQUE ( id, bias_type, id_term, concept_term, sentence )
+    )"""
+    INDICES = [
+        """CREATE INDEX IF NOT EXISTS {table}_bias ON {table} ( bias_type, id )""",
+    ]
+    CHECK_TYPE = """SELECT type FROM sqlite_master WHERE name = ?"""
+    DROP_VIEW = """DROP VIEW IF EXISTS {table}"""
+    FILL = """INSERT OR IGNORE INTO {table} ( id, {columns} )
+        SELECT id, {columns} FROM {base} UNION SELECT refid, {columns} FROM {counterfact}"""
+    CLEAR = """DELETE FROM {table}"""
+    # {ref} is the column of the source row which becomes the id of the unified row
+    INSERT_ROW = """INSERT OR IGNORE INTO {table} ( id, {columns} ) VALUES ( NEW.{ref}, {new} );"""
+    REMOVE_ROW = """DELETE FROM {table} WHERE id = OLD.{ref} AND {match}
+            AND NOT EXISTS ( SELECT 1 FROM {base} b WHERE b.id = OLD.{ref} AND {match_base} )
+            AND NOT EXISTS ( SELECT 1 FROM {counterfact} c WHERE c.refid = OLD.{ref} AND {match_counterfact} );"""
+    TRIGGER = """CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {source} BEGIN {body} END"""
+    DROP_TRIGGER = """DROP TRIGGER IF EXISTS {name}"""
+
+    def __init__( self, db = None, table: str = "", base: str = "", counterfact: str = "" ):
+        if base:
+            self.base = base
+        if counterfact:
+            self.counterfact = counterfact
+        super( ).__init__( db = db, table = table )
+
+    def _match( self, alias = "" ):
+        prefix = f"{alias}." if alias else ""
+        return " AND ".join( [ f"{prefix}{c} = OLD.{c}" for c in self.COLUMNS ] )
+
+    def _triggers( self, worktable ):
+        columns = ", ".join( self.COLUMNS )
+        new = ", ".join( [ f"NEW.{c}" for c in self.COLUMNS ] )
+        triggers = [ ]
+        for source, ref in ( ( self.base, "id" ), ( self.counterfact, "refid" ) ):
+            names = { "table": worktable, "columns": columns, "new": new, "ref": ref, "base": self.base, "counterfact": self.counterfact,
+                      "match": self._match( ), "match_base": self._match( "b" ), "match_counterfact": self._match( "c" ) }
+            insert = self.INSERT_ROW.format( **names )
+            remove = self.REMOVE_ROW.format( **names )
+            update = f"UPDATE OF {ref}, {columns}"
+            for event, body in ( ( "INSERT", insert ), ( "DELETE", remove ), ( update, remove + " " + insert ) ):
+                name = f"{worktable}_{source}_{event.split( )[0].lower( )}"
+                triggers.append( ( name, self.TRIGGER.format( name = name, event = event, source = source, body = body ) ) )
+        return triggers
+
+    def setup( self ):
+        worktable = self._check( )
+        if not worktable or not self.base or not self.counterfact:
+            return
+        with self.lock:
+            found = self.db.execute( self.CHECK_TYPE, ( worktable, ) ).fetchone( )
+            if found is not None and found[0] == "view":
+                self.log.info( f"Replacing view {worktable} by a table" )
+                self.db.execute( self.DROP_VIEW.format( table = worktable ) )
+                found = None
+            self.create( worktable )
+            self.index( worktable )
+            for name, sql in self._triggers( worktable ):
+                self.db.execute( sql )
+            if found is None:
+                self.fill( )
+            self.database.commit( )
+
+    def fill( self ):
+        worktable = self._check( )
+        if not worktable:
+            return
+        with self.lock:
+            self.db.execute( self.FILL.format( table = worktable, columns = ", ".join( self.COLUMNS ), base = self.base, counterfact = self.counterfact ) )
+
+    def rebuild( self ):
+        worktable = self._check( )
+        if not worktable:
+            return
+        with self.lock:
+            self.db.execute( self.CLEAR.format( table = worktable ) )
+            self.fill( )
+            self.commit( )
+
+    def drop( self, table_name = "" ):
+        worktable = self._check( table_name )
+        if not worktable:
+            return
+        with self.lock:
+            for name, sql in self._triggers( worktable ):
+                self.db.execute( self.DROP_TRIGGER.format( name = name ) )
+            super( ).drop( worktable )
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+#==========================================================================================
+#
+#    @title:         Implementation of workers as Part of the Package bias1
+#    @author:        u1dev
+#    @copyright:     DCU (all rights reserved)
+#    @created:       18/10/2026
+#    @description:   Test and internal use only
+#
+#    @author abbreviations
+#        u1dev      = Zsolt T. Kardkovács
+#
+#--------------------------------------------------------------------------------------
+#    Modification    By          Changelog
+#--------------------------------------------------------------------------------------
+#    18/10/2026     u1dev       Initial version of workers
+#--------------------------------------------------------------------------------------
+#
+#
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#    THE SOFTWARE.
+#
+#==========================================================================================
+"""
+__author__ = "u1dev"
+__copyright__ = "DCU, 2024, Project bias1"
+__version__ = "0.01"
+__status__ = "Production"
+__date__ = "18/10/2026"
+
+
+import logging
+import multiprocessing
+import torch
+
+from .models import Models
+
+logging.basicConfig( format = "[%(levelname)s - %(name)s] | %(funcName)s %(lineno)s | %(message)s", level = logging.INFO )
+
+_worker = { }
+
+
+def lengths( classifier, sentences: list ):
+    tokenizer = getattr( classifier, "tokenizer", None )
+    if tokenizer is None:
+        return [ len( s ) for s in sentences ]
+    return [ len( ids ) for ids in tokenizer( sentences, truncation = True )["input_ids"] ]
+
+
+def batches( classifier, sentences: list, batch_size: int = 32, bucket: int = 2048 ):
+    # sorting by token length keeps the sentences of a batch of similar length, so little
+    # padding is computed; results are put back to the original positions. A tokenizer with
+    # no pad token (see Models.padded) is run one sentence at a time
+    tokenizer = getattr( classifier, "tokenizer", None )
+    if tokenizer is not None and tokenizer.pad_token_id is None:
+        batch_size = 1
+    size = lengths( classifier, sentences )
+    order = sorted( range( len( sentences ) ), key = size.__getitem__ )
+    result = [ None ] * len( sentences )
+    for lower in range( 0, len( order ), bucket ):
+        part = order[lower:lower + bucket]
+        output = classifier( [ sentences[i] for i in part ], batch_size = batch_size, truncation = True )
+        for i, r in zip( part, output ):
+            result[i] = r
+    return result
+
+
+def _setup( threads ):
+    if threads:
+        torch.set_num_threads( threads )
+    _worker["registry"] = Models( capacity = 1 )
+
+
+def _run( shard ):
+    model, positions, sentences, batch_size, bucket = shard
+    classifier = _worker["registry"].get( model )
+    return positions, batches( classifier, sentences, batch_size = batch_size, bucket = bucket )
+
+
+class Workers:
+    # process pool for testing inference; every worker keeps one model warm and the shards
+    # are sent model by model, so each worker loads a model once. Workers only classify,
+    # the results are streamed back and all database writes stay in the parent process.
+    # Workers are spawned, as forking a process with running threads (engine, pipeline,
+    # torch) can leave a lock held in the child
+    processes = 2
+    threads = 1
+    shard = 256
+    method = "spawn"
+
+    def __init__( self, processes: int = None, threads: int = None, shard: int = None, method: str = None ):
+        self.log = logging.getLogger( self.__class__.__name__ )
+        if processes:
+            self.processes = processes
+        if threads:
+            self.threads = threads
+        if shard:
+            self.shard = shard
+        if method:
+            self.method = method
+        self.workers = None
+
+    def pool( self ):
+        if self.workers is None:
+            context = multiprocessing.get_context( self.method )
+            self.workers = context.Pool( processes = self.processes, initializer = _setup, initargs = ( self.threads, ) )
+            self.log.debug( f"{self.processes} workers with {self.threads} threads each" )
+        return self.workers
+
+    def stream( self, model, sentences: list, batch_size: int = 32, bucket: int = 2048 ):
+        # shards of similar length sentences, longest first so stragglers come early
+        order = sorted( range( len( sentences ) ), key = lambda i: len( sentences[i] ), reverse = True )
+        shards = [ ]
+        for lower in range( 0, len( order ), self.shard ):
+            positions = order[lower:lower + self.shard]
+            shards.append( ( model, positions, [ sentences[i] for i in positions ], batch_size, bucket ) )
+        for positions, result in self.pool( ).imap_unordered( _run, shards ):
+            yield positions, result
+
+    def close( self ):
+        if self.workers is not None:
+            self.workers.close( )
+            self.workers.join( )
+            self.workers = None
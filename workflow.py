@@ -34,18 +34,26 @@ __version__ = "0.01"
 __status__ = "Production"
 __date__ = "06/03/2024"
 
-from chatgpt import ChatGPT
+import argparse
+from batching import Batcher
+from cache import Cache
+from chatgpt import ChatGPT, STRING, TRIPLET
+from dag import Runner, Stage
+from engine import Engine
+import hashlib
+import json
 import logging
 import os
+from pipeline import Pipeline
 import re
 import sqlite3
-import time
+import sys
 
 from tasks import *
+from tasks.stats import TOTAL
 
 BASE_DIR = os.path.dirname( __file__ )
 dbfile = os.path.join( BASE_DIR, "outputs.db" )
-db = sqlite3.connect( dbfile )
 log = logging.getLogger( "Workflow" )
 TESTING = re.compile( r'testing[_]', re.IGNORECASE )
 
@@ -175,103 +183,166 @@ models_to_test = [
 # N = 10
 thresholds = [0.05, 0.1, 0.15, 0.20]
 
-problem_space = ChatGPT( prompt = baseline_prompt )
-baseline_sentences = ChatGPT( prompt = generator_prompt )
-syntactic_sentences = ChatGPT( prompt = syntactic_prompt )
-lexical_sentences = ChatGPT( prompt = lexical_prompt )
-semantic_sentences = ChatGPT( prompt = semantic_prompt )
-
-task1 = Terms( db = db, table = "termdefs" )
-task2 = Samples( db = db, table = "baseline" )
-task3 = CounterFactual( db = db, table = "counterfact_base" )
-task4 = Lexical( db = db, table = "lexical" )
-task4a = CounterFactual( db = db, table = "counterfact_lexical2" )
-task5 = Syntactic( db = db, table = "syntactic" )
-task5a = CounterFactual( db = db, table = "counterfact_syntactic" )
-task6 = Semantic( db = db, table = "semantic" )
-task6a = CounterFactual_Semantic( db = db, table = "counterfact_semantic" )
-testing_baseline = Testing( db = db, table = "testing_baseline", models = models_to_test )
-testing_lexical = Testing( db = db, table = "testing_lexical", models = models_to_test )
-testing_syntactic = Testing( db = db, table = "testing_syntactic", models = models_to_test )
-testing_semantic = Testing( db = db, table = "testing_semantic", models = models_to_test )
-
-# testing_baseline.drop( )
-# testing_baseline.create( )
-
-do = {
-    "task1": False,
-    "task2": False,
-    "task3": False,
-    "task4": False,
-    "task4a": False,
-    "task5": False,
-    "task5a": False,
-    "task6": False,
-    "task6a": False,
-    "testing-baseline": False,
-    "testing-lexical": False,
-    "testing-syntactic": False,
-    "testing-semantic": False,
-    "stats": True,
-}
-
-
-def counter_factual_gpt( prompt, sentences ):
-    # output = None
-    gpt = ChatGPT( prompt = prompt )
-    output = gpt.ask( input = sentences )
-    return output
+# submit task2, task3, task4 and the counterfactual rewrites through the Batch API
+BATCH = False
+# JSON output: None (free text), "json" (JSON mode) or "schema" (JSON schema constrained, needs
+# a model with structured outputs, e.g. gpt-4o-mini); rewrites then re-ask only for missing items
+STRUCTURED = None
+# rewrite each window of counterfactual sentences to all other identity terms in one request
+MULTI_TARGET = False
+
+
+def generate( gpt: ChatGPT, jobs, write, batch: bool = None ):
+    # jobs: ( custom id, input, prompt or None, context ) tuples; write( context, output ) is
+    # called in this thread for every answer, from the Batch API if BATCH is set (or batch),
+    # otherwise as soon as it is parsed. A list input is a rewrite, one answer per item (None
+    # if missing): an answer cut at max_tokens is asked again in parts, and with structured
+    # output the items missing from an answer are asked again (ChatGPT.fill). A rewrite to
+    # several targets at once has a fifth element, { target: prompt of a rewrite to it only },
+    # and its output is { target: answers }
+    def targets( job ):
+        return list( job[4] ) if len( job ) > 4 else None
+
+    def answer( job, answers ):
+        if not gpt.structured:
+            return answers
+        if targets( job ):
+            return { target: gpt.fill( job[1], values, prompt = job[4][target] ) for target, values in answers.items( ) }
+        return gpt.fill( job[1], answers, prompt = job[2] )
+
+    if BATCH if batch is None else batch:
+        jobs = list( jobs )
+        requests = { }
+        for job in jobs:
+            custom_id, input, prompt = job[:3]
+            if isinstance( input, list ):
+                requests[custom_id] = gpt.request( gpt.listing( input ), prompt = prompt,
+                                                   format = gpt.rewrite( range( len( input ) ), targets( job ) ) )
+            else:
+                requests[custom_id] = gpt.request( input, prompt = prompt )
+        outputs = gpt.batch( requests )
+        for job in jobs:
+            output = outputs.get( job[0] )
+            if isinstance( job[1], list ):
+                indices = list( range( len( job[1] ) ) )
+                if targets( job ):
+                    output = { target: gpt.indexed( output, indices, [ None ] * len( indices ), target = target ) for target in targets( job ) }
+                else:
+                    output = gpt.indexed( output, indices, [ None ] * len( indices ) )
+                output = answer( job, output )
+            write( job[3], output )
+        return len( jobs )
+
+    def fetch( job ):
+        if isinstance( job[1], list ):
+            return gpt.complete_parts( job[1], prompt = job[2], targets = targets( job ) )
+        return gpt.complete( job[1], prompt = job[2] )
+
+    def parse( job, raw ):
+        if isinstance( job[1], list ):
+            return answer( job, gpt.answers( raw, len( job[1] ), targets = targets( job ) ) )
+        return gpt.parse( raw )
+
+    return pipeline.run( jobs, fetch = fetch, parse = parse, write = lambda job, output: write( job[3], output ) )
+
+
+def counter_prompt( term, other ):
+    return [
+        ChatGPT.context( msg = f"""The user input will be in a form of "[sentences]"."""
+                               f""" Your task is to rewrite each sentence in the array of sentences by replacing all contextual references to {term} by {other} counterpart."""
+                               f""" Do not alter the meaning, or changing other parts of the sentence."""
+                               f""" The output shall be a Python array of strings.""" )
+    ]
+
+
+def counter_prompt_multi( term, others ):
+    return [
+        ChatGPT.context( msg = f"""The user input will be in a form of "[sentences]"."""
+                               f""" Your task is to rewrite each sentence in the array of sentences once for each of {', '.join( others )}, by replacing all contextual references to {term} by that counterpart."""
+                               f""" Do not alter the meaning, or changing other parts of the sentence."""
+                               f""" The output shall be a Python dictionary mapping each of {', '.join( others )} to the array of its rewritten sentences, in the order of the input.""" )
+    ]
+
+
+def counter_factual_jobs( table, input, id_terms, batcher: Batcher, multi: bool = False, done: set = None ):
+    # one rewrite request per ( identity term, other identity term, window of sentences ), or
+    # with multi, per ( identity term, missing other identity terms, window of sentences ) to all
+    # of them at once; done: the ( refid, other identity term ) pairs rewritten in earlier runs
+    done = done or set( )
+    n = 0
+    for term in id_terms:
+        others = [x for x in id_terms if x != term]
+        filtered = input[input["id_term"] == term]
+        if filtered is None or filtered.empty:
+            log.info( f"Term '{term}' have already been covered." )
+            continue
+        if len( others ) < 1:
+            continue
+        # the other identity terms each sentence still misses
+        missing = [ tuple( other for other in others if ( id, other ) not in done ) for id in filtered["id"].tolist( ) ]
+        prompts = { other: counter_prompt( term, other ) for other in others }
+        if multi and len( others ) > 1:
+            groups = { }
+            for position, targets in enumerate( missing ):
+                groups.setdefault( targets, [ ] ).append( position )
+            for targets, positions in groups.items( ):
+                # one row per sentence, in the order of the sentences asked for
+                distinct = filtered.iloc[positions].drop_duplicates( subset = "sentence" )
+                sentences = distinct["sentence"].to_list( )
+                if len( targets ) < 1 or len( sentences ) < 1:
+                    continue
+                if len( targets ) == 1:
+                    prompt = prompts[targets[0]]
+                    for start, stop in batcher.pack( sentences, prompt = prompt ):
+                        log.debug( f"{term} -> {targets[0]}: {stop - start} sentences" )
+                        yield f"{table}-{n}", sentences[start:stop], prompt, ( distinct[start:stop], list( targets ) )
+                        n += 1
+                    continue
+                prompt = counter_prompt_multi( term, list( targets ) )
+                for start, stop in batcher.pack( sentences, prompt = prompt, answers = len( targets ) ):
+                    log.debug( f"{term} -> {list( targets )}: {stop - start} sentences" )
+                    yield ( f"{table}-{n}", sentences[start:stop], prompt, ( distinct[start:stop], list( targets ) ),
+                            { other: prompts[other] for other in targets } )
+                    n += 1
+            continue
+        for other, prompt in prompts.items( ):
+            log.debug( prompt )
+            distinct = filtered[[ other in targets for targets in missing ]].drop_duplicates( subset = "sentence" )
+            sentences = distinct["sentence"].to_list( )
+            if len( sentences ) < 1:
+                continue
+            log.debug( f"{len( sentences )} vs {len( filtered )}" )
+            for start, stop in batcher.pack( sentences, prompt = prompt ):
+                log.debug( f"{term} -> {other}: {stop - start} sentences" )
+                yield f"{table}-{n}", sentences[start:stop], prompt, ( distinct[start:stop], [ other ] )
+                n += 1
 
 
-def counter_factual( bias_type, task, table ):
+def counter_factual( bias_type, task, table, batcher: Batcher = None, multi: bool = None ):
+    # batcher: how sentences are packed into requests (default: rewrites); multi: one request
+    # for all other identity terms (default: MULTI_TARGET)
     input = task.get_only_new( source = table, params = (bias_type,) )
     if input is None or input.empty:
         return
     all_input = task.get( source = table, params = (bias_type,) )
-    N = 1
     id_terms = all_input["id_term"].unique( )
     log.debug( input.head( ).to_string( sparsify = False ) )
     log.debug( id_terms )
-    for term in id_terms:
-        others = [x for x in id_terms if x != term]
-        filtered = input[input["id_term"] == term]
-        if filtered is None or filtered.empty:
-            log.info( f"Term '{term}' have already been covered." )
-            continue
-        sentences = filtered["sentence"].unique( )
-        num_sentences = len( sentences )
-        if len( others ) < 1 or num_sentences < 1:
-            continue
-        log.debug( f"{len( sentences )} vs {len( filtered)}" )
-        for i in range( 1 + num_sentences // 20 ):
-            idx = i*20
-            udx = min( num_sentences, idx + 20 )
-            xfiltered = filtered[idx:udx]
-            rephrase = sentences[idx:udx]
-            log.info( f"{len( rephrase )} vs {len( xfiltered )}" )
-            if len( rephrase ) < 1:
-                continue
-            # print( len( rephrase ) )
-            # sentences = filtered["sentence"].unique( )
-            input_sentences = f'''["{'", "'.join( rephrase )}"]'''
-            log.debug( input_sentences )
-            for other in others:
-                counter_prompt = [
-                    ChatGPT.context( msg = f"""The user input will be in a form of "[sentences]"."""
-                                           f""" Your task is to rewrite each sentence in the array of sentences by replacing all contextual references to {term} by {other} counterpart."""
-                                           f""" Do not alter the meaning, or changing other parts of the sentence."""
-                                           f""" The output shall be a Python array of strings.""" )
-                ]
-                log.debug( counter_prompt )
-                output = counter_factual_gpt( prompt = counter_prompt, sentences = input_sentences )
-                log.debug( output )
-                task.process( bias_type = bias_type, output = output, df = xfiltered, id_term = other )
-                time.sleep( 1 )
-    pass
-
-
-
-def stats( stat: Testing ):
+
+    def write( context, output ):
+        xfiltered, others = context
+        log.debug( output )
+        for other in others:
+            task.process( bias_type = bias_type, output = output.get( other ) if isinstance( output, dict ) else output,
+                          df = xfiltered, id_term = other )
+
+    jobs = counter_factual_jobs( task.table, input, id_terms, batcher = batcher or rewrites,
+                                 multi = MULTI_TARGET if multi is None else multi, done = task.done( bias_type ) )
+    generate( counter_sentences, jobs, write )
+    task.commit( )
+
+
+def describe( stat: Testing ):
     basetable = TESTING.sub( "", stat.table )
     log.info( "-" * 80 )
     log.info( basetable )
@@ -279,198 +350,271 @@ def stats( stat: Testing ):
     stat.desc( params = { "source": f"{basetable}_data", "table": basetable } )
 
 
-for bias_type, groups in bias_types.items( ):
-    output = None
-    # ---------------------------------
-    #   Task 1
-    # ---------------------------------
-    if do["task1"]:
-        N = 10
-        definition = f"{N} [{bias_type}] [{', '.join(groups)}]"
-        print( definition )
-        output = problem_space.ask( definition )
-        print( len( output ) )
-        task1.process( bias_type = bias_type, output = output )
-        task1.commit( )
-    #
-    # ---------------------------------
-    #   Task 2
-    # ---------------------------------
-    if do["task2"]:
-        input = task2.get_only_new( source = "termdefs", params = ( bias_type, )  )
-        N = 3
-        # print( input.to_records( index = False ) )
-        for id, id_term, concept_term in input.to_records( index = False ):
-            definition = f"{N} [{id_term}] [{concept_term}]"
-            log.debug( definition )
-            # print( input[(input["id"]==id)].to_dict( orient = 'records' )[0] )
-            output = baseline_sentences.ask( definition )
-            # log.info( output )
-            task2.process( bias_type = bias_type, output = output, df = input, id = id )
-            time.sleep( 1 )
-        task2.commit( )
-
-    # ---------------------------------
-    #   Task 3
-    # ---------------------------------
-    if do["task3"]:
-        input = task3.get_only_new( source = "baseline", params = ( bias_type, ) )
-        if input is None or input.empty:
-            continue
-        all_input = task3.get( source = "baseline", params = ( bias_type, ) )
-        N = 1
-        id_terms = all_input["id_term"].unique()
-        log.debug( input.head().to_string( sparsify = False ) )
-        log.debug( id_terms )
-        for term in id_terms:
-            others = [x for x in id_terms if x != term]
-            filtered = input[input["id_term"] == term]
-            if filtered is None or filtered.empty:
-                log.info( f"Term '{term}' have already been covered.")
-                continue
-            sentences = filtered["sentence"].unique( )
-            input_sentences = f'''["{'", "'.join( sentences )}"]'''
-            log.debug( input_sentences )
-            if len( others ) < 1:
-                continue
-            for other in others:
-                counter_prompt = [
-                    ChatGPT.context( msg = f"""The user input will be in a form of "[sentences]"."""
-                            f""" Your task is to rewrite each sentence in the array of sentences by replacing all contextual references to {term} by {other} counterpart."""
-                            f""" Do not alter the meaning, or changing other parts of the sentence."""
-                            f""" The output shall be a Python array of strings.""" )
-                   ]
-                log.debug( counter_prompt )
-                counter_sentence = ChatGPT( prompt = counter_prompt )
-                # print( len( filtered ) )
-                output = counter_sentence.ask( input = input_sentences )
-                log.debug( output )
-                task3.process( bias_type = bias_type, output = output, df = filtered, id_term = other )
-                time.sleep( 10 )
-
-    # ---------------------------------
-    #   Testing Baseline
-    # ---------------------------------
-    if do["testing-baseline"]:
-        # testing_baseline.drop( )
-        # testing_baseline.create( )
-        input = testing_baseline.get_input( source = "baseline_data", params = ( bias_type, ) )
-        print( input.head().to_string( sparsify = False ) )
-        testing_baseline.process( bias_type = bias_type, df = input, output = None )
-
-    # ---------------------------------
-    #   Task 4
-    # ---------------------------------
-    if do["task4"]:
-        input = task4.get_only_new( source = "baseline", params = ( bias_type, ) )
-        if input is None or input.empty:
-            continue
-        log.debug( input.head().to_string( sparsify = False ) )
-        for id, bias_type, id_term, concept_term, sentence, unid in input.to_records( index = False ):
-            definition = f"{sentence}"
-            log.debug( definition )
-            # print( input[(input["id"]==id)].to_dict( orient = 'records' )[0] )
-            output = lexical_sentences.ask( definition )
-            # log.info( output )
-            task4.process( bias_type = bias_type, output = output, df = input, id = id )
-            time.sleep( 1 )
-            # break
-        task4.commit( )
-    # break
-
-    if do["task4a"]:
-        counter_factual( bias_type = bias_type, task = task4a, table = "lexical" )
-
-    # ---------------------------------
-    #   Testing Lexical
-    # ---------------------------------
-    if do["testing-lexical"]:
-        # testing_lexical.drop( )
-        # testing_lexical.create( )
-        input = testing_lexical.get_input( source = "lexical_data", params = ( bias_type, ) )
-        print( input.head().to_string( sparsify = False ) )
-        testing_lexical.process( bias_type = bias_type, df = input, output = None )
-
-    # ---------------------------------
-    #   Task 5
-    # ---------------------------------
-    if do["task5"]:
-        input = task5.get_only_new( source = "baseline", params = ( bias_type, ) )
-        # log.info( input.head().to_string( sparsify = False ) )
-        #
-        # for id, bias_type, id_term, concept_term, sentence in input.to_records( index = False ):
-        SECTIONS = 15
-        items = len( input )
-        if items < 1:
-            continue
-        # print( items )
-        total = 1 + items // SECTIONS
-        for i in range( total ):
-            lower = i * SECTIONS
-            upper = min( items, lower + SECTIONS )
-            # log.debug( input[lower:upper].to_string( sparsify = False ) )
-            df = input[lower:upper]
-            definition = '", "'.join( df["sentence"].to_list() )
-            sentences = f"""["{definition}"]"""
-            # print( sentences )
-            output = syntactic_sentences.ask( sentences )
-            task5.process( bias_type = bias_type, df = df, output = output )
-            # print( output.to_records( index = False ) )
-            # break
-            time.sleep( 1 )
-        # break
-
-    if do["task5a"]:
-        counter_factual( bias_type = bias_type, task = task5a, table = "syntactic" )
-
-    if do["testing-syntactic"]:
-        # testing_syntactic.drop( )
-        # testing_syntactic.create( )
-        input = testing_syntactic.get_input( source = "syntactic_data", params = ( bias_type, ) )
-        print( input.head().to_string( sparsify = False ) )
-        testing_syntactic.process( bias_type = bias_type, df = input, output = None )
-
-    # ---------------------------------
-    #   Task 6
-    # ---------------------------------
-    if do["task6"]:
-        input = task6.get_only_new( source = "baseline", params = (bias_type,) )
-        if input is None or input.empty:
-            continue
-        log.debug( input.head( ).to_string( sparsify = False ) )
-        id_terms = input["id_term"].unique( )
-        for id_term in id_terms:
-            # log.info( id_term )
-            data = input[(input["id_term"]==id_term)&(input["unid"]==1)]
-            print( data.head().to_string( sparsify = False ) )
-            print( len( data ) )
-            definition = '", "'.join( data["sentence"].to_list( ) )
-            print( len( definition ))
-            output = semantic_sentences.ask( definition )
-            print( output )
-            task6.process( bias_type = bias_type, id_term = id_term, output = output )
-            time.sleep( 5 )
-
-    if do["task6a"]:
-        counter_factual( bias_type = bias_type, task = task6a, table = "semantic" )
-
-    if do["testing-semantic"]:
-        input = testing_semantic.get_input( source = "semantic_data", params = ( bias_type, ) )
-        print( input.head().to_string( sparsify = False ) )
-        testing_semantic.process( bias_type = bias_type, df = input, output = None )
-
-
 # ---------------------------------
-#   Stats
+#   Stages
 # ---------------------------------
-if do["stats"]:
+def terms( bias_type ):
+    N = 10
+    definition = f"{N} [{bias_type}] [{', '.join( bias_types[bias_type] )}]"
+    log.debug( definition )
+    output = problem_space.ask( definition )
+    log.info( f"{bias_type}: {len( output or [ ] )} terms" )
+    task1.process( bias_type = bias_type, output = output )
+    task1.commit( )
+
+
+def baseline( bias_type ):
+    input = task2.get_only_new( source = "termdefs", params = ( bias_type, )  )
+    N = 3
+    records = input.to_records( index = False )
+    generate( baseline_sentences,
+              ( ( f"{task2.table}-{id}", f"{N} [{id_term}] [{concept_term}]", None, id ) for id, id_term, concept_term in records ),
+              lambda id, output: task2.process( bias_type = bias_type, output = output, df = input, id = id ) )
+    task2.commit( )
+
+
+def lexical( bias_type ):
+    input = task4.get_only_new( source = "baseline", params = ( bias_type, ) )
+    if input is None or input.empty:
+        return
+    log.debug( input.head().to_string( sparsify = False ) )
+    records = input.to_records( index = False )
+    generate( lexical_sentences,
+              ( ( f"{task4.table}-{id}", f"{sentence}", None, id ) for id, __bias, id_term, concept_term, sentence, unid in records ),
+              lambda id, output: task4.process( bias_type = bias_type, output = output, df = input, id = id ) )
+    task4.commit( )
+
+
+def syntactic( bias_type ):
+    input = task5.get_only_new( source = "baseline", params = ( bias_type, ) )
+    if input is None or input.empty:
+        return
+    # rephrased and extended sentences come out longer than their input
+    windows = [ input[start:stop] for start, stop in extensions.pack( input["sentence"].to_list( ), prompt = syntactic_prompt ) ]
+    generate( syntactic_sentences,
+              ( ( f"{task5.table}-{n}", df["sentence"].to_list( ), None, df ) for n, df in enumerate( windows ) ),
+              lambda df, output: task5.process( bias_type = bias_type, df = df, output = output ), batch = False )
+    task5.commit( )
+
+
+def semantic( bias_type ):
+    input = task6.get_only_new( source = "baseline", params = (bias_type,) )
+    if input is None or input.empty:
+        return
+    log.debug( input.head( ).to_string( sparsify = False ) )
+    id_terms = input["id_term"].unique( )
+    definitions = [ ]
+    for id_term in id_terms:
+        data = input[(input["id_term"]==id_term)&(input["unid"]==1)]
+        log.debug( data.head().to_string( sparsify = False ) )
+        definitions.append( ( f"{task6.table}-{id_term}", '", "'.join( data["sentence"].to_list( ) ), None, id_term ) )
+    generate( semantic_sentences, definitions,
+              lambda id_term, output: task6.process( bias_type = bias_type, id_term = id_term, output = output ), batch = False )
+    task6.commit( )
+
+
+def testing_all( ):
+    # model-major: every table and bias type at once
+    driver = Driver( targets = {
+        "baseline_data": testing_baseline,
+        "lexical_data": testing_lexical,
+        "syntactic_data": testing_syntactic,
+        "semantic_data": testing_semantic,
+    } )
+    driver.run( bias_types = list( bias_types.keys( ) ), new_only = True )
+
+
+def statistics( ):
     testing = [ testing_baseline, testing_lexical, testing_syntactic, testing_semantic ]
-    [ stats( t ) for t in testing ]
+    [ describe( t ) for t in testing ]
     log.info( "-" * 80 )
     log.info( "Full Stats" )
     log.info( "-" * 80 )
     testing_baseline.full_desc( )
-    testing_baseline.full_stats( )
-    log.info( "-" * 80 )
-    for t in thresholds:
-        testing_baseline.score_stats( params = { "threshold": t } )
+    # every table and threshold from one load of the testing tables
+    statistics = Stats( db = db )
+    statistics.report( thresholds = thresholds, tables = [ TOTAL ] )
+    statistics.export( path = os.path.join( BASE_DIR, "threshold_curve.csv" ) )
+
+
+def signature( *parts ):
+    # settings of a stage; a stage runs again when they change
+    return hashlib.sha1( json.dumps( parts, sort_keys = True, default = str ).encode( "utf-8" ) ).hexdigest( )
+
+
+def pending( source: str, *tasks ):
+    # input rows of a stage its tasks have not processed yet; a source which does not exist
+    # yet has none
+    def count( bias_type ):
+        try:
+            return sum( task.count_new( source = source, params = ( bias_type, ) if bias_type else None ) for task in tasks )
+        except Exception:
+            return 0
+    return count
+
+
+def stages( ):
+    def generation( gpt: ChatGPT ):
+        return signature( gpt.model, gpt.prompt )
+
+    rewrite = signature( counter_sentences.model )
+    models = signature( models_to_test )
+    return [
+        Stage( "terms", terms, table = task1.table, signature = generation( problem_space ) ),
+        Stage( "baseline", baseline, after = [ "terms" ], table = task2.table, signature = generation( baseline_sentences ),
+               pending = pending( "termdefs", task2 ) ),
+        Stage( "counterfact-base", lambda b: counter_factual( bias_type = b, task = task3, table = "baseline" ),
+               after = [ "baseline" ], table = task3.table, signature = rewrite, pending = pending( "baseline", task3 ) ),
+        Stage( "lexical", lexical, after = [ "baseline" ], table = task4.table, signature = generation( lexical_sentences ),
+               pending = pending( "baseline", task4 ) ),
+        Stage( "counterfact-lexical", lambda b: counter_factual( bias_type = b, task = task4a, table = "lexical" ),
+               after = [ "lexical" ], table = task4a.table, signature = rewrite, pending = pending( "lexical", task4a ) ),
+        Stage( "syntactic", syntactic, after = [ "baseline" ], table = task5.table, signature = generation( syntactic_sentences ),
+               pending = pending( "baseline", task5 ) ),
+        Stage( "counterfact-syntactic", lambda b: counter_factual( bias_type = b, task = task5a, table = "syntactic" ),
+               after = [ "syntactic" ], table = task5a.table, signature = rewrite, pending = pending( "syntactic", task5a ) ),
+        Stage( "semantic", semantic, after = [ "baseline" ], table = task6.table, signature = generation( semantic_sentences ),
+               pending = pending( "baseline", task6 ) ),
+        Stage( "counterfact-semantic", lambda b: counter_factual( bias_type = b, task = task6a, table = "semantic" ),
+               after = [ "semantic" ], table = task6a.table, signature = rewrite, pending = pending( "semantic", task6a ) ),
+        Stage( "testing-baseline", lambda b: testing_baseline.run( bias_type = b, source = "baseline_data", new_only = True ),
+               after = [ "baseline", "counterfact-base" ], table = testing_baseline.table, group = "inference", signature = models,
+               pending = pending( "baseline_data", testing_baseline ) ),
+        Stage( "testing-lexical", lambda b: testing_lexical.run( bias_type = b, source = "lexical_data", new_only = True ),
+               after = [ "lexical", "counterfact-lexical" ], table = testing_lexical.table, group = "inference", signature = models,
+               pending = pending( "lexical_data", testing_lexical ) ),
+        Stage( "testing-syntactic", lambda b: testing_syntactic.run( bias_type = b, source = "syntactic_data", new_only = True ),
+               after = [ "syntactic", "counterfact-syntactic" ], table = testing_syntactic.table, group = "inference", signature = models,
+               pending = pending( "syntactic_data", testing_syntactic ) ),
+        Stage( "testing-semantic", lambda b: testing_semantic.run( bias_type = b, source = "semantic_data", new_only = True ),
+               after = [ "semantic", "counterfact-semantic" ], table = testing_semantic.table, group = "inference", signature = models,
+               pending = pending( "semantic_data", testing_semantic ) ),
+        Stage( "testing-all", testing_all, per_bias = False, group = "inference", signature = models,
+               after = [ "baseline", "counterfact-base", "lexical", "counterfact-lexical", "syntactic", "counterfact-syntactic",
+                         "semantic", "counterfact-semantic" ],
+               pending = lambda __: sum( pending( source, task )( "" ) for source, task in (
+                   ( "baseline_data", testing_baseline ), ( "lexical_data", testing_lexical ),
+                   ( "syntactic_data", testing_syntactic ), ( "semantic_data", testing_semantic ) ) ) ),
+        Stage( "stats", statistics, per_bias = False, always = True,
+               after = [ "testing-baseline", "testing-lexical", "testing-syntactic", "testing-semantic" ] ),
+    ]
+
+
+ALIASES = {
+    "generation": [ "terms", "baseline", "lexical", "syntactic", "semantic" ],
+    "counterfactual": [ "counterfact-base", "counterfact-lexical", "counterfact-syntactic", "counterfact-semantic" ],
+    "testing": [ "testing-baseline", "testing-lexical", "testing-syntactic", "testing-semantic" ],
+    "all": [ "stats" ],
+}
+
+
+def main( argv = None ):
+    global BATCH, MULTI_TARGET
+    parser = argparse.ArgumentParser( description = "Bias testing workflow: runs the selected stages and the stale stages they depend on" )
+    parser.add_argument( "targets", nargs = "*", default = [ "stats" ],
+                         help = f"stages ({', '.join( s.name for s in runner.stages.values( ) )}) or groups ({', '.join( ALIASES )})" )
+    parser.add_argument( "--bias", nargs = "+", choices = list( bias_types ), help = "bias types (default: all)" )
+    parser.add_argument( "--only", action = "store_true", help = "run the targets only, not the stale stages they depend on" )
+    parser.add_argument( "--force", action = "store_true", help = "run the stages even if they are up to date" )
+    parser.add_argument( "--touch", action = "store_true", help = "mark the stages as done without running them" )
+    parser.add_argument( "--status", action = "store_true", help = "show which stages are stale and exit" )
+    parser.add_argument( "--workers", type = int, help = "stages running in parallel" )
+    parser.add_argument( "--batch", action = "store_true", help = "submit the generation requests through the Batch API" )
+    parser.add_argument( "--structured", choices = [ "json", "schema" ], help = "ask for JSON output (JSON mode or JSON schema)" )
+    parser.add_argument( "--model", help = f"chat model of the generation stages (default: {ChatGPT.model}; "
+                                           f"--structured schema needs one supporting it, e.g. gpt-4o-mini)" )
+    parser.add_argument( "--multi-target", action = "store_true", help = "one counterfactual request for all other identity terms" )
+    args = parser.parse_args( argv )
+    BATCH = BATCH or args.batch
+    MULTI_TARGET = MULTI_TARGET or args.multi_target
+    generators = ( problem_space, baseline_sentences, syntactic_sentences, lexical_sentences, semantic_sentences, counter_sentences )
+    for gpt in generators:
+        try:
+            ChatGPT.check( args.model or gpt.model, args.structured or gpt.structured )
+        except ValueError as e:
+            parser.error( str( e ) )
+    for gpt in generators:
+        gpt.model = args.model or gpt.model
+        gpt.structured = args.structured or gpt.structured
+    if args.model:
+        # the generation stages are stale when their model changed
+        for stage in stages( ):
+            runner.stages[stage.name].signature = stage.signature
+    if args.workers:
+        runner.workers = args.workers
+    if args.status:
+        for ( name, bias_type ), reason in runner.status( args.targets, bias_types = args.bias, only = args.only ).items( ):
+            print( f"{name:<24}{bias_type:<22}{reason or 'up to date'}" )
+        return 0
+    failed, skipped = runner.run( args.targets, bias_types = args.bias, only = args.only, force = args.force, touch = args.touch )
+    metrics.summary( )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    db = sqlite3.connect( dbfile, check_same_thread = False )
+    # time, requests, tokens, rows written and throughput per stage and bias type
+    metrics = Metrics( db = db, table = "metrics" )
+    Task.metrics = metrics
+    # shared request engine: up to 8 requests in flight within the account's rate limits
+    engine = Engine( concurrency = 8, rpm = 3500, tpm = 90000, metrics = metrics )
+    # completions are kept next to outputs.db; use mode "refresh" to re-ask, "offline" to replay only
+    cache = Cache( path = os.path.join( BASE_DIR, "responses.db" ), mode = "read" )
+    # with STRUCTURED set, answers follow these formats (rewrites have one per request, see generate)
+    problem_space = ChatGPT( prompt = baseline_prompt, engine = engine, cache = cache, structured = STRUCTURED,
+                             format = ChatGPT.schema( "terms", TRIPLET ) )
+    baseline_sentences = ChatGPT( prompt = generator_prompt, engine = engine, cache = cache, structured = STRUCTURED,
+                                  format = ChatGPT.schema( "sentences", STRING, 3 ) )
+    syntactic_sentences = ChatGPT( prompt = syntactic_prompt, engine = engine, cache = cache, structured = STRUCTURED )
+    lexical_sentences = ChatGPT( prompt = lexical_prompt, engine = engine, cache = cache, structured = STRUCTURED,
+                                 format = ChatGPT.schema( "sentences", STRING, 4 ) )
+    semantic_sentences = ChatGPT( prompt = semantic_prompt, engine = engine, cache = cache, structured = STRUCTURED,
+                                  format = ChatGPT.schema( "sentences", STRING, 20 ) )
+    counter_sentences = ChatGPT( engine = engine, cache = cache, structured = STRUCTURED )
+    # sentences per rewrite request by their estimated tokens (within max_tokens = 2048)
+    rewrites = Batcher( ratio = 1.2 )
+    extensions = Batcher( ratio = 2.5 )
+    # requests, parsing and database writes overlap; at most 64 answers wait for being written
+    pipeline = Pipeline( engine = engine, capacity = 64, parsers = 2 )
+
+    task1 = Terms( db = db, table = "termdefs" )
+    task2 = Samples( db = db, table = "baseline" )
+    task3 = CounterFactual( db = db, table = "counterfact_base" )
+    task4 = Lexical( db = db, table = "lexical" )
+    task4a = CounterFactual( db = db, table = "counterfact_lexical2" )
+    task5 = Syntactic( db = db, table = "syntactic" )
+    task5a = CounterFactual( db = db, table = "counterfact_syntactic" )
+    task6 = Semantic( db = db, table = "semantic" )
+    task6a = CounterFactual_Semantic( db = db, table = "counterfact_semantic" )
+    # <basetable>_data: union of base and counterfactual tables, maintained by triggers
+    baseline_data = Unified( db = db, table = "baseline_data", base = "baseline", counterfact = "counterfact_base" )
+    lexical_data = Unified( db = db, table = "lexical_data", base = "lexical", counterfact = "counterfact_lexical2" )
+    syntactic_data = Unified( db = db, table = "syntactic_data", base = "syntactic", counterfact = "counterfact_syntactic" )
+    semantic_data = Unified_Semantic( db = db, table = "semantic_data", base = "semantic", counterfact = "counterfact_semantic" )
+    # one registry for all testing tasks, so models stay loaded across tables and bias types
+    registry = Models( capacity = len( models_to_test ), budget = 8 * 2**30 )
+    # classification results shared by sentence text across testing tables and runs
+    results = Results( db = db, table = "testing_results" )
+    # sentence descriptors shared by the per table and the full corpus descriptions
+    descriptors = Descriptors( processes = os.cpu_count( ) )
+    # in-process inference on all cores; for a process pool instead, use e.g.
+    # "workers": Workers( processes = os.cpu_count( ) // 4, threads = 4 )
+    inference = { "registry": registry, "results": results, "batch_size": 32, "threads": os.cpu_count( ), "workers": None,
+                  "descriptors": descriptors, "chunksize": 10000 }
+    testing_baseline = Testing( db = db, table = "testing_baseline", models = models_to_test, **inference )
+    testing_lexical = Testing( db = db, table = "testing_lexical", models = models_to_test, **inference )
+    testing_syntactic = Testing( db = db, table = "testing_syntactic", models = models_to_test, **inference )
+    testing_semantic = Testing( db = db, table = "testing_semantic", models = models_to_test, **inference )
+    # when each stage last finished, per bias type
+    runner = Runner( stages( ), bias_types = list( bias_types ), record = Stages( db = db, table = "stages" ), aliases = ALIASES,
+                     metrics = metrics )
+    try:
+        code = main( )
+    finally:
+        if inference["workers"] is not None:
+            inference["workers"].close( )
+        engine.close( )
+        ChatGPT.close_shared( )
+        cache.close( )
+        db.close( )
+    sys.exit( code )